@@ -0,0 +1,192 @@
+"""Bulk planetary-hour almanacs: every hour of a date range for many locations.
+
+    flask build-almanac --locations cities.csv --year 2027 --output almanac-2027/
+
+The job is split into shards of up to shard_size locations by up to
+shard_days days. Shards are handed to a process pool in chunks and each
+one is written to its own NumPy .npz file with one array per column
+(COLUMNS) plus the names, coordinates and time zones of its locations.
+Shard files appear atomically once complete, so an interrupted job picks
+up where it stopped when run again into the same directory; the manifest
+(almanac.json) records the job and refuses to mix in shards of another.
+"""
+import csv
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import time
+from datetime import timedelta
+
+import numpy as np
+
+import planetary_hours
+from planetary_hours import get_planetary_hours_range
+
+MANIFEST = "almanac.json"
+
+# Arrays of one row per planetary hour in every shard file: location index
+# (into the job's location list), local calendar day, hour number 1-12,
+# period (0 = day, 1 = night), planet (index into PLANETARY_HOUR_SEQUENCE)
+# and start/end in epoch microseconds
+COLUMNS = ("location", "day", "hour_number", "period", "planet", "start", "end")
+
+def read_locations(path):
+    """(name, latitude, longitude) rows of a CSV file with name, latitude and longitude columns."""
+    with open(path, newline="") as f:
+        return [(row["name"], float(row["latitude"]), float(row["longitude"])) for row in csv.DictReader(f)]
+
+def plan_shards(location_count, start, end, shard_size=64, shard_days=366):
+    """(shard id, first location, location count, first day, last day) of every shard, in order."""
+    shards = []
+    for first in range(0, location_count, shard_size):
+        count = min(shard_size, location_count - first)
+        day = start
+        while day <= end:
+            last = min(end, day + timedelta(days=shard_days - 1))
+            shards.append((f"{first:06d}-{day:%Y%m%d}", first, count, day, last))
+            day = last + timedelta(days=1)
+    return shards
+
+def shard_path(output, shard_id):
+    return os.path.join(output, f"shard-{shard_id}.npz")
+
+def build_shard(path, locations, first, start, end, compress=False):
+    """Compute one shard and write it atomically to path; returns (rows, location days, seconds)."""
+    began = time.perf_counter()
+    columns = {name: [] for name in COLUMNS}
+    zones = []
+    location_days = 0
+    for offset, (_, latitude, longitude) in enumerate(locations):
+        table = get_planetary_hours_range(latitude, longitude, start, end, skip_polar=True)
+        location_days += len(table.days)
+        zones.append(table.tzinfo.zone)
+        columns["location"].append(np.full(len(table), first + offset, dtype=np.int32))
+        columns["day"].append(np.repeat(table.days, 24))
+        columns["hour_number"].append(table.hour_number)
+        columns["period"].append(table.period)
+        columns["planet"].append(table.planet)
+        columns["start"].append(table.start)
+        columns["end"].append(table.end)
+
+    arrays = {name: np.concatenate(parts) for name, parts in columns.items()}
+    arrays.update(
+        names=np.array([name or "" for name, _, _ in locations]),
+        latitudes=np.array([latitude for _, latitude, _ in locations]),
+        longitudes=np.array([longitude for _, _, longitude in locations]),
+        timezones=np.array(zones)
+    )
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        (np.savez_compressed if compress else np.savez)(f, **arrays)
+    os.replace(tmp_path, path)
+    return len(arrays["start"]), location_days, time.perf_counter() - began
+
+def _build_task(task):
+    return build_shard(*task)
+
+def _init_worker(convention):
+    planetary_hours.configure_polar_convention(convention)
+
+def _job(locations, start, end, shard_size, shard_days, convention):
+    """What the shard files depend on; a directory only ever holds one job."""
+    return {
+        "locations": len(locations),
+        "locations_sha1": hashlib.sha1(json.dumps(locations).encode()).hexdigest(),
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "shard_size": shard_size,
+        "shard_days": shard_days,
+        "polar_convention": convention,
+        "columns": list(COLUMNS)
+    }
+
+def _write_manifest(path, manifest):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def build_almanac(locations, start, end, output, processes=None, shard_size=64, shard_days=366,
+                  chunksize=None, compress=False):
+    """Write the almanac of locations ((name, latitude, longitude) rows) from start to end into output.
+
+    Shards already in output are kept, so rerunning an interrupted job
+    only computes the rest. processes defaults to one per CPU; with 1 the
+    work runs in this process. chunksize is the number of shards handed to
+    a worker at a time (default: about four chunks per worker). Returns
+    the throughput report, which is also saved in the manifest.
+    """
+    locations = [(name, float(latitude), float(longitude)) for name, latitude, longitude in locations]
+    convention = planetary_hours.polar_convention
+    job = _job(locations, start, end, shard_size, shard_days, convention)
+
+    os.makedirs(output, exist_ok=True)
+    manifest_path = os.path.join(output, MANIFEST)
+    manifest = {"job": job, "runs": []}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest["job"] != job:
+            raise ValueError(f"{output} holds shards of a different almanac job")
+    _write_manifest(manifest_path, manifest)
+
+    shards = plan_shards(len(locations), start, end, shard_size, shard_days)
+    tasks = [
+        (shard_path(output, shard_id), locations[first:first + count], first, first_day, last_day, compress)
+        for shard_id, first, count, first_day, last_day in shards
+        if not os.path.exists(shard_path(output, shard_id))
+    ]
+    processes = max(1, min(processes or os.cpu_count() or 1, len(tasks) or 1))
+    if chunksize is None:
+        chunksize = max(1, math.ceil(len(tasks) / (processes * 4)))
+
+    rows = location_days = 0
+    busy = 0.0
+    began = time.perf_counter()
+    if processes == 1:
+        results = map(_build_task, tasks)
+        for shard_rows, shard_days_done, seconds in results:
+            rows += shard_rows
+            location_days += shard_days_done
+            busy += seconds
+    else:
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(convention,)) as pool:
+            for shard_rows, shard_days_done, seconds in pool.imap_unordered(_build_task, tasks, chunksize):
+                rows += shard_rows
+                location_days += shard_days_done
+                busy += seconds
+    elapsed = time.perf_counter() - began
+
+    report = {
+        "shards": len(shards),
+        "shards_written": len(tasks),
+        "shards_resumed": len(shards) - len(tasks),
+        "processes": processes,
+        "chunksize": chunksize,
+        "rows": rows,
+        "location_days": location_days,
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed else 0.0,
+        "location_days_per_sec": location_days / elapsed if elapsed else 0.0,
+        # Share of the pool's wall time spent computing shards; close to 1
+        # means the job scales with the number of processes
+        "efficiency": busy / (elapsed * processes) if elapsed else 0.0
+    }
+    manifest["runs"].append(report)
+    _write_manifest(manifest_path, manifest)
+    return report
+
+def load_almanac(output):
+    """Read every shard in output back as one dict of concatenated columns (for checks and small jobs)."""
+    with open(os.path.join(output, MANIFEST)) as f:
+        job = json.load(f)["job"]
+    parts = []
+    for name in sorted(os.listdir(output)):
+        if name.startswith("shard-") and name.endswith(".npz"):
+            with np.load(os.path.join(output, name)) as shard:
+                parts.append({column: shard[column] for column in COLUMNS})
+    columns = {column: np.concatenate([part[column] for part in parts]) for column in COLUMNS}
+    columns["job"] = job
+    return columns
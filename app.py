@@ -1,16 +1,24 @@
 import os
 import logging
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+import click
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, flash, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from sqlalchemy.orm import DeclarativeBase
 from planetary_hours import (
     get_planetary_day_info, 
+    get_current_planetary_hour, 
     get_current_planetary_hour_info, 
     get_all_planetary_hours, 
     get_day_planetary_hours,
-    calculate_sunrise_sunset
+    get_current_planetary_hours_batch,
+    find_planetary_hours,
+    calculate_sunrise_sunset,
+    valid_coordinates,
+    PlanetaryHour
 )
+from elections import Election, find_elections, moon_phases
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -21,8 +29,18 @@ class Base(DeclarativeBase):
 
 db = SQLAlchemy(model_class=Base)
 
+class PlanetaryJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes PlanetaryHour and Election records directly."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (PlanetaryHour, Election)):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
 # Create Flask app
 app = Flask(__name__)
+app.json = PlanetaryJSONProvider(app)
 app.secret_key = os.environ.get("SESSION_SECRET", "planetaryhourssecret")
 
 # Configure database
@@ -33,15 +51,255 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_pre_ping": True,
 }
 
+# Limits for the batch endpoint; BATCH_PROCESSES > 1 spreads batches larger
+# than BATCH_POOL_THRESHOLD (default half the request cap) across a process pool
+app.config["BATCH_MAX_LOCATIONS"] = int(os.environ.get("BATCH_MAX_LOCATIONS", "10000"))
+app.config["BATCH_PROCESSES"] = int(os.environ.get("BATCH_PROCESSES", "0"))
+app.config["BATCH_POOL_THRESHOLD"] = min(
+    int(os.environ.get("BATCH_POOL_THRESHOLD", str(app.config["BATCH_MAX_LOCATIONS"] // 2))),
+    app.config["BATCH_MAX_LOCATIONS"] - 1
+)
+
+# Longest date range a single export may cover
+app.config["EXPORT_MAX_DAYS"] = int(os.environ.get("EXPORT_MAX_DAYS", "3660"))
+
 # Initialize the database with the app
 db.init_app(app)
 
 # Import models after initializing db
-from models import Location, PlanetaryHourLog
+from models import Location, PlanetaryHourLog, PlanetaryHourRollup
+from query_log import QueryLogWriter, prune_query_logs, rebuild_rollups, rollup_stats
+from http_cache import HourResponseCache, get_hour_slot
+from fragment_cache import FileFragmentStore, FragmentCache, MemoryFragmentStore, page_fragments
+from transitions import stream_transitions
+from metrics import SlowRequestProfiler, cache_collector, instrument_app, registry, timed
+from planetary_hours import (
+    configure_polar_convention,
+    configure_solar_grid,
+    get_solar_cache_stats,
+    set_ephemeris_store,
+    solar_cache
+)
+from export import EXPORT_FORMATS
+from almanac import build_almanac, read_locations
+from timezones import timezone_resolver
+
+# Query logs are written behind the request by a background flusher, which
+# also keeps the analytics rollups up to date
+query_log = QueryLogWriter(db, PlanetaryHourLog, app, rollup_model=PlanetaryHourRollup)
+
+# Raw query logs older than this many days can be pruned; rollups are kept
+app.config["QUERY_LOG_RETENTION_DAYS"] = int(os.environ.get("QUERY_LOG_RETENTION_DAYS", "90"))
+
+# Responses only change at an hour boundary; HTTP_CACHE_RESPONSES=1 also keeps
+# rendered bodies in memory for the rest of the hour
+hour_cache = HourResponseCache(
+    store_responses=os.environ.get("HTTP_CACHE_RESPONSES", "0") == "1",
+    maxsize=int(os.environ.get("HTTP_CACHE_SIZE", "2048"))
+)
+
+# Rendered page fragments (the day's hour table, the day and hour panels)
+# are reused until they change, also on pages rendered fresh; set
+# FRAGMENT_CACHE_DIR to share them between the workers on a host, or
+# FRAGMENT_CACHE=0 to render every time
+fragment_cache_size = int(os.environ.get("FRAGMENT_CACHE_SIZE", "4096"))
+fragment_cache = FragmentCache(
+    store=(FileFragmentStore(os.environ["FRAGMENT_CACHE_DIR"], maxsize=fragment_cache_size)
+           if os.environ.get("FRAGMENT_CACHE_DIR") else MemoryFragmentStore(maxsize=fragment_cache_size)),
+    enabled=os.environ.get("FRAGMENT_CACHE", "1") == "1"
+)
+app.jinja_env.globals["cached_fragment"] = fragment_cache.jinja_fragment
+
+# Request metrics, /metrics endpoint and the opt-in slow-request profiler
+# (PROFILE_SLOW_REQUESTS_MS enables it)
+profile_threshold = os.environ.get("PROFILE_SLOW_REQUESTS_MS")
+instrument_app(app, SlowRequestProfiler(
+    threshold_ms=float(profile_threshold) if profile_threshold else None,
+    sample_rate=float(os.environ.get("PROFILE_SAMPLE_RATE", "0.01")),
+    output_dir=os.environ.get("PROFILE_DIR", "profiles")
+))
+registry.register_collector(cache_collector("solar_events", get_solar_cache_stats))
+registry.register_collector(cache_collector("http_responses", hour_cache.stats))
+registry.register_collector(cache_collector("page_fragments", fragment_cache.stats))
+registry.register_collector(cache_collector("timezones", timezone_resolver.stats))
+registry.register_collector(cache_collector("moon_phases", moon_phases.stats))
+registry.register_collector(query_log.collect_metrics)
+
+# Spatial grid mode: solar events are computed and cached per grid cell
+# (SOLAR_GRID_DEGREES, e.g. 0.05) instead of per exact coordinate
+if os.environ.get("SOLAR_GRID_DEGREES"):
+    configure_solar_grid(
+        float(os.environ["SOLAR_GRID_DEGREES"]),
+        interpolate=os.environ.get("SOLAR_GRID_INTERPOLATE", "0") == "1"
+    )
+
+# Polar day and night: civil_twilight (default), equal_hours, or none to
+# report them as errors like before
+if os.environ.get("POLAR_CONVENTION"):
+    configure_polar_convention(os.environ["POLAR_CONVENTION"])
+
+def remember_location_timezones(locations):
+    """Seed the timezone cache from saved locations, resolving and storing any zone not saved yet."""
+    resolved = False
+    for loc in locations:
+        if loc.timezone:
+            timezone_resolver.remember(loc.latitude, loc.longitude, loc.timezone)
+        else:
+            loc.timezone = timezone_resolver.zone_name(loc.latitude, loc.longitude)
+            resolved = True
+    if resolved:
+        db.session.commit()
+    return locations
+
+def saved_location_coordinates():
+    """Coordinates of every saved location, keyed like the solar cache, for the ephemeris job."""
+    with app.app_context():
+        locations = remember_location_timezones(Location.query.all())
+        return [solar_cache.quantize(loc.latitude, loc.longitude) for loc in locations]
+
+# Optional precomputed sunrise/sunset for saved locations, memory-mapped by
+# every worker (EPHEMERIS_PATH enables it)
+ephemeris_maintainer = None
+if os.environ.get("EPHEMERIS_PATH"):
+    from ephemeris_store import EphemerisMaintainer, EphemerisStore
+    ephemeris = EphemerisStore(os.environ["EPHEMERIS_PATH"])
+    set_ephemeris_store(ephemeris)
+    ephemeris_maintainer = EphemerisMaintainer(
+        ephemeris,
+        saved_location_coordinates,
+        horizon_days=int(os.environ.get("EPHEMERIS_DAYS", "366"))
+    )
+
+    @app.before_request
+    def start_ephemeris_maintainer():
+        ephemeris_maintainer.ensure_started()
+
+@app.cli.command("build-ephemeris")
+def build_ephemeris_command():
+    """Precompute the ephemeris store for all saved locations."""
+    if ephemeris_maintainer is None:
+        print("Set EPHEMERIS_PATH to enable the ephemeris store")
+        return
+    if not ephemeris_maintainer.rebuild(force=True):
+        raise click.ClickException("Ephemeris rebuild already in progress in another process")
+    print(f"Ephemeris written to {ephemeris_maintainer.store.path}")
+
+def saved_export_locations():
+    """(name, latitude, longitude) for every saved location, for exports."""
+    locations = remember_location_timezones(Location.query.order_by(Location.id).all())
+    return [(loc.name, loc.latitude, loc.longitude) for loc in locations]
+
+@app.cli.command("export-hours")
+@click.option("--lat", type=float, help="Latitude (omit to export every saved location)")
+@click.option("--lng", type=float, help="Longitude")
+@click.option("--start", type=click.DateTime(["%Y-%m-%d"]), required=True, help="First day (YYYY-MM-DD)")
+@click.option("--end", type=click.DateTime(["%Y-%m-%d"]), required=True, help="Last day, inclusive (YYYY-MM-DD)")
+@click.option("--format", "export_format", type=click.Choice(list(EXPORT_FORMATS)), default="csv")
+@click.option("--output", type=click.File("w", lazy=True), default="-", help="Output file (default: stdout)")
+def export_hours_command(lat, lng, start, end, export_format, output):
+    """Stream planetary hours for a date range as CSV, JSON Lines or iCalendar."""
+    if (lat is None) != (lng is None):
+        raise click.UsageError("--lat and --lng must be given together")
+    locations = [(None, lat, lng)] if lat is not None else saved_export_locations()
+    exporter = EXPORT_FORMATS[export_format][0]
+    for chunk in exporter(locations, start.date(), end.date()):
+        output.write(chunk)
+
+@app.cli.command("build-almanac")
+@click.option("--locations", "locations_file", type=click.Path(exists=True, dir_okay=False),
+              help="CSV with name, latitude and longitude columns (default: every saved location)")
+@click.option("--year", type=int, help="Calendar year (instead of --start and --end)")
+@click.option("--start", type=click.DateTime(["%Y-%m-%d"]), help="First day (YYYY-MM-DD)")
+@click.option("--end", type=click.DateTime(["%Y-%m-%d"]), help="Last day, inclusive (YYYY-MM-DD)")
+@click.option("--output", type=click.Path(file_okay=False), required=True, help="Directory for the shard files")
+@click.option("--processes", type=int, default=None, help="Worker processes (default: one per CPU)")
+@click.option("--shard-size", type=int, default=64, show_default=True, help="Locations per shard")
+@click.option("--shard-days", type=int, default=366, show_default=True, help="Days per shard")
+@click.option("--chunksize", type=int, default=None, help="Shards handed to a worker at a time")
+@click.option("--compress", is_flag=True, help="Write compressed .npz files")
+def build_almanac_command(locations_file, year, start, end, output, processes, shard_size, shard_days,
+                          chunksize, compress):
+    """Precompute every planetary hour of a date range for many locations, one .npz file per shard.
+
+    Rerunning into the same --output resumes an interrupted job.
+    """
+    if year is not None:
+        if start or end:
+            raise click.UsageError("--year cannot be combined with --start or --end")
+        start, end = date(year, 1, 1), date(year, 12, 31)
+    elif start is None or end is None:
+        raise click.UsageError("give --year, or --start and --end")
+    else:
+        start, end = start.date(), end.date()
+    locations = read_locations(locations_file) if locations_file else saved_export_locations()
+    try:
+        report = build_almanac(locations, start, end, output, processes=processes, shard_size=shard_size,
+                               shard_days=shard_days, chunksize=chunksize, compress=compress)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    if report["shards_resumed"]:
+        print(f"Resumed: {report['shards_resumed']} of {report['shards']} shards were already written")
+    print(
+        f"Wrote {report['shards_written']} shards ({report['rows']} hours, {report['location_days']} location days) "
+        f"in {report['seconds']:.1f}s with {report['processes']} processes: "
+        f"{report['rows_per_sec']:.0f} hours/s, {report['location_days_per_sec']:.0f} location days/s, "
+        f"efficiency {report['efficiency']:.0%}"
+    )
+
+@app.cli.command("prune-query-logs")
+@click.option("--days", type=int, default=None, help="Keep this many days of raw logs (default QUERY_LOG_RETENTION_DAYS)")
+def prune_query_logs_command(days):
+    """Delete raw query logs past the retention window (their counts stay in the rollups)."""
+    days = app.config["QUERY_LOG_RETENTION_DAYS"] if days is None else days
+    deleted = prune_query_logs(db.session, PlanetaryHourLog, days)
+    print(f"Deleted {deleted} query log rows older than {days} days")
+
+@app.cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Recompute the analytics rollups of the days whose raw query logs are still stored."""
+    query_log.flush()
+    counted = rebuild_rollups(db.session, PlanetaryHourLog, PlanetaryHourRollup)
+    print(f"Rolled up {counted} query log rows (rollups of pruned days are kept)")
+
+def init_db():
+    """Create any missing tables."""
+    with app.app_context():
+        db.create_all()
 
-# Create database tables if they don't exist
-with app.app_context():
-    db.create_all()
+@app.cli.command("init-db")
+def init_db_command():
+    """Create the database tables that do not exist yet."""
+    init_db()
+    print("Database tables created")
+
+# Schema creation is an explicit step (flask init-db) rather than a database
+# round trip on every import; DB_CREATE_ALL=1 creates tables at import, e.g.
+# for throwaway SQLite databases
+if os.environ.get("DB_CREATE_ALL") == "1":
+    init_db()
+
+def warm_caches():
+    """Load time zone data and compute the current hours of every saved location.
+
+    Run once by a preforking server before it forks (see gunicorn.conf.py)
+    so every worker starts with this data in memory, shared copy-on-write,
+    instead of loading it on its first requests. Returns the number of
+    locations warmed.
+    """
+    timezone_resolver.warm()
+    if ephemeris_maintainer is not None:
+        ephemeris_maintainer.store.reload()
+    with app.app_context():
+        locations = remember_location_timezones(Location.query.all())
+        for loc in locations:
+            try:
+                get_current_planetary_hour(loc.latitude, loc.longitude)
+            except ValueError:
+                # Polar day or night: nothing to precompute
+                continue
+        # Forked workers must open their own connections
+        db.engine.dispose()
+    return len(locations)
 
 @app.route("/")
 def index():
@@ -54,6 +312,7 @@ def index():
     if lat is None or lng is None:
         default_location = Location.query.filter_by(is_default=True).first()
         if default_location:
+            remember_location_timezones([default_location])
             lat = default_location.latitude
             lng = default_location.longitude
         else:
@@ -62,32 +321,37 @@ def index():
             lng = -74.0060
     
     try:
-        lat = float(lat)
-        lng = float(lng)
+        lat, lng = _coordinates(lat, lng)
     except ValueError:
         lat = 40.7128
         lng = -74.0060
         
-    # Get current planetary day and hour information
-    day_info = get_planetary_day_info(lat, lng)
-    hour_info = get_current_planetary_hour_info(lat, lng)
+    def render():
+        # Get current planetary day and hour information
+        day_info = get_planetary_day_info(lat, lng)
+        hour_info = get_current_planetary_hour_info(lat, lng)
+        
+        # Get sunrise and sunset times
+        sunrise, sunset = calculate_sunrise_sunset(lat, lng)
+        
+        # Get all planetary hours for the day
+        all_hours = get_day_planetary_hours(lat, lng)
+        
+        with timed("render"):
+            return render_template(
+                "index.html", 
+                day_info=day_info, 
+                hour_info=hour_info,
+                all_hours=all_hours,
+                sunrise=sunrise,
+                sunset=sunset,
+                lat=lat,
+                lng=lng,
+                fragments=page_fragments(lat, lng)
+            )
     
-    # Get sunrise and sunset times
-    sunrise, sunset = calculate_sunrise_sunset(lat, lng)
-    
-    # Get all planetary hours for the day
-    all_hours = get_day_planetary_hours(lat, lng)
-    
-    return render_template(
-        "index.html", 
-        day_info=day_info, 
-        hour_info=hour_info,
-        all_hours=all_hours,
-        sunrise=sunrise,
-        sunset=sunset,
-        lat=lat,
-        lng=lng
-    )
+    # Reuse the page until the planetary hour changes
+    return hour_cache.respond(get_hour_slot("index", lat, lng), render)
 
 @app.route("/about")
 def about():
@@ -97,7 +361,7 @@ def about():
 @app.route("/locations")
 def list_locations():
     """View saved locations"""
-    locations = Location.query.order_by(Location.name).all()
+    locations = remember_location_timezones(Location.query.order_by(Location.name).all())
     return render_template("locations.html", locations=locations)
 
 @app.route("/locations/add", methods=["GET", "POST"])
@@ -110,8 +374,7 @@ def add_location():
         is_default = True if request.form.get("is_default") else False
         
         try:
-            latitude = float(latitude)
-            longitude = float(longitude)
+            latitude, longitude = _coordinates(latitude, longitude)
         except (ValueError, TypeError):
             flash("Please enter valid coordinates", "danger")
             return redirect(url_for("add_location"))
@@ -126,12 +389,17 @@ def add_location():
             name=name,
             latitude=latitude,
             longitude=longitude,
-            is_default=is_default
+            is_default=is_default,
+            timezone=timezone_resolver.zone_name(latitude, longitude)
         )
         
         db.session.add(location)
         db.session.commit()
         
+        # Precompute the new location's sunrise/sunset in the background
+        if ephemeris_maintainer is not None:
+            ephemeris_maintainer.invalidate()
+        
         flash(f"Location '{name}' has been added", "success")
         return redirect(url_for("list_locations"))
     
@@ -155,6 +423,9 @@ def delete_location(id):
     db.session.delete(location)
     db.session.commit()
     
+    if ephemeris_maintainer is not None:
+        ephemeris_maintainer.invalidate()
+    
     flash(f"Location '{location.name}' has been deleted", "success")
     return redirect(url_for("list_locations"))
 
@@ -162,6 +433,7 @@ def delete_location(id):
 def use_location(id):
     """Use a saved location"""
     location = Location.query.get_or_404(id)
+    remember_location_timezones([location])
     return redirect(url_for("index", lat=location.latitude, lng=location.longitude))
 
 @app.route("/log_query")
@@ -171,8 +443,7 @@ def log_query():
     lng = request.args.get("lng", "-74.0060")
     
     try:
-        lat = float(lat)
-        lng = float(lng)
+        lat, lng = _coordinates(lat, lng)
     except ValueError:
         return jsonify({"status": "error", "message": "Invalid coordinates"}), 400
     
@@ -180,8 +451,8 @@ def log_query():
     day_info = get_planetary_day_info(lat, lng)
     hour_info = get_current_planetary_hour_info(lat, lng)
     
-    # Create log entry
-    log = PlanetaryHourLog(
+    # Queue log entry
+    query_log.log(
         latitude=lat,
         longitude=lng,
         day_planet=day_info["planet"],
@@ -190,11 +461,22 @@ def log_query():
         hour_number=hour_info["hour_number"]
     )
     
-    db.session.add(log)
-    db.session.commit()
-    
     return jsonify({"status": "success"})
 
+@app.route("/api/stats")
+def api_stats():
+    """API endpoint with query counts per planet, hour, period, day and location cell.
+
+    Served entirely from the rollup table; days limits the window (default 30).
+    """
+    try:
+        days = int(request.args.get("days", "30"))
+    except ValueError:
+        return jsonify({"error": "days must be an integer"}), 400
+    
+    since = datetime.utcnow().date() - timedelta(days=max(days, 1) - 1)
+    return jsonify(rollup_stats(db.session, PlanetaryHourRollup, since))
+
 @app.route("/api/planetary_hours")
 def api_planetary_hours():
     """API endpoint to get planetary hour information"""
@@ -202,33 +484,242 @@ def api_planetary_hours():
     lng = request.args.get("lng", "-74.0060")
     
     try:
-        lat = float(lat)
-        lng = float(lng)
+        lat, lng = _coordinates(lat, lng)
     except ValueError:
         return jsonify({"error": "Invalid coordinates"}), 400
     
     # Get current planetary day and hour information
     day_info = get_planetary_day_info(lat, lng)
-    hour_info = get_current_planetary_hour_info(lat, lng)
-    all_hours = get_all_planetary_hours(lat, lng)
+    hour = get_current_planetary_hour(lat, lng)
     
-    # Log this query in the database
-    log = PlanetaryHourLog(
+    # Log this query in the database (written behind the request)
+    query_log.log(
         latitude=lat,
         longitude=lng,
         day_planet=day_info["planet"],
-        hour_planet=hour_info["planet"],
-        period=hour_info["period"],
-        hour_number=hour_info["hour_number"]
+        hour_planet=hour.planet,
+        period=hour.period,
+        hour_number=hour.hour_number
     )
-    db.session.add(log)
-    db.session.commit()
     
-    return jsonify({
-        "day": day_info,
-        "current_hour": hour_info,
-        "all_hours": all_hours
-    })
+    def render():
+        current_hour = get_current_planetary_hour_info(lat, lng)
+        all_hours = get_all_planetary_hours(lat, lng)
+        with timed("render"):
+            return jsonify({
+                "day": day_info,
+                "current_hour": current_hour,
+                "all_hours": all_hours
+            })
+    
+    # Clients and CDNs may reuse the response until the hour changes
+    return hour_cache.respond(get_hour_slot("api_planetary_hours", lat, lng), render)
+
+@app.route("/api/planetary_hours/batch", methods=["GET", "POST"])
+def api_planetary_hours_batch():
+    """API endpoint to get the current planetary hour for many locations at once.
+
+    GET returns every saved location. POST accepts a JSON body of the form
+    {"locations": [{"lat": ..., "lng": ...}, ...]} or {"locations": "saved"}.
+    """
+    requested = "saved"
+    if request.method == "POST":
+        payload = request.get_json(silent=True) or {}
+        requested = payload.get("locations", "saved")
+    
+    saved_locations = []
+    if requested == "saved":
+        saved_locations = remember_location_timezones(Location.query.order_by(Location.id).all())
+        coordinates = [(loc.latitude, loc.longitude) for loc in saved_locations]
+    elif isinstance(requested, list):
+        try:
+            coordinates = [(float(loc["lat"]), float(loc["lng"])) for loc in requested]
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": "Invalid coordinates"}), 400
+    else:
+        return jsonify({"error": "locations must be a list or \"saved\""}), 400
+    
+    if len(coordinates) > app.config["BATCH_MAX_LOCATIONS"]:
+        return jsonify({"error": f"At most {app.config['BATCH_MAX_LOCATIONS']} locations per request"}), 400
+    
+    # One vectorized pass over all locations
+    results = get_current_planetary_hours_batch(
+        coordinates,
+        processes=app.config["BATCH_PROCESSES"] or None,
+        pool_threshold=app.config["BATCH_POOL_THRESHOLD"]
+    )
+    
+    # Label saved locations so dashboards can match rows
+    for loc, result in zip(saved_locations, results):
+        result["id"] = loc.id
+        result["name"] = loc.name
+    
+    return jsonify({"count": len(results), "locations": results})
+
+@app.route("/api/planetary_hours/find")
+def api_find_planetary_hours():
+    """API endpoint to find upcoming hours of a planet, e.g. the next Jupiter hour on a Thursday.
+
+    Query parameters: lat/lng, planet, day_planet, period (Day or Night),
+    start/end as ISO dates or datetimes (default now and a year later) and
+    limit (default 10, at most 1000).
+    """
+    lat = request.args.get("lat", "40.7128")
+    lng = request.args.get("lng", "-74.0060")
+    
+    try:
+        lat, lng = _coordinates(lat, lng)
+    except ValueError:
+        return jsonify({"error": "Invalid coordinates"}), 400
+    
+    try:
+        start = datetime.fromisoformat(request.args["start"]) if "start" in request.args else None
+        end = datetime.fromisoformat(request.args["end"]) if "end" in request.args else None
+        limit = _limit_arg()
+        hours = find_planetary_hours(
+            lat, lng,
+            planet=request.args.get("planet"),
+            day_planet=request.args.get("day_planet"),
+            period=request.args.get("period"),
+            start=start,
+            end=end,
+            limit=limit
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify({"count": len(hours), "hours": hours})
+
+@app.route("/api/elections")
+def api_elections():
+    """API endpoint ranking the hours of a date range against election criteria.
+
+    Query parameters: lat/lng, planet and day_planet (comma-separated names),
+    period (Day or Night), moon (waxing, waning, full or new), weight_<criterion>
+    for non-default weights, require (comma-separated criteria that must be
+    met, default planet), start/end as ISO dates or datetimes (default now
+    and a year later) and limit (default 10, at most 1000).
+    """
+    lat = request.args.get("lat", "40.7128")
+    lng = request.args.get("lng", "-74.0060")
+    
+    try:
+        lat, lng = _coordinates(lat, lng)
+    except ValueError:
+        return jsonify({"error": "Invalid coordinates"}), 400
+    
+    def names(param):
+        value = request.args.get(param)
+        return value.split(",") if value else None
+    
+    try:
+        start = _iso_date_or_datetime(request.args["start"]) if "start" in request.args else None
+        end = _iso_date_or_datetime(request.args["end"]) if "end" in request.args else None
+        limit = _limit_arg()
+        weights = {
+            name[len("weight_"):]: _number_arg(name)
+            for name in request.args if name.startswith("weight_")
+        }
+        elections = find_elections(
+            lat, lng,
+            start=start,
+            end=end,
+            planet=names("planet"),
+            day_planet=names("day_planet"),
+            period=request.args.get("period"),
+            moon=request.args.get("moon"),
+            weights=weights,
+            require=names("require") or ("planet",),
+            limit=limit
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify({"count": len(elections), "elections": elections})
+
+def _coordinates(lat, lng):
+    """lat and lng as floats; ValueError unless they are finite and within range."""
+    lat, lng = float(lat), float(lng)
+    if not valid_coordinates(lat, lng):
+        raise ValueError("Invalid coordinates")
+    return lat, lng
+
+def _limit_arg(default=10, maximum=1000):
+    """The limit query parameter, at most maximum; ValueError with a message for the client."""
+    value = request.args.get("limit")
+    if value is None:
+        return default
+    try:
+        return min(int(value), maximum)
+    except ValueError:
+        raise ValueError("limit must be an integer") from None
+
+def _number_arg(name):
+    try:
+        return float(request.args[name])
+    except ValueError:
+        raise ValueError(f"{name} must be a number") from None
+
+def _iso_date_or_datetime(value):
+    """A date for YYYY-MM-DD (whole days in elections), otherwise a datetime."""
+    return date.fromisoformat(value) if len(value) == 10 else datetime.fromisoformat(value)
+
+@app.route("/api/planetary_hours/stream")
+def api_planetary_hours_stream():
+    """Server-Sent Events stream that pushes an event at each planetary hour transition"""
+    lat = request.args.get("lat", "40.7128")
+    lng = request.args.get("lng", "-74.0060")
+    
+    try:
+        lat, lng = _coordinates(lat, lng)
+    except ValueError:
+        return jsonify({"error": "Invalid coordinates"}), 400
+    
+    return Response(
+        stream_transitions(lat, lng),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/api/export")
+def api_export():
+    """Stream planetary hours for a date range as CSV, JSON Lines or iCalendar.
+
+    Query parameters: lat/lng (or saved=1 for every saved location),
+    start/end as YYYY-MM-DD (inclusive, default the next 7 days) and
+    format (csv, ndjson or ics).
+    """
+    export_format = request.args.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    try:
+        start = date.fromisoformat(request.args["start"]) if "start" in request.args else date.today()
+        end = date.fromisoformat(request.args["end"]) if "end" in request.args else start + timedelta(days=6)
+    except ValueError:
+        return jsonify({"error": "Invalid date, expected YYYY-MM-DD"}), 400
+    if end < start:
+        return jsonify({"error": "end must not be before start"}), 400
+    if (end - start).days + 1 > app.config["EXPORT_MAX_DAYS"]:
+        return jsonify({"error": f"At most {app.config['EXPORT_MAX_DAYS']} days per export"}), 400
+    
+    if request.args.get("saved") == "1":
+        locations = saved_export_locations()
+    else:
+        try:
+            locations = [(None, *_coordinates(request.args.get("lat", "40.7128"), request.args.get("lng", "-74.0060")))]
+        except ValueError:
+            return jsonify({"error": "Invalid coordinates"}), 400
+    
+    exporter, mimetype, extension = EXPORT_FORMATS[export_format]
+    filename = f"planetary-hours-{start.isoformat()}-{end.isoformat()}.{extension}"
+    # No Content-Length, so the body goes out chunk by chunk as it is generated
+    return Response(
+        stream_with_context(exporter(locations, start, end)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Accel-Buffering": "no"}
+    )
 
 if __name__ == "__main__":
+    init_db()
     app.run(host="0.0.0.0", port=5000, debug=True)
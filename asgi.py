@@ -0,0 +1,292 @@
+"""ASGI entry point: the hot API endpoints on asyncio, everything else through Flask.
+
+    pip install .[asgi]
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+
+/api/planetary_hours, /api/planetary_hours/batch and
+/api/planetary_hours/stream are served natively with the same responses as
+the Flask views. Solar calculations run in a bounded thread pool so the
+event loop only waits on I/O, query logs and saved locations go through an
+async SQLAlchemy connection pool, and streams wait on the transition
+scheduler without holding a thread each. All other routes (pages,
+/metrics, exports, ...) are the Flask app mounted as WSGI.
+"""
+import asyncio
+import contextlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+try:
+    from a2wsgi import WSGIMiddleware
+    from starlette.applications import Starlette
+    from starlette.responses import Response, StreamingResponse
+    from starlette.routing import Mount, Route
+except ImportError as e:  # pragma: no cover - optional dependency
+    raise ImportError("ASGI mode needs the asgi extra: pip install .[asgi]") from e
+
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app as flask_module
+from app import app as flask_app, hour_cache
+from http_cache import etag_matches, get_hour_slot, slot_headers
+from metrics import http_request_duration, http_requests, registry, timed
+from models import Location, PlanetaryHourLog, PlanetaryHourRollup
+from planetary_hours import (
+    get_all_planetary_hours,
+    get_current_planetary_hour,
+    get_current_planetary_hour_info,
+    get_current_planetary_hours_batch,
+    get_planetary_day_info,
+    valid_coordinates
+)
+from query_log import AsyncQueryLogWriter
+from timezones import timezone_resolver
+from transitions import astream_transitions
+
+# Threads for CPU-bound calculations, and how many calls may wait for one
+# before requests are turned away with 503
+ASGI_WORKER_THREADS = int(os.environ.get("ASGI_WORKER_THREADS", str(min(32, (os.cpu_count() or 1) + 4))))
+ASGI_MAX_PENDING = int(os.environ.get("ASGI_MAX_PENDING", "256"))
+
+# Async connection pool (per worker process)
+ASYNC_DB_POOL_SIZE = int(os.environ.get("ASYNC_DB_POOL_SIZE", "10"))
+ASYNC_DB_MAX_OVERFLOW = int(os.environ.get("ASYNC_DB_MAX_OVERFLOW", "10"))
+
+# Sync driver -> async driver for the same database
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "mariadb": "mariadb+aiomysql"
+}
+
+def async_database_url(url):
+    """The async-driver form of a database URL (ASYNC_DATABASE_URL overrides it)."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {backend}; set ASYNC_DATABASE_URL")
+    if url.get_driver_name() in ("asyncpg", "aiosqlite", "aiomysql"):
+        return url
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+class Overloaded(Exception):
+    """Raised when the calculation pool already has max_pending calls waiting."""
+
+class BoundedExecutor:
+    """Thread pool for CPU-bound work with a cap on outstanding calls.
+
+    Beyond max_pending, calls fail fast with Overloaded instead of queueing
+    without bound, so latency stays predictable under overload.
+    """
+
+    def __init__(self, max_workers, max_pending):
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asgi-calc")
+
+    async def run(self, func, *args, **kwargs):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded()
+        # Only touched from the event loop thread, so no lock is needed
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args, **kwargs))
+        finally:
+            self.pending -= 1
+
+    def collect_metrics(self):
+        """Metrics collector for the /metrics endpoint."""
+        return [
+            ("planetary_asgi_pending_calculations", "gauge", "Calculations queued or running in the ASGI pool.", [({}, self.pending)]),
+            ("planetary_asgi_rejected_total", "counter", "Requests rejected because the ASGI pool was full.", [({}, self.rejected)])
+        ]
+
+calculations = BoundedExecutor(ASGI_WORKER_THREADS, ASGI_MAX_PENDING)
+registry.register_collector(calculations.collect_metrics)
+
+def _dumps(payload):
+    # Flask's provider with jsonify's compact separators, so PlanetaryHour and
+    # datetimes serialize exactly as in the Flask views
+    return flask_app.json.dumps(payload, separators=(",", ":")) + "\n"
+
+def _json(payload, status_code=200, headers=None):
+    return Response(_dumps(payload), status_code, headers, media_type="application/json")
+
+def _coordinates(request):
+    try:
+        lat = float(request.query_params.get("lat", "40.7128"))
+        lng = float(request.query_params.get("lng", "-74.0060"))
+    except ValueError:
+        return None
+    return (lat, lng) if valid_coordinates(lat, lng) else None
+
+def instrumented(endpoint):
+    """Record request count and latency under the Flask endpoint name, and map Overloaded to 503."""
+    async def handler(request):
+        start = time.perf_counter()
+        try:
+            response = await endpoint(request)
+        except Overloaded:
+            response = _json({"error": "Server busy, try again shortly"}, 503, {"Retry-After": "1"})
+        http_requests.inc(endpoint.__name__, request.method, str(response.status_code))
+        http_request_duration.observe(time.perf_counter() - start, endpoint.__name__)
+        return response
+    return handler
+
+def _current_hours_response(lat, lng, if_none_match):
+    """Everything /api/planetary_hours computes, off the event loop: (log row, slot, body or None for 304)."""
+    day_info = get_planetary_day_info(lat, lng)
+    hour = get_current_planetary_hour(lat, lng)
+    row = {
+        "latitude": lat,
+        "longitude": lng,
+        "day_planet": day_info["planet"],
+        "hour_planet": hour.planet,
+        "period": hour.period,
+        "hour_number": hour.hour_number
+    }
+    slot = get_hour_slot("api_planetary_hours", lat, lng)
+    if etag_matches(if_none_match, slot.etag):
+        hour_cache.count_not_modified()
+        return row, slot, None
+    if hour_cache.store_responses:
+        entry = hour_cache.lookup(slot)
+        if entry is not None:
+            return row, slot, entry[0]
+
+    current_hour = get_current_planetary_hour_info(lat, lng)
+    all_hours = get_all_planetary_hours(lat, lng)
+    with timed("render"):
+        body = _dumps({"day": day_info, "current_hour": current_hour, "all_hours": all_hours})
+    if hour_cache.store_responses:
+        hour_cache.store(slot, body.encode(), "application/json")
+    return row, slot, body
+
+async def api_planetary_hours(request):
+    """API endpoint to get planetary hour information"""
+    coordinates = _coordinates(request)
+    if coordinates is None:
+        return _json({"error": "Invalid coordinates"}, 400)
+
+    row, slot, body = await calculations.run(
+        _current_hours_response, *coordinates, request.headers.get("if-none-match")
+    )
+    await query_log.log(**row)
+
+    headers = slot_headers(slot)
+    if body is None:
+        return Response(status_code=304, headers=headers)
+    return Response(body, headers=headers, media_type="application/json")
+
+async def saved_locations():
+    """Saved locations in id order, seeding the timezone cache and storing any zone not saved yet."""
+    async with sessions() as session:
+        locations = (await session.execute(select(Location).order_by(Location.id))).scalars().all()
+        resolved = False
+        for loc in locations:
+            if loc.timezone:
+                timezone_resolver.remember(loc.latitude, loc.longitude, loc.timezone)
+            else:
+                loc.timezone = timezone_resolver.zone_name(loc.latitude, loc.longitude)
+                resolved = True
+        if resolved:
+            await session.commit()
+        return locations
+
+async def api_planetary_hours_batch(request):
+    """API endpoint to get the current planetary hour for many locations at once.
+
+    Same contract as the Flask view: GET for saved locations, POST with
+    {"locations": [{"lat": ..., "lng": ...}, ...]} or {"locations": "saved"}.
+    """
+    requested = "saved"
+    if request.method == "POST":
+        try:
+            payload = await request.json()
+        except ValueError:
+            payload = {}
+        if isinstance(payload, dict):
+            requested = payload.get("locations", "saved")
+
+    saved = []
+    if requested == "saved":
+        saved = await saved_locations()
+        coordinates = [(loc.latitude, loc.longitude) for loc in saved]
+    elif isinstance(requested, list):
+        try:
+            coordinates = [(float(loc["lat"]), float(loc["lng"])) for loc in requested]
+        except (KeyError, TypeError, ValueError):
+            return _json({"error": "Invalid coordinates"}, 400)
+    else:
+        return _json({"error": "locations must be a list or \"saved\""}, 400)
+
+    limit = flask_app.config["BATCH_MAX_LOCATIONS"]
+    if len(coordinates) > limit:
+        return _json({"error": f"At most {limit} locations per request"}, 400)
+
+    results = await calculations.run(
+        get_current_planetary_hours_batch, coordinates, processes=flask_app.config["BATCH_PROCESSES"] or None,
+        pool_threshold=flask_app.config["BATCH_POOL_THRESHOLD"]
+    )
+    for loc, result in zip(saved, results):
+        result["id"] = loc.id
+        result["name"] = loc.name
+
+    body = await calculations.run(_dumps, {"count": len(results), "locations": results})
+    return Response(body, media_type="application/json")
+
+async def api_planetary_hours_stream(request):
+    """Server-Sent Events stream that pushes an event at each planetary hour transition"""
+    coordinates = _coordinates(request)
+    if coordinates is None:
+        return _json({"error": "Invalid coordinates"}, 400)
+    return StreamingResponse(
+        astream_transitions(*coordinates, executor=calculations.executor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def create_engine_for(url):
+    """Async engine with a bounded connection pool for url."""
+    options = {"pool_pre_ping": True, "pool_recycle": 300}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(pool_size=ASYNC_DB_POOL_SIZE, max_overflow=ASYNC_DB_MAX_OVERFLOW)
+    return create_async_engine(url, **options)
+
+# Engines connect lazily, so this is safe at import time in every worker
+engine = create_engine_for(
+    os.environ.get("ASYNC_DATABASE_URL") or async_database_url(flask_app.config["SQLALCHEMY_DATABASE_URI"])
+)
+# Rows stay readable after commit without another round trip
+sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+query_log = AsyncQueryLogWriter.from_config(sessions, PlanetaryHourLog, flask_app.config, rollup_model=PlanetaryHourRollup)
+registry.register_collector(query_log.collect_metrics)
+
+@contextlib.asynccontextmanager
+async def lifespan(application):
+    query_log.start()
+    if flask_module.ephemeris_maintainer is not None:
+        flask_module.ephemeris_maintainer.ensure_started()
+    try:
+        yield
+    finally:
+        await query_log.stop()
+        await engine.dispose()
+
+app = Starlette(
+    routes=[
+        Route("/api/planetary_hours", instrumented(api_planetary_hours)),
+        Route("/api/planetary_hours/batch", instrumented(api_planetary_hours_batch), methods=["GET", "POST"]),
+        Route("/api/planetary_hours/stream", instrumented(api_planetary_hours_stream)),
+        Mount("/", WSGIMiddleware(flask_app))
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,72 @@
+"""Scaling benchmark for the almanac job: throughput by number of worker processes.
+
+    python -m benchmarks.almanac                          # 1, 2, 4, ... up to the CPU count
+    python -m benchmarks.almanac --locations 512 --processes 1 2 4 8
+
+Builds a one-year almanac for --locations points spread over the
+inhabited latitudes into a throwaway directory once per process count and
+reports hours/sec, the speedup over one process and the parallel
+efficiency (speedup / processes). Close to linear scaling shows up as an
+efficiency near 1.
+"""
+import argparse
+import os
+import tempfile
+from datetime import date, datetime
+
+import numpy as np
+
+from almanac import build_almanac
+from benchmarks.harness import machine_info, save
+
+def _locations(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        (f"point-{i}", float(lat), float(lng))
+        for i, (lat, lng) in enumerate(zip(rng.uniform(-55, 60, count), rng.uniform(-180, 180, count)))
+    ]
+
+def _process_counts():
+    counts, n = [], 1
+    while n < (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    return counts + [os.cpu_count() or 1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how the almanac job scales with processes")
+    parser.add_argument("--locations", type=int, default=256, help="number of locations")
+    parser.add_argument("--year", type=int, default=2027)
+    parser.add_argument("--processes", type=int, nargs="+", help="process counts (default: 1, 2, 4, ... CPUs)")
+    parser.add_argument("--shard-size", type=int, default=16, help="locations per shard")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/almanac-<timestamp>.json)")
+    args = parser.parse_args()
+
+    locations = _locations(args.locations)
+    start, end = date(args.year, 1, 1), date(args.year, 12, 31)
+    # Warm-up run, so the first measured count does not also pay for
+    # loading time zone data
+    with tempfile.TemporaryDirectory() as tmp:
+        build_almanac(locations, start, end, tmp, processes=1, shard_size=args.shard_size)
+    results = {}
+    for processes in args.processes or _process_counts():
+        with tempfile.TemporaryDirectory() as tmp:
+            report = build_almanac(locations, start, end, tmp, processes=processes, shard_size=args.shard_size)
+        baseline = results.get(1, report)["rows_per_sec"]
+        report["speedup"] = report["rows_per_sec"] / baseline
+        results[processes] = report
+        print(
+            f"{processes:>3} processes {report['rows_per_sec']:>12.0f} hours/s  "
+            f"speedup {report['speedup']:5.2f}  efficiency {report['speedup'] / processes:5.0%}"
+        )
+
+    output = args.output
+    if output is None:
+        results_dir = os.path.join(os.path.dirname(__file__), "results")
+        os.makedirs(results_dir, exist_ok=True)
+        output = os.path.join(results_dir, "almanac-" + datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    save({"machine": machine_info(), "locations": args.locations, "year": args.year, "almanac": results}, output)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
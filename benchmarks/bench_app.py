@@ -0,0 +1,46 @@
+"""End-to-end Flask test-client benchmarks, with SQLite standing in for Postgres."""
+import os
+
+import logging
+
+# Must be set before app is imported
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import app, init_db
+from benchmarks.harness import benchmark
+
+# app.py enables DEBUG logging, which would dominate the timings
+logging.getLogger().setLevel(logging.WARNING)
+
+init_db()
+client = app.test_client()
+HAS_INDEX_TEMPLATE = os.path.exists(os.path.join(app.root_path, app.template_folder, "index.html"))
+
+def _get(url, headers=None):
+    response = client.get(url, headers=headers)
+    assert response.status_code in (200, 304), f"{url} returned {response.status_code}"
+    return response
+
+if HAS_INDEX_TEMPLATE:
+    @benchmark("app")
+    def index():
+        _get("/?lat=40.7128&lng=-74.0060")
+
+@benchmark("app")
+def api_planetary_hours():
+    _get("/api/planetary_hours?lat=40.7128&lng=-74.0060")
+
+@benchmark("app")
+def api_planetary_hours_not_modified():
+    etag = _get("/api/planetary_hours?lat=51.5074&lng=-0.1278").headers["ETag"]
+    _get("/api/planetary_hours?lat=51.5074&lng=-0.1278", headers={"If-None-Match": etag})
+
+@benchmark("app")
+def api_planetary_hours_batch_100_locations():
+    locations = [{"lat": -50 + i, "lng": -170 + 3 * i} for i in range(100)]
+    response = client.post("/api/planetary_hours/batch", json={"locations": locations})
+    assert response.status_code == 200
+
+@benchmark("app")
+def log_query():
+    _get("/log_query?lat=40.7128&lng=-74.0060")
@@ -0,0 +1,165 @@
+"""Benchmarks for the planetary_hours library hot paths."""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+import elections
+import export
+import planetary_hours
+from benchmarks.harness import benchmark
+
+# (latitude, longitude) workloads
+NEW_YORK = (40.7128, -74.0060)
+TROMSO = (69.6492, 18.9553)
+LONGYEARBYEN = (78.2232, 15.6267)
+
+# A date on which every benchmark location has a sunrise and a sunset
+FIXED_DATE = datetime(2026, 3, 10, 12, 0)
+# Polar night at Tromsø and Longyearbyen, divided by the polar convention
+POLAR_NIGHT_DATE = datetime(2026, 12, 21, 12, 0)
+
+_random = np.random.default_rng(42)
+MANY_LOCATIONS = _random.uniform([-60, -180], [60, 180], size=(1000, 2)).tolist()
+# Beyond the polar circles, where many days have no sunrise or sunset
+POLAR_LOCATIONS = _random.uniform([66.6, -180], [89.9, 180], size=(1000, 2)).tolist()
+
+def clear_caches():
+    """Reset every in-process cache so "cold" benchmarks pay full cost."""
+    planetary_hours.solar_cache.clear()
+    planetary_hours._boundary_indexes.clear()
+    elections.moon_phases.clear()
+
+# Single location
+
+@benchmark("solar", setup=clear_caches, number=1)
+def calculate_sunrise_sunset_cold():
+    planetary_hours.calculate_sunrise_sunset(*NEW_YORK, FIXED_DATE)
+
+@benchmark("solar")
+def calculate_sunrise_sunset_cached():
+    planetary_hours.calculate_sunrise_sunset(*NEW_YORK, FIXED_DATE)
+
+@benchmark("solar", setup=clear_caches, number=1)
+def calculate_sunrise_sunset_polar_cold():
+    planetary_hours.calculate_sunrise_sunset(*LONGYEARBYEN, FIXED_DATE)
+
+@benchmark("solar", setup=clear_caches, number=1)
+def calculate_sunrise_sunset_polar_night_cold():
+    planetary_hours.calculate_sunrise_sunset(*LONGYEARBYEN, POLAR_NIGHT_DATE)
+
+@benchmark("solar")
+def calculate_sunrise_sunset_polar_night_cached():
+    planetary_hours.calculate_sunrise_sunset(*LONGYEARBYEN, POLAR_NIGHT_DATE)
+
+@benchmark("hours", setup=clear_caches, number=1)
+def get_planetary_hours_cold():
+    planetary_hours.get_planetary_hours(*NEW_YORK, FIXED_DATE)
+
+@benchmark("hours")
+def get_planetary_hours_cached():
+    planetary_hours.get_planetary_hours(*NEW_YORK, FIXED_DATE)
+
+@benchmark("hours")
+def get_planetary_hours_polar_cached():
+    planetary_hours.get_planetary_hours(*TROMSO, FIXED_DATE)
+
+@benchmark("hours")
+def get_planetary_hours_polar_night_cached():
+    planetary_hours.get_planetary_hours(*TROMSO, POLAR_NIGHT_DATE)
+
+@benchmark("hours")
+def get_day_planetary_hours_cached():
+    planetary_hours.get_day_planetary_hours(*NEW_YORK, FIXED_DATE)
+
+@benchmark("current", setup=clear_caches, number=1)
+def get_current_planetary_hour_info_cold():
+    planetary_hours.get_current_planetary_hour_info(*NEW_YORK, FIXED_DATE)
+
+@benchmark("current")
+def get_current_planetary_hour_info_cached():
+    planetary_hours.get_current_planetary_hour_info(*NEW_YORK, FIXED_DATE)
+
+# Multi-day
+
+@benchmark("multi_day", setup=clear_caches, number=1)
+def get_planetary_hours_30_day_loop():
+    for offset in range(30):
+        planetary_hours.get_planetary_hours(*NEW_YORK, FIXED_DATE + timedelta(days=offset))
+
+@benchmark("multi_day")
+def get_planetary_hours_range_365_days():
+    planetary_hours.get_planetary_hours_range(*NEW_YORK, date(2026, 1, 1), date(2026, 12, 31))
+
+@benchmark("multi_day")
+def get_planetary_hours_range_365_days_to_objects():
+    planetary_hours.get_planetary_hours_range(*NEW_YORK, date(2026, 1, 1), date(2026, 12, 31)).hours()
+
+@benchmark("multi_day")
+def get_planetary_hours_range_polar_60_days():
+    planetary_hours.get_planetary_hours_range(*TROMSO, date(2026, 2, 1), date(2026, 4, 1))
+
+@benchmark("multi_day")
+def get_planetary_hours_range_polar_365_days():
+    planetary_hours.get_planetary_hours_range(*LONGYEARBYEN, date(2026, 1, 1), date(2026, 12, 31))
+
+# Many locations
+
+@benchmark("many_locations", setup=clear_caches, number=1)
+def get_current_planetary_hour_100_locations_loop():
+    for latitude, longitude in MANY_LOCATIONS[:100]:
+        planetary_hours.get_current_planetary_hour(latitude, longitude, FIXED_DATE)
+
+@benchmark("many_locations")
+def get_current_planetary_hours_batch_1000_locations():
+    planetary_hours.get_current_planetary_hours_batch(MANY_LOCATIONS, FIXED_DATE)
+
+@benchmark("many_locations")
+def get_current_planetary_hours_batch_1000_polar_locations():
+    planetary_hours.get_current_planetary_hours_batch(POLAR_LOCATIONS, POLAR_NIGHT_DATE)
+
+# Search
+
+@benchmark("find")
+def find_next_5_jupiter_hours_on_thursday():
+    planetary_hours.find_planetary_hours(*NEW_YORK, planet="Jupiter", day_planet="Jupiter", start=FIXED_DATE, limit=5)
+
+@benchmark("find")
+def find_venus_hours_for_a_month():
+    planetary_hours.find_planetary_hours(*NEW_YORK, planet="Venus", start=FIXED_DATE, end=FIXED_DATE + timedelta(days=30))
+
+@benchmark("find")
+def find_venus_hours_for_a_polar_month():
+    planetary_hours.find_planetary_hours(
+        *LONGYEARBYEN, planet="Venus", start=POLAR_NIGHT_DATE, end=POLAR_NIGHT_DATE + timedelta(days=30)
+    )
+
+# Elections
+
+@benchmark("elections", setup=clear_caches, number=1)
+def find_elections_365_days_cold():
+    elections.find_elections(*NEW_YORK, FIXED_DATE, FIXED_DATE + timedelta(days=365), planet="Jupiter", moon="waxing")
+
+@benchmark("elections")
+def find_elections_365_days_cached():
+    elections.find_elections(
+        *NEW_YORK, FIXED_DATE, FIXED_DATE + timedelta(days=365),
+        planet=["Jupiter", "Venus"], day_planet="Jupiter", moon="full", require=("planet", "moon")
+    )
+
+# Exports
+
+def _drain(chunks):
+    for _ in chunks:
+        pass
+
+@benchmark("export", number=1)
+def export_csv_365_days_10_locations():
+    _drain(export.export_csv([(None, lat, lng) for lat, lng in MANY_LOCATIONS[:10]], date(2026, 1, 1), date(2026, 12, 31)))
+
+@benchmark("export", number=1)
+def export_csv_365_days_polar():
+    _drain(export.export_csv([(None, *LONGYEARBYEN)], date(2026, 1, 1), date(2026, 12, 31)))
+
+@benchmark("export", number=1)
+def export_ics_365_days():
+    _drain(export.export_ics([(None, *NEW_YORK)], date(2026, 1, 1), date(2026, 12, 31)))
@@ -0,0 +1,127 @@
+"""Cold-start benchmark: how long a fresh worker takes to import the app and answer.
+
+    python -m benchmarks.cold_start              # 5 runs per scenario
+    python -m benchmarks.cold_start --runs 10 --output cold.json
+
+Every scenario runs in a new interpreter against a throwaway SQLite
+database with a few saved locations (or DATABASE_URL when set):
+
+- import: importing app (schema creation is now an explicit step)
+- import_create_all: the same with DB_CREATE_ALL=1, i.e. the old behaviour
+  of running db.create_all() on every import
+- cold_worker: import, then the first /api/planetary_hours response
+- preforked_worker: the first response of a worker forked from a master
+  that already imported the app and ran warm_caches(), as gunicorn.conf.py
+  does (fork to first response only)
+
+Reports the median and minimum of each scenario in milliseconds.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+START = time.perf_counter()
+
+SCENARIOS = ("import", "import_create_all", "cold_worker", "preforked_worker")
+SAVED_LOCATIONS = (("New York", 40.7128, -74.0060), ("London", 51.5074, -0.1278), ("Tokyo", 35.6762, 139.6503))
+REQUEST = "/api/planetary_hours?lat=40.7128&lng=-74.0060"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _first_response(app):
+    response = app.test_client().get(REQUEST)
+    assert response.status_code == 200, response.status_code
+
+def _child(scenario):
+    """Run one scenario in this (fresh) process and return its timings in seconds."""
+    import logging
+    import app as app_module
+    imported = time.perf_counter()
+    logging.getLogger().setLevel(logging.WARNING)
+    timings = {"import": imported - START}
+
+    if scenario == "cold_worker":
+        _first_response(app_module.app)
+        timings["first_response"] = time.perf_counter() - imported
+    elif scenario == "preforked_worker":
+        app_module.warm_caches()
+        read_end, write_end = os.pipe()
+        forked = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            _first_response(app_module.app)
+            os.write(write_end, str(time.perf_counter() - forked).encode())
+            os._exit(0)
+        os.close(write_end)
+        with os.fdopen(read_end) as pipe:
+            timings["first_response"] = float(pipe.read())
+        os.waitpid(pid, 0)
+    return timings
+
+def _prepare_database(env):
+    script = (
+        "import app\n"
+        "app.init_db()\n"
+        "with app.app.app_context():\n"
+        f"    for name, lat, lng in {SAVED_LOCATIONS!r}:\n"
+        "        app.db.session.add(app.Location(name=name, latitude=lat, longitude=lng))\n"
+        "    app.db.session.commit()\n"
+    )
+    subprocess.run([sys.executable, "-c", script], env=env, cwd=ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def run_scenario(scenario, env):
+    env = dict(env, DB_CREATE_ALL="1" if scenario == "import_create_all" else "0")
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.cold_start", "--child", scenario],
+        env=env, cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app import and first-response time")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per scenario")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/cold-start-<timestamp>.json)")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.child)))
+        return
+
+    from benchmarks.harness import machine_info, save
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        if "DATABASE_URL" not in env:
+            env["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'cold.db')}"
+            _prepare_database(env)
+        for scenario in SCENARIOS:
+            runs = [run_scenario(scenario, env) for _ in range(args.runs)]
+            summary = {}
+            for phase in runs[0]:
+                samples = [run[phase] for run in runs]
+                summary[phase] = {"median": statistics.median(samples), "min": min(samples)}
+            results[scenario] = summary
+            phases = "  ".join(
+                f"{phase} {1000 * stats['median']:7.1f} ms (min {1000 * stats['min']:.1f})"
+                for phase, stats in summary.items()
+            )
+            print(f"{scenario:<18} {phases}")
+
+    output = args.output
+    if output is None:
+        results_dir = os.path.join(os.path.dirname(__file__), "results")
+        os.makedirs(results_dir, exist_ok=True)
+        output = os.path.join(results_dir, "cold-start-" + datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    save({"machine": machine_info(), "runs": args.runs, "cold_start": results}, output)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Check the spatial grid error bound against exact calculate_sunrise_sunset results.
+
+    python -m benchmarks.grid_error [--cell 0.05] [--locations 300] [--output grid.json]
+
+Samples random locations with |latitude| <= 60 over a year, compares the
+grid-mode sunrise/sunset (nearest node and interpolated) with exact mode,
+and exits non-zero if the 99th percentile error exceeds the declared bound.
+"""
+import argparse
+import json
+import sys
+from datetime import date
+
+import numpy as np
+
+import planetary_hours
+
+# Declared 99th-percentile bound for interpolated lookups (cells up to 0.1 degrees)
+INTERPOLATED_BOUND_SECONDS = 1.0
+
+def _events(locations, dates):
+    results = []
+    for latitude, longitude in locations:
+        for day in dates:
+            try:
+                sunrise, sunset = planetary_hours.calculate_sunrise_sunset(latitude, longitude, day)
+            except ValueError:
+                results.append((np.nan, np.nan))
+                continue
+            results.append((sunrise.timestamp(), sunset.timestamp()))
+    return np.array(results)
+
+def _wrapped_error(a, b):
+    # Neighbouring coordinates may pick an event on an adjacent date
+    return np.abs((a - b + 43200) % 86400 - 43200)
+
+def measure(cell, count, seed=0):
+    rng = np.random.default_rng(seed)
+    latitudes = rng.uniform(-60, 60, count)
+    longitudes = rng.uniform(-180, 180, count)
+    locations = list(zip(latitudes.tolist(), longitudes.tolist()))
+    dates = [date(2026, month, 15) for month in range(1, 13)]
+
+    planetary_hours.configure_solar_grid(None)
+    exact = _events(locations, dates)
+    planetary_hours.configure_solar_grid(cell)
+    nearest = _events(locations, dates)
+    planetary_hours.configure_solar_grid(cell, interpolate=True)
+    interpolated = _events(locations, dates)
+    planetary_hours.configure_solar_grid(None)
+
+    report = {"cell_degrees": cell, "samples": int(np.isfinite(exact).sum())}
+    for name, values in (("nearest", nearest), ("interpolated", interpolated)):
+        error = _wrapped_error(values, exact)
+        error = error[np.isfinite(error)]
+        report[name] = {
+            "p50": float(np.percentile(error, 50)),
+            "p99": float(np.percentile(error, 99)),
+            "max": float(error.max())
+        }
+    report["declared_nearest_p99"] = planetary_hours.GRID_ERROR_SECONDS_PER_DEGREE * cell
+    report["declared_interpolated_p99"] = INTERPOLATED_BOUND_SECONDS
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Grid-mode error against exact sunrise/sunset")
+    parser.add_argument("--cell", type=float, default=0.05, help="grid cell size in degrees")
+    parser.add_argument("--locations", type=int, default=300, help="random locations to sample")
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    report = measure(args.cell, args.locations)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    ok = (
+        report["nearest"]["p99"] <= report["declared_nearest_p99"]
+        and report["interpolated"]["p99"] <= report["declared_interpolated_p99"]
+    )
+    if not ok:
+        print("Grid error exceeds the declared bound", file=sys.stderr)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
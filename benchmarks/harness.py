@@ -0,0 +1,115 @@
+"""Minimal benchmark runner that stores results as JSON.
+
+Benchmarks register themselves with the @benchmark decorator. Each one is a
+zero-argument callable; an optional setup callable runs before every timed
+batch (e.g. to clear caches for "cold" variants).
+"""
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+BENCHMARKS = []
+
+def benchmark(group, name=None, setup=None, number=None):
+    """Register a function as a benchmark in the given group."""
+    def decorator(func):
+        BENCHMARKS.append({
+            "group": group,
+            "name": name or func.__name__,
+            "func": func,
+            "setup": setup,
+            "number": number
+        })
+        return func
+    return decorator
+
+def _calibrate(func, setup, min_time=0.05):
+    """Pick a loop count so one batch takes at least min_time seconds."""
+    number = 1
+    while True:
+        elapsed = _time_batch(func, setup, number)
+        if elapsed >= min_time or number >= 1_000_000:
+            return number
+        number *= 10 if elapsed < min_time / 10 else 2
+
+def _time_batch(func, setup, number):
+    if setup is not None:
+        setup()
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return time.perf_counter() - start
+
+def run_benchmark(entry, repeat=5):
+    """Time one benchmark; returns per-call statistics in seconds."""
+    func, setup = entry["func"], entry["setup"]
+    number = entry["number"] or _calibrate(func, setup)
+    samples = [_time_batch(func, setup, number) / number for _ in range(repeat)]
+    return {
+        "group": entry["group"],
+        "name": entry["name"],
+        "number": number,
+        "repeat": repeat,
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "ops_per_sec": 1 / min(samples) if min(samples) > 0 else None
+    }
+
+def machine_info():
+    """Environment details stored alongside results so runs can be compared."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+def run_all(pattern=None, repeat=5, stream=sys.stdout):
+    """Run every registered benchmark whose "group.name" contains pattern."""
+    results = []
+    for entry in BENCHMARKS:
+        full_name = f"{entry['group']}.{entry['name']}"
+        if pattern and pattern not in full_name:
+            continue
+        result = run_benchmark(entry, repeat)
+        results.append(result)
+        stream.write(f"{full_name:<60} {format_seconds(result['median']):>12}  (min {format_seconds(result['min'])})\n")
+        stream.flush()
+    return {"machine": machine_info(), "benchmarks": results}
+
+def format_seconds(seconds):
+    """Human-readable duration."""
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+def save(report, path):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+def compare(old_path, new_path, stream=sys.stdout):
+    """Print the median change for benchmarks present in both result files."""
+    with open(old_path) as f:
+        old = {f"{b['group']}.{b['name']}": b for b in json.load(f)["benchmarks"]}
+    with open(new_path) as f:
+        new = {f"{b['group']}.{b['name']}": b for b in json.load(f)["benchmarks"]}
+
+    for name in sorted(old.keys() & new.keys()):
+        before, after = old[name]["median"], new[name]["median"]
+        ratio = after / before if before else float("inf")
+        stream.write(f"{name:<60} {format_seconds(before):>12} -> {format_seconds(after):>12}  x{ratio:.2f}\n")
@@ -0,0 +1,231 @@
+"""HTTP load test comparing the gunicorn (WSGI) and uvicorn (ASGI) deployments.
+
+    python -m benchmarks.load                                 # start both, compare
+    python -m benchmarks.load --servers asgi --concurrency 128 --duration 30
+    python -m benchmarks.load --url http://localhost:5000     # an already running server
+    python -m benchmarks.load --path "/api/planetary_hours/batch"
+
+Each server is started on a free local port against a throwaway SQLite
+database (or DATABASE_URL when set), warmed up, then kept busy by
+--concurrency keep-alive connections for --duration seconds. Requests
+cycle through --path (default /api/planetary_hours for a spread of
+cities). Reports requests/sec, latency percentiles and errors per server
+and saves them as JSON next to the other benchmark results.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from benchmarks.harness import format_seconds, machine_info, save
+
+CITIES = (
+    (40.7128, -74.0060), (51.5074, -0.1278), (35.6762, 139.6503), (-33.8688, 151.2093),
+    (48.8566, 2.3522), (55.7558, 37.6173), (-23.5505, -46.6333), (19.4326, -99.1332),
+    (28.6139, 77.2090), (30.0444, 31.2357), (1.3521, 103.8198), (64.1466, -21.9426)
+)
+DEFAULT_PATHS = tuple(f"/api/planetary_hours?lat={lat}&lng={lng}" for lat, lng in CITIES)
+
+# server name -> command; {port} and {workers} are filled in
+SERVERS = {
+    "wsgi": ["gunicorn", "--bind", "127.0.0.1:{port}", "--workers", "{workers}", "main:app"],
+    "asgi": ["uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", "{port}", "--workers", "{workers}",
+             "--log-level", "warning"]
+}
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class Connection:
+    """Minimal HTTP/1.1 keep-alive client (Content-Length, chunked or close-delimited bodies)."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def get(self, path):
+        """Send a GET and return the status code."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n\r\n".encode())
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip().lower()
+
+        if "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif status not in (204, 304):
+            await self.reader.read()
+            headers["connection"] = "close"
+
+        if headers.get("connection") == "close":
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+async def _worker(host, port, paths, offset, deadline, latencies, errors):
+    connection = Connection(host, port)
+    i = offset
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            status = await connection.get(path)
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+            connection.close()
+            errors["connection"] = errors.get("connection", 0) + 1
+            continue
+        if status >= 400:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+async def _load(host, port, paths, concurrency, duration):
+    latencies, errors = [], {}
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _worker(host, port, paths, i, deadline, latencies, errors) for i in range(concurrency)
+    ))
+    return latencies, errors, time.perf_counter() - started
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_load(url, paths, concurrency, duration, warmup=2.0):
+    """Drive url with concurrency connections; returns throughput and latency statistics."""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    if warmup:
+        asyncio.run(_load(host, port, paths, concurrency, warmup))
+    latencies, errors, elapsed = asyncio.run(_load(host, port, paths, concurrency, duration))
+    latencies.sort()
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "duration": elapsed,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50": _percentile(latencies, 0.50),
+        "p90": _percentile(latencies, 0.90),
+        "p99": _percentile(latencies, 0.99),
+        "max": latencies[-1] if latencies else None
+    }
+
+def _wait_until_ready(url, process, timeout=60.0):
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        try:
+            with socket.create_connection((parts.hostname, parts.port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server did not start listening within {timeout:.0f}s")
+
+def start_server(name, workers, env):
+    """Start one of SERVERS on a free port; returns (process, url)."""
+    port = _free_port()
+    command = [part.format(port=port, workers=workers) for part in SERVERS[name]]
+    process = subprocess.Popen(
+        command, env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_ready(url, process)
+    except RuntimeError:
+        process.kill()
+        raise
+    return process, url
+
+def _print_result(name, result, stream=sys.stdout):
+    errors = sum(result["errors"].values())
+    stream.write(
+        f"{name:<6} {result['requests_per_sec']:>10.1f} req/s  "
+        f"p50 {format_seconds(result['p50'] or 0):>10}  p99 {format_seconds(result['p99'] or 0):>10}  "
+        f"max {format_seconds(result['max'] or 0):>10}  errors {errors}\n"
+    )
+    stream.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the WSGI and ASGI deployments")
+    parser.add_argument("--servers", nargs="+", choices=sorted(SERVERS), default=["wsgi", "asgi"])
+    parser.add_argument("--url", help="test an already running server instead of starting any")
+    parser.add_argument("--path", action="append", dest="paths", help="request path (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per server")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="server worker processes")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/load-<timestamp>.json)")
+    args = parser.parse_args()
+    paths = tuple(args.paths or DEFAULT_PATHS)
+
+    results = {}
+    if args.url:
+        results["url"] = run_load(args.url, paths, args.concurrency, args.duration)
+        _print_result("url", results["url"])
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, QUERY_LOG_ASYNC="1")
+            env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp, 'load.db')}")
+            # Create the tables once, before any server starts
+            subprocess.run([sys.executable, "-c", "import app; app.init_db()"], env=env, check=True,
+                           cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            for name in args.servers:
+                process, url = start_server(name, args.workers, env)
+                try:
+                    results[name] = run_load(url, paths, args.concurrency, args.duration)
+                finally:
+                    process.terminate()
+                    process.wait(timeout=30)
+                results[name]["workers"] = args.workers
+                _print_result(name, results[name])
+
+    output = args.output
+    if output is None:
+        results_dir = os.path.join(os.path.dirname(__file__), "results")
+        os.makedirs(results_dir, exist_ok=True)
+        output = os.path.join(results_dir, "load-" + datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    save({"machine": machine_info(), "paths": list(paths), "load": results}, output)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Run the benchmark suite.
+
+    python -m benchmarks.run                      # run everything, save JSON
+    python -m benchmarks.run -k multi_day         # only matching benchmarks
+    python -m benchmarks.run --compare old.json new.json
+"""
+import argparse
+import os
+from datetime import datetime
+
+from benchmarks import harness
+
+SUITES = ("benchmarks.bench_planetary_hours", "benchmarks.bench_app")
+
+def main():
+    parser = argparse.ArgumentParser(description="Planetary hours benchmark suite")
+    parser.add_argument("-k", dest="pattern", help="only run benchmarks whose group.name contains this")
+    parser.add_argument("--repeat", type=int, default=5, help="timed batches per benchmark")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        harness.compare(*args.compare)
+        return
+
+    for suite in SUITES:
+        __import__(suite)
+
+    report = harness.run_all(args.pattern, args.repeat)
+
+    output = args.output
+    if output is None:
+        results_dir = os.path.join(os.path.dirname(__file__), "results")
+        os.makedirs(results_dir, exist_ok=True)
+        output = os.path.join(results_dir, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    harness.save(report, output)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Elections: ranking the planetary hours of a date range against a set of criteria.
+
+    find_elections(40.7128, -74.0060, date(2027, 1, 1), date(2027, 12, 31),
+                   planet="Jupiter", day_planet="Jupiter", moon="waxing")
+
+Each criterion scores every candidate hour between 0 and 1:
+
+- planet: the hour is ruled by one of the given planets
+- day_planet: the planetary day (sunrise to sunrise) is ruled by one of them
+- period: the hour is in the "Day" or "Night"
+- moon: "waxing" or "waning" (0 or 1), or "full" or "new" (1 at the exact
+  phase, falling to 0 at the opposite one)
+
+An hour's score is the weighted sum of its criteria (weight 1 unless given
+in weights). Criteria named in require must score above one half, which
+for moon="full" means between the first and last quarter. The whole range
+comes from one get_planetary_hours_range table and is scored as arrays;
+the moon phase is taken from astral once per UTC day (cached in
+moon_phases) and interpolated to the middle of each hour.
+"""
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from astral import moon
+
+import solar
+from planetary_hours import (
+    DAY_RULER_INDEX,
+    FIND_MAX_DAYS,
+    MICROSECONDS,
+    PERIODS,
+    PLANETARY_HOUR_SEQUENCE,
+    WEEKDAY_PLANETS,
+    epoch_microseconds,
+    get_planetary_hours_range,
+    location_time
+)
+
+CRITERIA = ("planet", "day_planet", "period", "moon")
+MOON_CRITERIA = ("waxing", "waning", "full", "new")
+
+# astral's phase runs from 0 (new) through 7 (first quarter), 14 (full) and
+# 21 (last quarter) back to 0 over one lunation
+LUNATION = 28.0
+FULL_MOON = 14.0
+
+_DAY_US = 86400 * MICROSECONDS
+
+class MoonPhaseCache:
+    """astral's moon phase at 00:00 UTC per day, computed once per day."""
+
+    def __init__(self, maxsize=36600):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._phases = {}
+        self._lock = threading.Lock()
+
+    def phases(self, days):
+        """Phases for an array of datetime64[D] days."""
+        ordinals = days.astype("datetime64[D]").astype(np.int64).tolist()
+        result = np.empty(len(ordinals))
+        with self._lock:
+            for i, ordinal in enumerate(ordinals):
+                phase = self._phases.get(ordinal)
+                if phase is None:
+                    self.misses += 1
+                    phase = moon.phase(date(1970, 1, 1) + timedelta(days=ordinal))
+                    if len(self._phases) >= self.maxsize:
+                        self._phases.clear()
+                    self._phases[ordinal] = phase
+                else:
+                    self.hits += 1
+                result[i] = phase
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._phases.clear()
+
+    def stats(self):
+        """Return a snapshot of the cache counters."""
+        with self._lock:
+            return {"size": len(self._phases), "hits": self.hits, "misses": self.misses}
+
+moon_phases = MoonPhaseCache()
+
+def moon_phase_at(epoch_us):
+    """astral moon phase (0-28) at int64 epoch microseconds, interpolated between UTC midnights."""
+    epoch_us = np.asarray(epoch_us, dtype=np.int64)
+    days = epoch_us // _DAY_US
+    fraction = (epoch_us - days * _DAY_US) / _DAY_US
+    first = int(days.min())
+    phases = moon_phases.phases(np.arange(first, int(days.max()) + 2).astype("datetime64[D]"))
+    before = phases[days - first]
+    after = phases[days - first + 1]
+    return (before + (after - before) % LUNATION * fraction) % LUNATION
+
+def moon_scores(phase, criterion):
+    """Score (0-1) of moon phases for one of MOON_CRITERIA."""
+    if criterion == "waxing":
+        return (phase < FULL_MOON).astype(float)
+    if criterion == "waning":
+        return (phase >= FULL_MOON).astype(float)
+    fullness = 1.0 - np.abs(phase - FULL_MOON) / FULL_MOON
+    return fullness if criterion == "full" else 1.0 - fullness
+
+def moon_phase_name(phase):
+    """The quarter of a phase, as astral names them."""
+    return ("New moon", "First quarter", "Full moon", "Last quarter")[int(phase // 7) % 4]
+
+class Election:
+    """A candidate planetary hour with its score."""
+
+    __slots__ = ("hour", "score", "day_planet", "moon_phase", "matched")
+
+    def __init__(self, hour, score, day_planet, moon_phase, matched):
+        self.hour = hour
+        self.score = score
+        self.day_planet = day_planet
+        self.moon_phase = moon_phase
+        self.matched = matched
+
+    def __repr__(self):
+        return f"<Election {self.score:.2f}: {self.hour!r}>"
+
+    def to_dict(self):
+        """The hour's fields plus score, day planet, moon phase and the criteria it met."""
+        result = self.hour.to_dict()
+        result.update(
+            score=self.score,
+            day_planet=self.day_planet,
+            moon_phase=round(self.moon_phase, 2),
+            moon=moon_phase_name(self.moon_phase),
+            matched=self.matched
+        )
+        return result
+
+def _planet_indexes(planets, names, label):
+    if isinstance(planets, str):
+        planets = [planets]
+    for planet in planets:
+        if planet not in names:
+            raise ValueError(f"Unknown {label}: {planet}")
+    return [PLANETARY_HOUR_SEQUENCE.index(planet) for planet in planets]
+
+def find_elections(latitude, longitude, start=None, end=None, planet=None, day_planet=None, period=None,
+                   moon=None, weights=None, require=("planet",), limit=10):
+    """Rank the planetary hours from start to end by how well they meet the criteria.
+
+    planet and day_planet take a name or a list of names, period "Day" or
+    "Night" and moon one of MOON_CRITERIA; criteria left as None are not
+    scored. start and end are datetimes at the location (default now and
+    FIND_MAX_DAYS later) or dates, which cover whole days with end
+    inclusive. Returns up to limit Elections, best
+    first and earliest first among equal scores.
+    """
+    weights = dict(weights or {})
+    for name in list(weights) + list(require):
+        if name not in CRITERIA:
+            raise ValueError(f"Unknown criterion: {name}")
+    if period is not None and period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    if moon is not None and moon not in MOON_CRITERIA:
+        raise ValueError(f"moon must be one of {', '.join(MOON_CRITERIA)}")
+    if limit is not None and limit <= 0:
+        return []
+
+    # Plain dates cover whole local days, end inclusive
+    if isinstance(start, date) and not isinstance(start, datetime):
+        start = datetime.combine(start, datetime.min.time())
+    if isinstance(end, date) and not isinstance(end, datetime):
+        end = datetime.combine(end + timedelta(days=1), datetime.min.time())
+    start = location_time(latitude, longitude, start)
+    end = location_time(latitude, longitude, end) if end is not None else start + timedelta(days=FIND_MAX_DAYS)
+    if end <= start:
+        raise ValueError("end must be after start")
+
+    # Before sunrise, start still falls in the previous planetary day's night
+    table = get_planetary_hours_range(
+        latitude, longitude, start.date() - timedelta(days=1), end.date(), skip_polar=True
+    )
+    rows = np.flatnonzero(
+        table.valid() & (table.end > epoch_microseconds(start)) & (table.start < epoch_microseconds(end))
+    )
+    if not len(rows):
+        return []
+
+    hour_planet = table.planet[rows]
+    day_ruler = np.repeat(DAY_RULER_INDEX[solar.weekdays(table.days)], 24)[rows]
+    phase = moon_phase_at(table.start[rows] // 2 + table.end[rows] // 2)
+
+    scores = {}
+    if planet is not None:
+        scores["planet"] = np.isin(hour_planet, _planet_indexes(planet, PLANETARY_HOUR_SEQUENCE, "planet"))
+    if day_planet is not None:
+        scores["day_planet"] = np.isin(day_ruler, _planet_indexes(day_planet, WEEKDAY_PLANETS.values(), "day planet"))
+    if period is not None:
+        scores["period"] = table.period[rows] == PERIODS.index(period)
+    if moon is not None:
+        scores["moon"] = moon_scores(phase, moon)
+
+    total = np.zeros(len(rows))
+    keep = np.ones(len(rows), dtype=bool)
+    for name, score in scores.items():
+        total += weights.get(name, 1.0) * score
+        if name in require:
+            keep &= score > 0.5
+
+    candidates = np.flatnonzero(keep)
+    # Best score first, earliest first among equals
+    ranked = candidates[np.lexsort((table.start[rows][candidates], -total[candidates]))]
+    if limit is not None:
+        ranked = ranked[:limit]
+
+    return [
+        Election(
+            table.hour(int(rows[i])),
+            round(float(total[i]), 4),
+            PLANETARY_HOUR_SEQUENCE[day_ruler[i]],
+            float(phase[i]),
+            [name for name, score in scores.items() if score[i] > 0.5]
+        )
+        for i in ranked.tolist()
+    ]
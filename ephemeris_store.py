@@ -0,0 +1,257 @@
+"""Precomputed sunrise/sunset store for saved locations.
+
+The store is a single binary file: a fixed header, a table of location
+coordinates and an int64 array of shape (locations, days, 2) holding
+sunrise and sunset as epoch microseconds, for calendar days in each
+location's own time zone. Every worker process maps it
+read-only, so lookups are array indexing and the pages are shared through
+the OS page cache. Rebuilds write a new file and atomically replace the
+old one; readers notice the new inode and remap.
+"""
+import fcntl
+import logging
+import os
+import struct
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+import solar
+from timezones import day_offsets, timezone_resolver
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PHEPHEM2"
+# magic, location count, day count, first day (days since 1970-01-01)
+HEADER = struct.Struct("<8sqqq")
+# Marks a day with no sunrise or sunset (polar day/night)
+MISSING = np.iinfo(np.int64).min
+
+def build_ephemeris_file(path, locations, start, days, precision=4):
+    """Compute sunrise/sunset for every location over days days and write the store atomically."""
+    coordinates = np.round(np.asarray(locations, dtype=np.float64).reshape(-1, 2), precision)
+    start_day = np.datetime64(start, "D")
+    day_range = start_day + np.arange(days)
+
+    # Each location's UTC offset on each day decides which local date an event falls on
+    utc_offsets = np.array([
+        day_offsets(timezone_resolver.resolve(lat, lng), day_range) for lat, lng in coordinates.tolist()
+    ]).reshape(len(coordinates), days)
+
+    # One vectorized pass over the (locations x days) grid. Polar days are
+    # stored as missing, so lookups fall through and are divided by the
+    # convention configured at request time
+    sunrise, sunset, _ = solar.solar_events(
+        coordinates[:, :1], coordinates[:, 1:], day_range[None, :], utc_offsets, convention="none"
+    )
+    events = np.rint(np.stack([sunrise, sunset], axis=-1) * 1_000_000)
+    data = np.where(np.isnan(events), MISSING, np.nan_to_num(events)).astype(np.int64)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(coordinates), days, int(start_day.astype(np.int64))))
+        f.write(coordinates.astype("<f8").tobytes())
+        f.write(data.astype("<i8").tobytes())
+    os.replace(tmp_path, path)
+
+class EphemerisStore:
+    """Read-only, memory-mapped view of an ephemeris file.
+
+    A loaded file is published as one (rows, first_day, days, events)
+    tuple, so a lookup racing a reload sees either the old file or the new
+    one, never the row map of one with the events of the other.
+    """
+
+    def __init__(self, path, reload_interval=5.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._table = None
+        self._identity = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def first_day(self):
+        table = self._table
+        return table[1] if table is not None else None
+
+    @property
+    def days(self):
+        table = self._table
+        return table[2] if table is not None else 0
+
+    def lookup(self, latitude, longitude, day):
+        """Return (sunrise, sunset) epoch microseconds for a local date, or None if not stored.
+
+        latitude/longitude must already be quantized like the store's keys.
+        """
+        self._maybe_reload()
+        table = self._table
+        if table is None:
+            return None
+        rows, first_day, days, events = table
+        row = rows.get((latitude, longitude))
+        if row is None:
+            return None
+        offset = (day - first_day).days
+        if not 0 <= offset < days:
+            return None
+        sunrise, sunset = events[row, offset]
+        if sunrise == MISSING or sunset == MISSING:
+            return None
+        return int(sunrise), int(sunset)
+
+    def covers(self, locations, precision=4):
+        """Whether the loaded file holds exactly these locations (rounded as build_ephemeris_file does)."""
+        table = self._table
+        stored = set(table[0]) if table is not None else set()
+        coordinates = np.round(np.asarray(locations, dtype=np.float64).reshape(-1, 2), precision)
+        return stored == {(lat, lng) for lat, lng in coordinates.tolist()}
+
+    def reload(self):
+        """Re-check the file now instead of waiting for reload_interval."""
+        self._maybe_reload(force=True)
+
+    def remaining_days(self, today=None):
+        """Days of horizon left from today (0 when missing or stale)."""
+        self.reload()
+        table = self._table
+        if table is None:
+            return 0
+        _, first_day, days, _ = table
+        today = today or date.today()
+        if today < first_day:
+            return 0
+        return max(0, days - (today - first_day).days)
+
+    def _maybe_reload(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._checked < self.reload_interval:
+            return
+        with self._lock:
+            self._checked = now
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._table = None
+                self._identity = None
+                return
+            identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if identity != self._identity:
+                self._table = self._load()
+                self._identity = identity
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            magic, count, days, first_day = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                logger.warning("Ignoring %s: not an ephemeris file", self.path)
+                return None
+            coordinates = np.frombuffer(f.read(count * 16), dtype="<f8").reshape(-1, 2)
+        if not count or not days:
+            return None
+
+        events = np.memmap(
+            self.path, dtype="<i8", mode="r",
+            offset=HEADER.size + count * 16, shape=(count, days, 2)
+        )
+        rows = {(float(lat), float(lng)): row for row, (lat, lng) in enumerate(coordinates)}
+        return rows, np.datetime64(first_day, "D").item(), days, events
+
+class EphemerisMaintainer:
+    """Background job that keeps the store's horizon rolling and picks up location changes.
+
+    invalidate() requests a rebuild (e.g. after a location is added or
+    deleted); otherwise the store is rebuilt when fewer than min_remaining
+    days are left. A file lock makes sure only one worker rebuilds at a time.
+    A requested rebuild stays pending while another worker holds the lock
+    (that rebuild may have read the locations before the change) and is
+    retried every retry_interval seconds until it has run here. Once the
+    lock is taken, a store that already holds the current locations with
+    enough days left is not rebuilt again.
+    """
+
+    def __init__(self, store, load_locations, horizon_days=366, min_remaining=30, check_interval=3600,
+                 lock_timeout=30, retry_interval=5):
+        self.store = store
+        self.load_locations = load_locations
+        self.horizon_days = horizon_days
+        self.min_remaining = min_remaining
+        self.check_interval = check_interval
+        self.lock_timeout = lock_timeout
+        self.retry_interval = retry_interval
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        """Start the background thread in this process (again after a fork)."""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="ephemeris-maintainer", daemon=True)
+            self._thread.start()
+
+    def invalidate(self):
+        """Ask for a rebuild as soon as possible."""
+        self._wakeup.set()
+        self.ensure_started()
+
+    def rebuild(self, timeout=0, force=False):
+        """Rebuild the store now; returns False if another process held the lock for more than timeout seconds.
+
+        Unless force is set, a store that another worker rebuilt while this
+        one waited for the lock (same locations, enough days left) is kept.
+        """
+        lock_path = f"{self.store.path}.lock"
+        deadline = time.monotonic() + timeout
+        with open(lock_path, "w") as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        return False
+                    time.sleep(0.1)
+            try:
+                locations = self.load_locations()
+                self.store.reload()
+                if (not force and self.store.remaining_days() >= self.min_remaining
+                        and self.store.covers(locations or np.empty((0, 2)))):
+                    return True
+                # Start at yesterday so pre-sunrise lookups are covered too
+                start = date.today() - timedelta(days=1)
+                build_ephemeris_file(
+                    self.store.path, locations or np.empty((0, 2)),
+                    start, self.horizon_days
+                )
+                logger.info("Rebuilt ephemeris for %d locations", len(locations))
+                # Pick the new file up immediately in this process
+                self.store.reload()
+                return True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _run(self):
+        pending = False
+        while True:
+            pending = pending or self._wakeup.is_set()
+            self._wakeup.clear()
+            interval = self.check_interval
+            try:
+                if pending or self.store.remaining_days() < self.min_remaining:
+                    if self.rebuild(timeout=self.lock_timeout):
+                        pending = False
+                    else:
+                        logger.info("Ephemeris rebuild in progress elsewhere; retrying in %ss", self.retry_interval)
+                        interval = self.retry_interval
+            except Exception:
+                logger.exception("Ephemeris rebuild failed")
+            self._wakeup.wait(interval)
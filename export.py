@@ -0,0 +1,173 @@
+"""Streaming planetary-hour exports (CSV, JSON Lines, iCalendar).
+
+Every exporter is a generator that yields one text chunk per location-day,
+so a year for hundreds of locations is written out without ever holding
+more than one chunk of days in memory.
+"""
+import csv
+import io
+import json
+import time
+from datetime import timedelta
+
+import numpy as np
+
+from planetary_hours import (
+    MICROSECONDS,
+    PERIODS,
+    PLANET_DATA,
+    PLANETARY_HOUR_SEQUENCE,
+    get_planetary_hours_range
+)
+from timezones import utc_offsets
+
+# Days computed per vectorized range call
+EXPORT_CHUNK_DAYS = 31
+
+COLUMNS = (
+    "location", "latitude", "longitude", "date", "day_planet", "hour_number",
+    "period", "planet", "archangel", "angel", "start_time", "end_time"
+)
+
+_PLANETS = np.array(PLANETARY_HOUR_SEQUENCE, dtype=object)
+_ARCHANGELS = np.array([PLANET_DATA[planet]["archangel"] for planet in PLANETARY_HOUR_SEQUENCE], dtype=object)
+_ANGELS = np.array([PLANET_DATA[planet]["angel"] for planet in PLANETARY_HOUR_SEQUENCE], dtype=object)
+_PERIODS = np.array(PERIODS, dtype=object)
+
+def iter_location_tables(latitude, longitude, start, end, chunk_days=EXPORT_CHUNK_DAYS):
+    """Yield PlanetaryHourTables covering start to end (inclusive), one chunk of days at a time.
+
+    Polar days and nights are divided by the configured polar convention;
+    under "none" they are skipped.
+    """
+    day = start
+    while day <= end:
+        chunk_end = min(end, day + timedelta(days=chunk_days - 1))
+        table = get_planetary_hours_range(latitude, longitude, day, chunk_end, skip_polar=True)
+        if len(table):
+            yield table
+        day = chunk_end + timedelta(days=1)
+
+def _iso_strings(micros, tzinfo):
+    """ISO 8601 local times (to the second) for an array of epoch microseconds."""
+    seconds = micros // MICROSECONDS
+    offsets = utc_offsets(tzinfo, seconds).astype(np.int64)
+    local = np.datetime_as_string((seconds + offsets).astype("datetime64[s]"), unit="s")
+    suffixes = {}
+    for offset in np.unique(offsets).tolist():
+        sign = "-" if offset < 0 else "+"
+        hours, minutes = divmod(abs(offset) // 60, 60)
+        suffixes[offset] = f"{sign}{hours:02d}:{minutes:02d}"
+    return [text + suffixes[offset] for text, offset in zip(local.tolist(), offsets.tolist())]
+
+def iter_export_days(locations, start, end):
+    """Yield (location, rows, starts, ends) per location and day.
+
+    rows are the day's 24 hours as tuples in COLUMNS order; starts and ends
+    are their boundaries in epoch seconds.
+
+    locations is an iterable of (name, latitude, longitude); name may be None.
+    Strings are built per chunk of days with numpy rather than per hour.
+    """
+    for location in locations:
+        name, latitude, longitude = location
+        for table in iter_location_tables(latitude, longitude, start, end):
+            planets = _PLANETS[table.planet].tolist()
+            columns = list(zip(
+                table.hour_number.tolist(),
+                _PERIODS[table.period].tolist(),
+                planets,
+                _ARCHANGELS[table.planet].tolist(),
+                _ANGELS[table.planet].tolist(),
+                _iso_strings(table.start, table.tzinfo),
+                _iso_strings(table.end, table.tzinfo)
+            ))
+            starts = (table.start / MICROSECONDS).tolist()
+            ends = (table.end / MICROSECONDS).tolist()
+            for i, day in enumerate(table.days.tolist()):
+                # Hour 1 of the day is ruled by the planet of the day
+                prefix = (name or "", latitude, longitude, day.isoformat(), planets[i * 24])
+                hours = slice(i * 24, (i + 1) * 24)
+                yield location, [prefix + row for row in columns[hours]], starts[hours], ends[hours]
+
+def export_csv(locations, start, end):
+    """Yield CSV text: a header row, then one row per planetary hour."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for _, rows, _, _ in iter_export_days(locations, start, end):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_ndjson(locations, start, end):
+    """Yield JSON Lines: one object per planetary hour."""
+    for _, rows, _, _ in iter_export_days(locations, start, end):
+        yield "".join(json.dumps(dict(zip(COLUMNS, row))) + "\n" for row in rows)
+
+def _ics_escape(text):
+    return str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def _ics_time(epoch):
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(int(epoch)))
+
+def _ics_fold(line):
+    # RFC 5545: lines longer than 75 octets continue on lines starting with a space
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # Do not split a multi-byte character
+        while cut and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+    parts.append(encoded.decode())
+    return "\r\n ".join(parts) + "\r\n"
+
+def export_ics(locations, start, end):
+    """Yield an iCalendar file with one VEVENT per planetary hour."""
+    yield (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        "PRODID:-//Planetary Hours Calculator//EN\r\n"
+        "CALSCALE:GREGORIAN\r\n"
+        "X-WR-CALNAME:Planetary Hours\r\n"
+    )
+    stamp = _ics_time(time.time())
+    for (name, latitude, longitude), rows, starts, ends in iter_export_days(locations, start, end):
+        place = f" ({name})" if name else ""
+        location_line = ("LOCATION:" + _ics_escape(name),) if name else ()
+        lines = []
+        for row, hour_start, hour_end in zip(rows, starts, ends):
+            _, _, _, _, day_planet, hour_number, period, planet, archangel, angel, _, _ = row
+            lines.extend((
+                "BEGIN:VEVENT",
+                f"UID:{round(hour_start)}-{latitude:.4f}-{longitude:.4f}@planetary-hours",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART:{_ics_time(hour_start)}",
+                f"DTEND:{_ics_time(hour_end)}",
+                "SUMMARY:" + _ics_escape(f"Hour of {planet}{place}"),
+                "DESCRIPTION:" + _ics_escape(
+                    f"{period} hour {hour_number} on the day of {day_planet}. "
+                    f"Archangel: {archangel}. Angel: {angel}."
+                ),
+                f"GEO:{latitude:.6f};{longitude:.6f}",
+                *location_line,
+                "TRANSP:TRANSPARENT",
+                "END:VEVENT"
+            ))
+        yield "".join(_ics_fold(line) for line in lines)
+    yield "END:VCALENDAR\r\n"
+
+# format -> (exporter, mimetype, file extension)
+EXPORT_FORMATS = {
+    "csv": (export_csv, "text/csv", "csv"),
+    "ndjson": (export_ndjson, "application/x-ndjson", "ndjson"),
+    "ics": (export_ics, "text/calendar", "ics")
+}
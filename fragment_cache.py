@@ -0,0 +1,216 @@
+"""Rendered template fragments shared between page views.
+
+The main page is mostly made of parts that change far less often than the
+page is requested: the table of the day's 24 hours only changes with the
+date at a location, and the day and current-hour panels only at the
+next hour boundary. Templates wrap such parts in a call block
+
+    {% call cached_fragment(fragments.hour_table) %}
+      <table>{% for hour in all_hours %}...{% endfor %}</table>
+    {% endcall %}
+
+and the body is rendered once per key until it expires; other views just
+stitch the stored HTML in. Keys are FragmentSlots from page_fragments().
+Fragments live in a bounded in-process LRU (MemoryFragmentStore, which has
+the get/set interface of a shared store such as Redis) or in a directory
+shared by all workers on a host (FileFragmentStore).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from markupsafe import Markup
+
+from planetary_hours import get_hour_boundary_index, location_time
+from timezones import timezone_resolver
+
+class FragmentSlot:
+    """Cache key of a fragment and the epoch time it stops being valid."""
+
+    def __init__(self, key, expires):
+        self.key = key
+        self.expires = expires
+
+def page_fragments(latitude, longitude, current_time=None):
+    """FragmentSlots for the parts of a page about a location.
+
+    hour_table is keyed on the location and local date and lasts until
+    midnight there; day_info and hour_info are keyed on the location and the
+    current planetary hour and last until it ends (or midnight, if sooner).
+    Keys hold the exact coordinates rather than the solar cache's grid
+    cell, since with interpolation each point in a cell has its own times,
+    and the time zone, since times are shown in local time.
+    """
+    current_time = location_time(latitude, longitude, current_time)
+    index = get_hour_boundary_index(latitude, longitude, current_time)
+    hour_start, hour_end = index.bounds(index.lookup(current_time.timestamp()))
+    midnight = location_time(
+        latitude, longitude, datetime.combine(current_time.date() + timedelta(days=1), datetime.min.time())
+    ).timestamp()
+
+    day = (
+        float(latitude), float(longitude), timezone_resolver.zone_name(latitude, longitude),
+        current_time.date().isoformat()
+    )
+    hour = day + (round(hour_start, 3),)
+    return {
+        "hour_table": FragmentSlot(("hour_table",) + day, midnight),
+        "day_info": FragmentSlot(("day_info",) + hour, min(hour_end, midnight)),
+        "hour_info": FragmentSlot(("hour_info",) + hour, min(hour_end, midnight))
+    }
+
+class MemoryFragmentStore:
+    """Bounded LRU of (expires, html) per key in this process."""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, html, expires):
+        with self._lock:
+            self._entries[key] = (expires, html)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class FileFragmentStore:
+    """Fragments as files in a directory, shared by every worker process on a host.
+
+    Each file holds the expiry time on its first line and the HTML after
+    it, and is written atomically. Every prune_every writes, expired files
+    are deleted and the least recently written ones beyond maxsize too.
+    """
+
+    def __init__(self, path, maxsize=4096, prune_every=256):
+        self.path = path
+        self.maxsize = maxsize
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, hashlib.sha1(repr(key).encode()).hexdigest() + ".html")
+
+    def get(self, key, now):
+        try:
+            with open(self._file(key), encoding="utf-8") as f:
+                expires = float(f.readline())
+                if expires <= now:
+                    return None
+                return f.read()
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, html, expires):
+        path = self._file(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(f"{expires!r}\n")
+            f.write(html)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if prune:
+            self.prune()
+
+    def prune(self, now=None):
+        """Delete expired fragments, then the oldest beyond maxsize."""
+        if now is None:
+            now = time.time()
+        files = []
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith(".html"):
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    expires = float(f.readline())
+                mtime = entry.stat().st_mtime
+            except (OSError, ValueError):
+                continue
+            if expires <= now:
+                self._remove(entry.path)
+            else:
+                files.append((mtime, entry.path))
+        files.sort()
+        for _, path in files[:max(0, len(files) - self.maxsize)]:
+            self._remove(path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            # Another worker got there first
+            pass
+
+    def __len__(self):
+        return sum(1 for name in os.listdir(self.path) if name.endswith(".html"))
+
+    def clear(self):
+        for name in os.listdir(self.path):
+            if name.endswith(".html"):
+                self._remove(os.path.join(self.path, name))
+
+class FragmentCache:
+    """Render each fragment once per FragmentSlot and reuse the HTML until it expires."""
+
+    def __init__(self, store=None, enabled=True):
+        self.store = MemoryFragmentStore() if store is None else store
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_render(self, slot, render):
+        """The stored HTML for slot, or render() stored until slot.expires."""
+        if not self.enabled:
+            return Markup(render())
+        now = time.time()
+        html = self.store.get(slot.key, now)
+        if html is not None:
+            self._count(hit=True)
+            return Markup(html)
+        self._count(hit=False)
+        html = str(render())
+        if slot.expires > now:
+            self.store.set(slot.key, html, slot.expires)
+        return Markup(html)
+
+    def jinja_fragment(self, slot, caller):
+        """Template global for {% call cached_fragment(slot) %}...{% endcall %}."""
+        return self.get_or_render(slot, caller)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        """Return a snapshot of the cache counters."""
+        with self._lock:
+            return {"size": len(self.store), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,33 @@
+"""gunicorn settings (loaded automatically from the working directory).
+
+The app is imported once in the master and its caches are warmed there
+(time zone data, today's hours for every saved location, the ephemeris
+file), so workers forked from it start warm and share that memory
+copy-on-write. GUNICORN_PRELOAD=0 goes back to importing the app in each
+worker; GUNICORN_WARM_CACHES=0 preloads without warming.
+"""
+import logging
+import os
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before workers are forked
+    if not preload_app or os.environ.get("GUNICORN_WARM_CACHES", "1") != "1":
+        return
+    from app import warm_caches
+    try:
+        warmed = warm_caches()
+    except Exception:
+        # A cold cache is only slower; never keep the server from starting
+        logging.getLogger(__name__).exception("Cache warm-up failed")
+        return
+    server.log.info("Warmed caches for %d saved locations", warmed)
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    # Connections opened in the master must not be shared with the workers
+    from app import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,150 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask import make_response, request, session
+from werkzeug.http import http_date, parse_etags, quote_etag
+
+from planetary_hours import get_hour_boundary_index, location_time
+from timezones import timezone_resolver
+
+class HourSlot:
+    """The planetary hour a response belongs to, and how long it stays valid."""
+
+    def __init__(self, key, etag, expires):
+        self.key = key
+        self.etag = etag
+        self.expires = expires
+
+    def max_age(self, now=None):
+        """Seconds until the slot ends (never negative)."""
+        if now is None:
+            now = time.time()
+        return max(0, int(self.expires - now))
+
+def get_hour_slot(endpoint, latitude, longitude, current_time=None):
+    """Identify the hour slot for an endpoint and location.
+
+    The slot ends at the next planetary-hour boundary or at midnight at the
+    location, whichever comes first, since pages also show the calendar day.
+    """
+    current_time = location_time(latitude, longitude, current_time)
+    epoch = current_time.timestamp()
+
+    index = get_hour_boundary_index(latitude, longitude, current_time)
+    hour_start, hour_end = index.bounds(index.lookup(epoch))
+
+    midnight = location_time(latitude, longitude, datetime.combine(current_time.date() + timedelta(days=1), datetime.min.time()))
+    expires = min(hour_end, midnight.timestamp())
+
+    # The exact coordinates, not the solar cache's grid cell: responses show
+    # them, and with interpolation every point in a cell has its own times
+    zone = timezone_resolver.zone_name(latitude, longitude)
+    key = (endpoint, float(latitude), float(longitude), zone, current_time.date().isoformat(), round(hour_start, 3))
+    etag = hashlib.sha1(repr(key).encode()).hexdigest()
+    return HourSlot(key, etag, expires)
+
+class HourResponseCache:
+    """Conditional responses and an optional rendered-response cache per hour slot.
+
+    Every response gets an ETag for its slot and a Cache-Control max-age
+    running to the end of the slot, so clients and CDNs can reuse it until
+    the hour changes; If-None-Match requests are answered with 304. When
+    store_responses is on, rendered bodies are also kept in a bounded LRU.
+    Fields that depend on the exact request time (current_time, progress)
+    reflect the first render in the slot.
+    """
+
+    def __init__(self, store_responses=False, maxsize=2048):
+        self.store_responses = store_responses
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def respond(self, slot, render):
+        """Return a 304, a cached response or a fresh render() for the slot."""
+        now = time.time()
+
+        if request.if_none_match.contains(slot.etag):
+            self.count_not_modified()
+            response = make_response("", 304)
+            return self._add_headers(response, slot, now)
+
+        # Pages carrying one-off flash messages are rendered fresh and never shared
+        storable = self.store_responses and "_flashes" not in session
+
+        if storable:
+            entry = self.lookup(slot, now)
+            if entry is not None:
+                body, mimetype = entry
+                response = make_response(body)
+                response.mimetype = mimetype
+                return self._add_headers(response, slot, now)
+
+        response = make_response(render())
+
+        if storable and response.status_code == 200:
+            self.store(slot, response.get_data(), response.mimetype)
+
+        return self._add_headers(response, slot, now)
+
+    def lookup(self, slot, now=None):
+        """Return the stored (body, mimetype) for a slot, or None; counts a hit or miss."""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            entry = self._responses.get(slot.key)
+            if entry is not None and entry[0] > now:
+                self._responses.move_to_end(slot.key)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+            return None
+
+    def store(self, slot, body, mimetype):
+        """Keep a rendered body until the slot expires."""
+        with self._lock:
+            self._responses[slot.key] = (slot.expires, body, mimetype)
+            self._responses.move_to_end(slot.key)
+            while len(self._responses) > self.maxsize:
+                self._responses.popitem(last=False)
+
+    def count_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self):
+        """Return a snapshot of the cache counters."""
+        with self._lock:
+            return {
+                "size": len(self._responses),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified
+            }
+
+    def _add_headers(self, response, slot, now):
+        response.set_etag(slot.etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = slot.max_age(now)
+        response.expires = datetime.fromtimestamp(slot.expires).astimezone()
+        return response
+
+def slot_headers(slot, now=None):
+    """ETag, Cache-Control and Expires header values for a slot, for non-Flask responses."""
+    return {
+        "ETag": quote_etag(slot.etag),
+        "Cache-Control": f"public, max-age={slot.max_age(now)}",
+        "Expires": http_date(slot.expires)
+    }
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value matches an (unquoted) ETag."""
+    if not if_none_match:
+        return False
+    return parse_etags(if_none_match).contains(etag)
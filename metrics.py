@@ -0,0 +1,229 @@
+import cProfile
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets (seconds) shared by all histograms
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+def _format_labels(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative histogram with optional labels."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for labels, (bucket_counts, count, total) in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(names, labels + (bound,))} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + ('+Inf',))} {count}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+        return lines
+
+class MetricsRegistry:
+    """Holds metrics and scrape-time collectors, and renders Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """Add a callable returning [(name, type, help, [(labels dict, value), ...]), ...] at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        # Several collectors can report the same family (one cache_collector
+        # per cache); the text format wants each family's HELP and TYPE once,
+        # with all of its samples together
+        families = {}
+        for collector in self._collectors:
+            for name, metric_type, documentation, samples in collector():
+                family = families.setdefault(name, (metric_type, documentation, []))
+                family[2].extend(samples)
+        for name, (metric_type, documentation, samples) in families.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {value}")
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry and the metrics recorded by the application
+registry = MetricsRegistry()
+
+stage_duration = registry.histogram(
+    "planetary_stage_duration_seconds",
+    "Time spent in each hot-path stage (solar, hour_table, db_write, render).",
+    ("stage",)
+)
+http_requests = registry.counter(
+    "planetary_http_requests_total",
+    "HTTP requests by endpoint, method and status.",
+    ("endpoint", "method", "status")
+)
+http_request_duration = registry.histogram(
+    "planetary_http_request_duration_seconds",
+    "HTTP request latency by endpoint.",
+    ("endpoint",)
+)
+profiled_requests = registry.counter(
+    "planetary_profiled_requests_total",
+    "Slow requests whose cProfile stats were dumped.",
+    ("endpoint",)
+)
+
+@contextmanager
+def timed(stage):
+    """Record the duration of the with-block under the given stage label."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_duration.observe(time.perf_counter() - start, stage)
+
+def cache_collector(name, stats):
+    """Build a collector exposing hits, misses and hit ratio from a stats() callable."""
+    def collect():
+        snapshot = stats()
+        hits = snapshot.get("hits", 0)
+        misses = snapshot.get("misses", 0)
+        lookups = hits + misses
+        labels = {"cache": name}
+        return [
+            ("planetary_cache_hits_total", "counter", "Cache hits.", [(labels, hits)]),
+            ("planetary_cache_misses_total", "counter", "Cache misses.", [(labels, misses)]),
+            ("planetary_cache_hit_ratio", "gauge", "Cache hits / lookups.", [(labels, hits / lookups if lookups else 0.0)]),
+            ("planetary_cache_entries", "gauge", "Entries currently cached.", [(labels, snapshot.get("size", 0))])
+        ]
+    return collect
+
+class SlowRequestProfiler:
+    """Opt-in sampling profiler that dumps cProfile stats for slow requests.
+
+    Disabled unless a threshold is configured; then a sample_rate fraction
+    of requests runs under cProfile and those slower than threshold_ms are
+    written to output_dir as <timestamp>-<endpoint>.prof.
+    """
+
+    def __init__(self, threshold_ms=None, sample_rate=0.01, output_dir="profiles"):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+
+    @property
+    def enabled(self):
+        return self.threshold_ms is not None
+
+    def start(self):
+        """Return a running profiler for this request, or None if not sampled."""
+        if random.random() >= self.sample_rate:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return None
+        return profiler
+
+    def finish(self, profiler, endpoint, elapsed):
+        profiler.disable()
+        if elapsed * 1000 < self.threshold_ms:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(elapsed * 1000)}ms-{endpoint}.prof"
+        profiler.dump_stats(os.path.join(self.output_dir, filename))
+        profiled_requests.inc(endpoint)
+
+def instrument_app(app, profiler=None):
+    """Count and time every request and expose /metrics in Prometheus text format."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_profiler = profiler.start() if profiler is not None and profiler.enabled else None
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or "unknown"
+        http_requests.inc(endpoint, request.method, str(response.status_code))
+        http_request_duration.observe(elapsed, endpoint)
+
+        running = g.pop("metrics_profiler", None)
+        if running is not None:
+            profiler.finish(running, endpoint, elapsed)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        """Prometheus metrics endpoint"""
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
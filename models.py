@@ -8,6 +8,7 @@ class Location(db.Model):
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
     is_default = db.Column(db.Boolean, default=False)
+    timezone = db.Column(db.String(64))  # IANA zone, resolved offline from the coordinates
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
@@ -22,7 +23,33 @@ class PlanetaryHourLog(db.Model):
     hour_planet = db.Column(db.String(20), nullable=False)
     period = db.Column(db.String(10), nullable=False)  # 'Day' or 'Night'
     hour_number = db.Column(db.Integer, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     def __repr__(self):
-        return f'<PlanetaryHourLog {self.day_planet}/{self.hour_planet} at {self.timestamp}>'
\ No newline at end of file
+        return f'<PlanetaryHourLog {self.day_planet}/{self.hour_planet} at {self.timestamp}>'
+
+class PlanetaryHourRollup(db.Model):
+    """Query counts per UTC day, planets, hour and 1-degree location cell.
+
+    Maintained incrementally as query logs are written, so statistics never
+    need to scan PlanetaryHourLog and raw rows can be pruned.
+    """
+    __table_args__ = (
+        db.UniqueConstraint(
+            "date", "day_planet", "hour_planet", "period", "hour_number", "lat_cell", "lng_cell",
+            name="uq_planetary_hour_rollup_key"
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    day_planet = db.Column(db.String(20), nullable=False)
+    hour_planet = db.Column(db.String(20), nullable=False)
+    period = db.Column(db.String(10), nullable=False)
+    hour_number = db.Column(db.Integer, nullable=False)
+    lat_cell = db.Column(db.Integer, nullable=False)  # floor(latitude)
+    lng_cell = db.Column(db.Integer, nullable=False)  # floor(longitude)
+    queries = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<PlanetaryHourRollup {self.date} {self.day_planet}/{self.hour_planet}: {self.queries}>'
@@ -1,18 +1,64 @@
+import bisect
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
 import pytz
 from astral import LocationInfo
-from astral.sun import sun
-from astral.geocoder import database, lookup
-from datetime import datetime, timedelta
+from astral.sun import sunrise as astral_sunrise, sunset as astral_sunset
+from datetime import datetime, time as time_type, timedelta
+
+import solar
+from metrics import timed
+from timezones import day_offsets, local_datetime, localize, timezone_resolver, utc_offsets
 
 # Helper function to ensure datetimes are timezone-aware
-def ensure_timezone_aware(dt):
-    """Ensure datetime is timezone-aware by adding local timezone if needed."""
+def ensure_timezone_aware(dt, tzinfo=None):
+    """Ensure datetime is timezone-aware by adding tzinfo (default: the server's zone) if needed."""
     if dt.tzinfo is None:
-        # Get user's local timezone
+        if tzinfo is not None:
+            return localize(dt, tzinfo)
+        # Get the server's local timezone
         local_timezone = datetime.now().astimezone().tzinfo
         return dt.replace(tzinfo=local_timezone)
     return dt
 
+def location_timezone(latitude, longitude):
+    """The IANA time zone of a location (offline lookup, cached per coordinate)."""
+    return timezone_resolver.resolve(latitude, longitude)
+
+def location_date(latitude, longitude, dt=None):
+    """The calendar date at the location for dt (default now); naive datetimes and dates are taken as local."""
+    if dt is None:
+        return local_datetime(time.time(), timezone_resolver.resolve(latitude, longitude)).date()
+    if not isinstance(dt, datetime):
+        return dt
+    if dt.tzinfo is None:
+        return dt.date()
+    return localize(dt, timezone_resolver.resolve(latitude, longitude)).date()
+
+def location_time(latitude, longitude, dt=None):
+    """Return dt (default now) as an aware datetime in the location's own time zone.
+
+    Naive datetimes are read as wall-clock time at the location and plain
+    dates as local noon on that date.
+    """
+    tz = timezone_resolver.resolve(latitude, longitude)
+    if dt is None:
+        return local_datetime(time.time(), tz)
+    if not isinstance(dt, datetime):
+        dt = datetime.combine(dt, time_type(12))
+    return localize(dt, tz)
+
+def valid_coordinates(latitude, longitude):
+    """Whether latitude and longitude are finite and within -90..90 and -180..180."""
+    return (
+        math.isfinite(latitude) and math.isfinite(longitude)
+        and -90 <= latitude <= 90 and -180 <= longitude <= 180
+    )
+
 # Planetary correspondences according to The Greater Key of Solomon
 # Planetary rulership days (starting from Sunday)
 WEEKDAY_PLANETS = {
@@ -97,10 +143,185 @@ PLANET_DATA = {
     }
 }
 
-def calculate_sunrise_sunset(latitude, longitude, date=None):
-    """Calculate sunrise and sunset times for a given location and date."""
-    if date is None:
-        date = datetime.now()
+# Sunrise/sunset error per degree of grid cell size when snapping to the
+# nearest grid node: 99th percentile over |latitude| <= 60 degrees, measured
+# against exact results (0.05 degree cells -> 12 s). Errors grow towards the
+# polar circles. Bilinear interpolation between the four surrounding nodes
+# brings the 99th percentile below 1 s for cells up to 0.1 degrees.
+GRID_ERROR_SECONDS_PER_DEGREE = 240
+
+class SolarEventCache:
+    """Bounded, thread-safe LRU cache of sunrise/sunset events.
+
+    Entries are keyed by a quantized location plus the calendar date, so every
+    request (and every thread of a worker) asking for the same place and day
+    shares a single astral computation.
+
+    By default coordinates are rounded to precision decimals. In grid mode
+    (grid = cell size in degrees) they snap to the nearest grid node, so
+    arbitrary user coordinates collapse to a bounded set of cells; see
+    GRID_ERROR_SECONDS_PER_DEGREE for the resulting error.
+    """
+
+    def __init__(self, maxsize=4096, ttl=6 * 3600, precision=4, grid=None, interpolate=False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.precision = precision
+        self.grid = grid
+        self.interpolate = interpolate
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def quantize(self, latitude, longitude):
+        """Round coordinates to the cache precision (4 decimals is ~11 m) or the nearest grid node."""
+        if self.grid:
+            return (
+                round(round(float(latitude) / self.grid) * self.grid, 6),
+                round(round(float(longitude) / self.grid) * self.grid, 6)
+            )
+        return round(float(latitude), self.precision), round(float(longitude), self.precision)
+
+    def max_error_seconds(self):
+        """Declared 99th-percentile sunrise/sunset error of nearest-node grid mode (0 when exact)."""
+        if not self.grid:
+            return 0.0
+        return GRID_ERROR_SECONDS_PER_DEGREE * self.grid
+
+    def make_key(self, latitude, longitude, date):
+        """Build the cache key for a location and date."""
+        lat, lng = self.quantize(latitude, longitude)
+        # astral resolves the day in the timezone of an aware datetime, so the
+        # offset is part of the key
+        offset = date.utcoffset() if isinstance(date, datetime) else None
+        day = date.date() if isinstance(date, datetime) else date
+        return (lat, lng, day, offset)
+
+    def get_or_compute(self, latitude, longitude, date, compute):
+        """Return cached events for the key, calling compute(lat, lng, date) on a miss."""
+        key = self.make_key(latitude, longitude, date)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+
+        # Compute outside the lock; a concurrent miss on the same key only
+        # costs a duplicate computation
+        value = compute(key[0], key[1], date)
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return value
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Return a snapshot of the cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "grid": self.grid,
+                "interpolate": self.interpolate
+            }
+
+# Shared cache used by every public function in this module
+solar_cache = SolarEventCache()
+
+def configure_solar_grid(cell_degrees=None, interpolate=False):
+    """Switch the shared cache to grid mode (cell size in degrees), or back to exact mode with None.
+
+    With interpolate, sunrise/sunset are interpolated bilinearly between the
+    four cached grid nodes around each location instead of taken from the
+    nearest node.
+    """
+    solar_cache.grid = cell_degrees or None
+    solar_cache.interpolate = bool(cell_degrees and interpolate)
+    solar_cache.clear()
+    with _boundary_lock:
+        _boundary_indexes.clear()
+
+# Optional precomputed EphemerisStore consulted before astral (see ephemeris_store)
+ephemeris_store = None
+
+def set_ephemeris_store(store):
+    """Install (or with None, remove) the precomputed ephemeris used on cache misses."""
+    global ephemeris_store
+    ephemeris_store = store
+
+# How days without a sunrise or sunset are divided (one of solar.POLAR_CONVENTIONS)
+polar_convention = "civil_twilight"
+
+def configure_polar_convention(convention):
+    """Choose how polar days and nights are divided into hours ("none" makes them errors)."""
+    global polar_convention
+    if convention not in solar.POLAR_CONVENTIONS:
+        raise ValueError(f"Unknown polar convention: {convention}")
+    polar_convention = convention
+    solar_cache.clear()
+    with _boundary_lock:
+        _boundary_indexes.clear()
+
+_UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=pytz.UTC)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+def _polar_solar_events(latitude, longitude, date):
+    """Sun events for a day astral cannot divide: a sunset after local midnight, or a
+    polar day divided by polar_convention (None under "none")."""
+    # The neighbouring days are included so events out of order with them are caught too
+    days = np.datetime64(date.date(), "D") + np.arange(-1, 2)
+    sunrise, sunset, _ = solar.solar_events(
+        latitude, longitude, days, date.utcoffset().total_seconds(), polar_convention
+    )
+    if np.isnan(sunrise[1]) or np.isnan(sunset[1]):
+        return None
+    return (
+        _UNIX_EPOCH + timedelta(microseconds=int(np.rint(sunrise[1] * MICROSECONDS))),
+        _UNIX_EPOCH + timedelta(microseconds=int(np.rint(sunset[1] * MICROSECONDS)))
+    )
+
+def _compute_solar_events(latitude, longitude, date):
+    """Run the astral computation for a location and date (returns UTC times).
+
+    Polar days and nights, where astral raises, come from the vectorized
+    engine instead; the result (None when polar_convention is "none") is
+    cached like any other, so astral is not retried on every request.
+    """
+    # Saved locations are served straight from the memory-mapped ephemeris
+    if ephemeris_store is not None and isinstance(date, datetime):
+        events = ephemeris_store.lookup(latitude, longitude, date.date())
+        if events is not None:
+            return (
+                _UNIX_EPOCH + timedelta(microseconds=events[0]),
+                _UNIX_EPOCH + timedelta(microseconds=events[1])
+            )
     
     # Create a location object
     location = LocationInfo(
@@ -111,119 +332,465 @@ def calculate_sunrise_sunset(latitude, longitude, date=None):
         longitude=longitude
     )
     
-    # Get sun information for the location
-    s = sun(location.observer, date=date, tzinfo=pytz.UTC)
+    # Only sunrise and sunset are needed; astral's sun() would also compute
+    # dawn, noon and dusk (and fail when dawn skips the local date)
+    with timed("solar"):
+        try:
+            sunrise = astral_sunrise(location.observer, date=date, tzinfo=pytz.UTC)
+            sunset = astral_sunset(location.observer, date=date, tzinfo=pytz.UTC)
+        except ValueError:
+            return _polar_solar_events(latitude, longitude, date)
+        # Near the polar circles astral can hand back the previous evening's
+        # sunset; the vectorized engine pairs sunrise with the sunset after it
+        if sunset <= sunrise:
+            return _polar_solar_events(latitude, longitude, date)
+        return sunrise, sunset
+
+def calculate_sunrise_sunset(latitude, longitude, date=None):
+    """Calculate sunrise and sunset times for a given location and date.
+
+    The date is the calendar day at the location; times are returned in the
+    location's time zone.
+    """
+    # Every caller for the same local day shares one cache entry: local noon
+    day = location_date(latitude, longitude, date)
+    tz = location_timezone(latitude, longitude)
+    date = localize(datetime.combine(day, time_type(12)), tz)
     
-    # Get user's local timezone
-    local_timezone = datetime.now().astimezone().tzinfo
+    # Look up (or compute once) the sun events for this location and day
+    if solar_cache.interpolate:
+        sunrise, sunset = _interpolate_solar_events(latitude, longitude, date)
+    else:
+        sunrise, sunset = _require_events(solar_cache.get_or_compute(latitude, longitude, date, _compute_solar_events))
     
-    # Convert to local timezone
-    sunrise_local = s["sunrise"].astimezone(local_timezone)
-    sunset_local = s["sunset"].astimezone(local_timezone)
+    # Convert to the location's timezone
+    return local_datetime(sunrise.timestamp(), tz), local_datetime(sunset.timestamp(), tz)
+
+def _require_events(events):
+    if events is None:
+        raise ValueError("Sun does not rise or set at this location on this date")
+    return events
+
+def _interpolate_solar_events(latitude, longitude, date):
+    """Bilinearly interpolate sun events between the four grid nodes around a location."""
+    cell = solar_cache.grid
+    lat0 = math.floor(latitude / cell) * cell
+    lng0 = math.floor(longitude / cell) * cell
+    lat_fraction = (latitude - lat0) / cell
+    lng_fraction = (longitude - lng0) / cell
+    
+    corners = [
+        (_require_events(solar_cache.get_or_compute(lat0 + i * cell, lng0 + j * cell, date, _compute_solar_events)), weight)
+        for i, j, weight in (
+            (0, 0, (1 - lat_fraction) * (1 - lng_fraction)),
+            (0, 1, (1 - lat_fraction) * lng_fraction),
+            (1, 0, lat_fraction * (1 - lng_fraction)),
+            (1, 1, lat_fraction * lng_fraction)
+        )
+    ]
     
-    return sunrise_local, sunset_local
+    events = []
+    for k in range(2):
+        # Offsets relative to the first corner, wrapped so that a corner whose
+        # event falls on a neighbouring date does not pull the result a day away
+        reference = corners[0][0][k]
+        offset = sum(
+            weight * ((((event[k] - reference).total_seconds() + 43200) % 86400) - 43200)
+            for event, weight in corners
+        )
+        events.append(reference + timedelta(seconds=offset))
+    return events
+
+def get_solar_cache_stats():
+    """Return hit/miss counters for the shared solar event cache."""
+    return solar_cache.stats()
+
+# Period flags used by PlanetaryHourTable
+PERIODS = ("Day", "Night")
+
+# Index into PLANETARY_HOUR_SEQUENCE of the ruler of each Python weekday (0 = Monday)
+DAY_RULER_INDEX = np.array([
+    PLANETARY_HOUR_SEQUENCE.index(WEEKDAY_PLANETS[(weekday + 1) % 7]) for weekday in range(7)
+])
+
+# Hour boundaries are int64 epoch microseconds, so splitting an arc is exact
+# and an hour's end is the very same integer as the next hour's start
+MICROSECONDS = 1_000_000
+# Marks a boundary that does not exist (no sunrise or sunset), as in the ephemeris file
+MISSING_US = np.iinfo(np.int64).min
+
+_HOUR_STEPS = np.arange(13, dtype=np.int64)
+
+def epoch_microseconds(dt):
+    """Exact epoch microseconds of an aware datetime."""
+    return (dt - _UNIX_EPOCH) // _ONE_MICROSECOND
+
+def to_microseconds(epochs):
+    """Epoch seconds (NaN for missing) -> int64 epoch microseconds (MISSING_US for missing).
+
+    Integer input is taken to be microseconds already.
+    """
+    epochs = np.asarray(epochs)
+    if epochs.dtype.kind in "iu":
+        return epochs.astype(np.int64, copy=False)
+    missing = np.isnan(epochs)
+    micros = np.rint(np.where(missing, 0.0, epochs) * MICROSECONDS).astype(np.int64)
+    micros[missing] = MISSING_US
+    return micros
+
+def split_arcs(arc_start, arc_end):
+    """Split arcs (int64 epoch microseconds) into 12 equal hours.
+
+    Returns boundaries with a trailing axis of 13: boundary k is
+    arc_start + floor(k * length / 12), so the first is exactly arc_start,
+    the last exactly arc_end and hour k ends where hour k + 1 starts. Arcs
+    with a missing end are MISSING_US throughout.
+    """
+    arc_start = np.asarray(arc_start, dtype=np.int64)
+    arc_end = np.asarray(arc_end, dtype=np.int64)
+    missing = (arc_start == MISSING_US) | (arc_end == MISSING_US)
+    length = np.where(missing, 0, arc_end - arc_start)
+    bounds = arc_start[..., None] + length[..., None] * _HOUR_STEPS // 12
+    bounds[missing] = MISSING_US
+    return bounds
+
+class PlanetaryHour:
+    """A single planetary hour.
+
+    Stores only integer ids and epoch-microsecond boundaries; planet names,
+    correspondences, datetimes and display strings are derived on access.
+    Supports hour["planet"] as well as hour.planet for existing callers and
+    templates.
+    """
+
+    __slots__ = ("hour_number", "period_index", "planet_index", "start", "end", "tzinfo")
+
+    # Fields produced by to_dict(), in API order
+    FIELDS = ("hour_number", "period", "start_time", "end_time", "planet", "archangel", "angel", "duration")
+
+    def __init__(self, hour_number, period_index, planet_index, start, end, tzinfo):
+        self.hour_number = hour_number
+        self.period_index = period_index
+        self.planet_index = planet_index
+        self.start = start
+        self.end = end
+        self.tzinfo = tzinfo
+
+    @property
+    def period(self):
+        return PERIODS[self.period_index]
+
+    @property
+    def planet(self):
+        return PLANETARY_HOUR_SEQUENCE[self.planet_index]
+
+    @property
+    def archangel(self):
+        return PLANET_DATA[self.planet]["archangel"]
+
+    @property
+    def angel(self):
+        return PLANET_DATA[self.planet]["angel"]
+
+    @property
+    def start_time(self):
+        return local_datetime(self.start / MICROSECONDS, self.tzinfo)
+
+    @property
+    def end_time(self):
+        return local_datetime(self.end / MICROSECONDS, self.tzinfo)
+
+    @property
+    def duration(self):
+        return f"{(self.end - self.start) / (3600 * MICROSECONDS):.2f} hours"
+
+    @property
+    def time_range(self):
+        return f"{self.start_time.strftime('%H:%M')} - {self.end_time.strftime('%H:%M')}"
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __eq__(self, other):
+        if not isinstance(other, PlanetaryHour):
+            return NotImplemented
+        return (self.planet_index, self.period_index, self.hour_number, self.start, self.end) == \
+            (other.planet_index, other.period_index, other.hour_number, other.start, other.end)
+
+    def __hash__(self):
+        return hash((self.planet_index, self.period_index, self.hour_number, self.start, self.end))
+
+    def __repr__(self):
+        return f"<PlanetaryHour {self.period} {self.hour_number}: {self.planet} at {self.start_time.isoformat()}>"
+
+    def details(self):
+        """Correspondences of the ruling planet (color, metal, stone, influence, description)."""
+        data = PLANET_DATA[self.planet]
+        return {
+            "color": data["color"],
+            "metal": data["metal"],
+            "stone": data["stone"],
+            "influence": data["influence"],
+            "description": data["description"]
+        }
+
+    def to_dict(self):
+        """Plain dict with the fields previously returned by get_planetary_hours."""
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+class PlanetaryHourTable:
+    """Columnar planetary hours for one or more consecutive days.
+
+    Every column has 24 rows per day: start/end as int64 epoch microseconds
+    (MISSING_US where the sun does not rise or set),
+    planet as an index into PLANETARY_HOUR_SEQUENCE, period as an index into
+    PERIODS and hour_number 1-12. PlanetaryHour objects are only built by
+    hour()/hours(), dicts by to_dicts().
+    """
+
+    def __init__(self, days, start, end, planet, period, hour_number, tzinfo):
+        self.days = days
+        self.start = start
+        self.end = end
+        self.planet = planet
+        self.period = period
+        self.hour_number = hour_number
+        self.tzinfo = tzinfo
+
+    @classmethod
+    def from_solar_events(cls, days, sunrise, sunset, next_sunrise, tzinfo):
+        """Split each day/night arc into 12 hours and assign the Chaldean rulers.
+
+        Solar events are int64 epoch microseconds or float epoch seconds
+        (NaN where missing).
+        """
+        with timed("hour_table"):
+            return cls._build(days, sunrise, sunset, next_sunrise, tzinfo)
+
+    @classmethod
+    def _build(cls, days, sunrise, sunset, next_sunrise, tzinfo):
+        days = solar.to_days(days)
+        sunrise = to_microseconds(sunrise)
+        sunset = to_microseconds(sunset)
+        next_sunrise = to_microseconds(next_sunrise)
+
+        # (n_days, 2, 13) boundaries of the day and night arcs; the day's last
+        # boundary and the night's first are both exactly sunset
+        bounds = split_arcs(np.stack([sunrise, sunset], axis=1), np.stack([sunset, next_sunrise], axis=1))
+        start = bounds[:, :, :12]
+        end = bounds[:, :, 1:]
+
+        # Hour k of a day is ruled by the planet k steps after the day ruler
+        ruler = DAY_RULER_INDEX[solar.weekdays(days)]
+        planet = (ruler[:, None] + np.arange(24)) % 7
+
+        n_days = len(days)
+        period = np.tile(np.repeat(np.array([0, 1], dtype=np.int8), 12), n_days)
+        hour_number = np.tile(np.arange(1, 13, dtype=np.int8), 2 * n_days)
+
+        return cls(days, start.ravel(), end.ravel(), planet.ravel().astype(np.int8), period, hour_number, tzinfo)
+
+    def __len__(self):
+        return len(self.start)
+
+    def valid(self):
+        """Mask of rows whose start and end both exist."""
+        return (self.start != MISSING_US) & (self.end != MISSING_US)
+
+    def hour(self, i):
+        """Return row i as a PlanetaryHour."""
+        return PlanetaryHour(
+            int(self.hour_number[i]),
+            int(self.period[i]),
+            int(self.planet[i]),
+            int(self.start[i]),
+            int(self.end[i]),
+            self.tzinfo
+        )
+
+    def hours(self):
+        """Return every row as a PlanetaryHour."""
+        return [
+            PlanetaryHour(hour_number, period, planet, start, end, self.tzinfo)
+            for hour_number, period, planet, start, end in zip(
+                self.hour_number.tolist(),
+                self.period.tolist(),
+                self.planet.tolist(),
+                self.start.tolist(),
+                self.end.tolist()
+            )
+        ]
+
+    def to_dicts(self):
+        """Build plain dicts for every row."""
+        return [hour.to_dict() for hour in self.hours()]
 
 def get_planetary_hours(latitude, longitude, date=None):
     """Calculate all planetary hours for a given date and location."""
-    if date is None:
-        date = datetime.now()
+    day = location_date(latitude, longitude, date)
     
     # Get sunrise and sunset times
-    sunrise, sunset = calculate_sunrise_sunset(latitude, longitude, date)
-    
-    # Calculate day and night durations
-    day_duration = (sunset - sunrise).total_seconds() / 3600  # in hours
+    sunrise, sunset = calculate_sunrise_sunset(latitude, longitude, day)
     
     # Calculate next day's sunrise
-    next_day = date + timedelta(days=1)
-    next_sunrise, _ = calculate_sunrise_sunset(latitude, longitude, next_day)
-    
-    night_duration = (next_sunrise - sunset).total_seconds() / 3600  # in hours
+    next_sunrise, _ = calculate_sunrise_sunset(latitude, longitude, day + timedelta(days=1))
     
-    # Calculate the length of each planetary hour
-    day_hour_length = day_duration / 12
-    night_hour_length = night_duration / 12
+    # Build the 24 hours through the same vectorized path as the range API
+    table = PlanetaryHourTable.from_solar_events(
+        [day],
+        np.array([epoch_microseconds(sunrise)]),
+        np.array([epoch_microseconds(sunset)]),
+        np.array([epoch_microseconds(next_sunrise)]),
+        location_timezone(latitude, longitude)
+    )
+    return table.hours()
+
+def get_planetary_hours_range(latitude, longitude, start, end, skip_polar=False):
+    """Calculate planetary hours for every day from start to end (inclusive).
+
+    Sunrise and sunset for the whole range come from one vectorized pass of
+    the solar equations rather than per-day astral calls, and polar days are
+    divided by polar_convention in the same pass. Under the "none"
+    convention they raise ValueError, or are left out with skip_polar.
+    Returns a PlanetaryHourTable; call hours() or to_dicts() when rows are
+    needed.
+    """
+    if isinstance(start, datetime):
+        start = location_date(latitude, longitude, start)
+    if isinstance(end, datetime):
+        end = location_date(latitude, longitude, end)
+    if end < start:
+        raise ValueError("end date must not be before start date")
     
-    # Determine the ruling planet of the day (based on the weekday)
-    day_of_week = date.weekday()  # 0 is Monday in Python
-    day_of_week = (day_of_week + 1) % 7  # Convert to 0 = Sunday, 1 = Monday, etc.
-    ruling_planet = WEEKDAY_PLANETS[day_of_week]
+    # Days are calendar days in the location's own timezone
+    local_timezone = location_timezone(latitude, longitude)
     
-    # Find the position of the ruling planet in the sequence
-    ruling_planet_index = PLANETARY_HOUR_SEQUENCE.index(ruling_planet)
+    # One extra day supplies the final night's closing sunrise
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + np.timedelta64(2, "D"))
+    with timed("solar"):
+        sunrise, sunset, _ = solar.solar_events(
+            latitude, longitude, days, day_offsets(local_timezone, days), polar_convention
+        )
     
-    # Generate all hours for the day
-    planetary_hours = []
+    # A day needs its sunrise and sunset and the next sunrise
+    defined = ~(np.isnan(sunrise[:-1]) | np.isnan(sunset[:-1]) | np.isnan(sunrise[1:]))
+    if not defined.all():
+        if not skip_polar:
+            raise ValueError("Sun does not rise or set on every day in the range at this location.")
+        keep = np.flatnonzero(defined)
+        return PlanetaryHourTable.from_solar_events(
+            days[keep], sunrise[keep], sunset[keep], sunrise[keep + 1], local_timezone
+        )
     
-    # Day hours (from sunrise to sunset)
-    for i in range(12):
-        start_time = sunrise + timedelta(hours=i * day_hour_length)
-        end_time = sunrise + timedelta(hours=(i + 1) * day_hour_length)
-        
-        # Calculate the planet for this hour
-        hour_index = (ruling_planet_index + i) % 7
-        planet = PLANETARY_HOUR_SEQUENCE[hour_index]
+    return PlanetaryHourTable.from_solar_events(days[:-1], sunrise[:-1], sunset[:-1], sunrise[1:], local_timezone)
+
+class HourBoundaryIndex:
+    """Sorted planetary-hour boundaries for one location around a given local day.
+
+    Covers yesterday, today and tomorrow (72 hours), so "which hour is it"
+    and "when does it change" are a bisect over the start epochs. The window
+    is rebuilt only once the time moves past it.
+    """
+
+    def __init__(self, latitude, longitude, day):
+        # Sunrise/sunset from yesterday through the day after tomorrow, via the shared cache
+        events = [
+            calculate_sunrise_sunset(latitude, longitude, day + timedelta(days=offset))
+            for offset in range(-1, 3)
+        ]
+        sunrise = np.array([epoch_microseconds(event[0]) for event in events])
+        sunset = np.array([epoch_microseconds(event[1]) for event in events])
         
-        planetary_hours.append({
-            "hour_number": i + 1,
-            "period": "Day",
-            "start_time": start_time,
-            "end_time": end_time,
-            "planet": planet,
-            "archangel": PLANET_DATA[planet]["archangel"],
-            "angel": PLANET_DATA[planet]["angel"],
-            "duration": f"{day_hour_length:.2f} hours"
-        })
+        days = [day + timedelta(days=offset) for offset in range(-1, 2)]
+        self.table = PlanetaryHourTable.from_solar_events(
+            days, sunrise[:-1], sunset[:-1], sunrise[1:], location_timezone(latitude, longitude)
+        )
+        self._starts = self.table.start.tolist()
+        self.window_start = self._starts[0] / MICROSECONDS
+        self.window_end = int(self.table.end[-1]) / MICROSECONDS
+
+    def covers(self, epoch):
+        """Whether epoch (seconds) falls inside the indexed window."""
+        return self.window_start <= epoch < self.window_end
+
+    def lookup(self, epoch):
+        """Row of the table containing epoch (seconds)."""
+        return bisect.bisect_right(self._starts, epoch * MICROSECONDS) - 1
+
+    def bounds(self, row):
+        """(start, end) of a row in epoch seconds."""
+        return int(self.table.start[row]) / MICROSECONDS, int(self.table.end[row]) / MICROSECONDS
+
+# Boundary indexes per quantized location and time zone, most recently used last
+_boundary_indexes = OrderedDict()
+_boundary_lock = threading.Lock()
+BOUNDARY_INDEX_MAXSIZE = 1024
+
+def hour_index_key(latitude, longitude):
+    """Key of the locations sharing one set of hour boundaries: the solar cache cell and time zone."""
+    # A grid cell can straddle a zone border, and the table's days and
+    # tzinfo are local to the zone. Interpolated times differ within a
+    # cell, so then the key is the exact coordinate
+    cell = (float(latitude), float(longitude)) if solar_cache.interpolate else solar_cache.quantize(latitude, longitude)
+    return cell + (timezone_resolver.zone_name(latitude, longitude),)
+
+def get_hour_boundary_index(latitude, longitude, current_time):
+    """Return a boundary index covering current_time, rebuilding it only when the window has rolled over."""
+    key = hour_index_key(latitude, longitude)
+    epoch = current_time.timestamp()
     
-    # Night hours (from sunset to next sunrise)
-    for i in range(12):
-        start_time = sunset + timedelta(hours=i * night_hour_length)
-        end_time = sunset + timedelta(hours=(i + 1) * night_hour_length)
-        
-        # Calculate the planet for this hour
-        hour_index = (ruling_planet_index + 12 + i) % 7
-        planet = PLANETARY_HOUR_SEQUENCE[hour_index]
-        
-        planetary_hours.append({
-            "hour_number": i + 1,
-            "period": "Night",
-            "start_time": start_time,
-            "end_time": end_time,
-            "planet": planet,
-            "archangel": PLANET_DATA[planet]["archangel"],
-            "angel": PLANET_DATA[planet]["angel"],
-            "duration": f"{night_hour_length:.2f} hours"
-        })
+    with _boundary_lock:
+        index = _boundary_indexes.get(key)
+        if index is not None and index.covers(epoch):
+            _boundary_indexes.move_to_end(key)
+            return index
+    
+    day = location_date(latitude, longitude, current_time)
+    index = HourBoundaryIndex(latitude, longitude, day)
+    if not index.covers(epoch):
+        # Just after midnight, before yesterday's night began: centre on the previous day
+        index = HourBoundaryIndex(latitude, longitude, day - timedelta(days=1))
     
-    return planetary_hours
+    with _boundary_lock:
+        _boundary_indexes[key] = index
+        _boundary_indexes.move_to_end(key)
+        while len(_boundary_indexes) > BOUNDARY_INDEX_MAXSIZE:
+            _boundary_indexes.popitem(last=False)
+    
+    return index
 
 def get_current_planetary_hour(latitude, longitude, current_time=None):
     """Determine the current planetary hour."""
-    if current_time is None:
-        current_time = datetime.now()
-    
-    # Ensure current_time is timezone-aware
-    current_time = ensure_timezone_aware(current_time)
-    
-    # Get all planetary hours for the day
-    hours = get_planetary_hours(latitude, longitude, current_time)
+    # Naive times are wall-clock time at the location
+    current_time = location_time(latitude, longitude, current_time)
     
-    # Find the current hour
-    for hour in hours:
-        # Ensure start_time and end_time are timezone-aware
-        start_time = ensure_timezone_aware(hour["start_time"])
-        end_time = ensure_timezone_aware(hour["end_time"])
-        
-        if start_time <= current_time < end_time:
-            return hour
+    # Find the hour containing current_time (before sunrise this is the previous night)
+    index = get_hour_boundary_index(latitude, longitude, current_time)
+    return index.table.hour(index.lookup(current_time.timestamp()))
+
+def get_next_planetary_hour_transition(latitude, longitude, current_time=None):
+    """Return the time at which the current planetary hour ends."""
+    current_time = location_time(latitude, longitude, current_time)
     
-    # If not found (rare edge case), return the first hour of the day
-    return hours[0]
+    index = get_hour_boundary_index(latitude, longitude, current_time)
+    _, end = index.bounds(index.lookup(current_time.timestamp()))
+    return local_datetime(end, location_timezone(latitude, longitude))
 
 def get_planetary_day_info(latitude, longitude, date=None):
-    """Get information about the planetary day."""
-    if date is None:
-        date = datetime.now()
+    """Get information about the planetary day in effect at date (default now).
+
+    A planetary day runs from sunrise to the next sunrise, so before sunrise
+    it is still the previous calendar day's. A plain date means the
+    planetary day beginning at that date's sunrise.
+    """
+    if date is None or isinstance(date, datetime):
+        # The day whose sunrise last preceded the time, as for the current hour
+        current_time = location_time(latitude, longitude, date)
+        index = get_hour_boundary_index(latitude, longitude, current_time)
+        date = index.table.days[index.lookup(current_time.timestamp()) // 24].astype(object)
     
     # Determine the ruling planet of the day (based on the weekday)
     day_of_week = date.weekday()  # 0 is Monday in Python
@@ -246,28 +813,20 @@ def get_planetary_day_info(latitude, longitude, date=None):
 
 def get_current_planetary_hour_info(latitude, longitude, current_time=None):
     """Get detailed information about the current planetary hour."""
-    if current_time is None:
-        current_time = datetime.now()
-    
-    # Ensure current_time is timezone-aware
-    current_time = ensure_timezone_aware(current_time)
+    current_time = location_time(latitude, longitude, current_time)
     
     # Get current planetary hour
     hour = get_current_planetary_hour(latitude, longitude, current_time)
-    planet = hour["planet"]
     
     # Add additional information
-    hour.update({
-        "color": PLANET_DATA[planet]["color"],
-        "metal": PLANET_DATA[planet]["metal"],
-        "stone": PLANET_DATA[planet]["stone"],
-        "influence": PLANET_DATA[planet]["influence"],
-        "description": PLANET_DATA[planet]["description"],
+    info = hour.to_dict()
+    info.update(hour.details())
+    info.update({
         "current_time": current_time.strftime("%H:%M:%S"),
-        "progress": calculate_hour_progress(current_time, hour["start_time"], hour["end_time"])
+        "progress": calculate_hour_progress(current_time, info["start_time"], info["end_time"])
     })
     
-    return hour
+    return info
 
 def calculate_hour_progress(current_time, start_time, end_time):
     """Calculate the progress within the current planetary hour as a percentage."""
@@ -290,23 +849,273 @@ def get_all_planetary_hours(latitude, longitude, date=None):
     return get_planetary_hours(latitude, longitude, date)
 
 def get_day_planetary_hours(latitude, longitude, date=None):
-    """Format planetary hours for display with periods and time ranges."""
-    hours = get_planetary_hours(latitude, longitude, date)
-    
-    # Format the hours for display
-    day_hours = []
-    
-    # Create time-formatted version
-    for hour in hours:
-        day_hours.append({
-            "hour_number": hour["hour_number"],
-            "period": hour["period"],
-            "time_range": f"{hour['start_time'].strftime('%H:%M')} - {hour['end_time'].strftime('%H:%M')}",
-            "planet": hour["planet"],
-            "archangel": hour["archangel"],
-            "angel": hour["angel"],
-            "start_time": hour["start_time"],
-            "end_time": hour["end_time"]
+    """Planetary hours for display; each hour also provides a formatted time_range."""
+    return get_planetary_hours(latitude, longitude, date)
+
+# Search horizon when find_planetary_hours is given no end
+FIND_MAX_DAYS = 366
+# Candidate days per solar pass; doubles each pass up to the maximum
+_FIND_FIRST_BATCH = 8
+_FIND_MAX_BATCH = 512
+
+def _find_slot_mask(planet_index, day_ruler_index, period_index):
+    """(7, 24) mask of the hour slots that can match, per Python weekday."""
+    weekday_ruler = DAY_RULER_INDEX[:, None]
+    slots = np.arange(24)
+    mask = np.ones((7, 24), dtype=bool)
+    if planet_index is not None:
+        mask &= (weekday_ruler + slots) % 7 == planet_index
+    if day_ruler_index is not None:
+        mask &= weekday_ruler == day_ruler_index
+    if period_index is not None:
+        mask &= slots // 12 == period_index
+    return mask
+
+def find_planetary_hours(latitude, longitude, planet=None, day_planet=None, period=None,
+                         start=None, end=None, limit=None):
+    """Find planetary hours ruled by a planet, on a given planetary day and/or in a period.
+
+    Returns PlanetaryHour records in time order for every matching hour that
+    is still running at start or begins before end (default FIND_MAX_DAYS
+    later), at most limit of them. Rulers follow the fixed Chaldean cycle, so
+    the matching weekdays and hour slots are known up front and sunrise and
+    sunset are only computed for days that can contain a match, a few days at
+    a time until limit is reached.
+    """
+    if planet is not None and planet not in PLANETARY_HOUR_SEQUENCE:
+        raise ValueError(f"Unknown planet: {planet}")
+    if day_planet is not None and day_planet not in WEEKDAY_PLANETS.values():
+        raise ValueError(f"Unknown day planet: {day_planet}")
+    if period is not None and period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+
+    start = location_time(latitude, longitude, start)
+    end = location_time(latitude, longitude, end) if end is not None else start + timedelta(days=FIND_MAX_DAYS)
+    if end <= start:
+        raise ValueError("end must be after start")
+    if limit is not None and limit <= 0:
+        return []
+
+    slot_mask = _find_slot_mask(
+        PLANETARY_HOUR_SEQUENCE.index(planet) if planet is not None else None,
+        PLANETARY_HOUR_SEQUENCE.index(day_planet) if day_planet is not None else None,
+        PERIODS.index(period) if period is not None else None
+    )
+
+    # Before sunrise, start still falls in the previous planetary day's night
+    days = np.arange(
+        np.datetime64(start.date() - timedelta(days=1), "D"),
+        np.datetime64(end.date(), "D") + np.timedelta64(1, "D")
+    )
+    candidates = days[slot_mask.any(axis=1)[solar.weekdays(days)]]
+
+    local_timezone = location_timezone(latitude, longitude)
+    start_us = epoch_microseconds(start)
+    end_us = epoch_microseconds(end)
+
+    results = []
+    batch = _FIND_FIRST_BATCH
+    position = 0
+    while position < len(candidates):
+        chunk = candidates[position:position + batch]
+        position += len(chunk)
+        batch = min(batch * 2, _FIND_MAX_BATCH)
+
+        # Sunrise/sunset for each candidate day and the next, in one pass; a
+        # day on either side lets polar days be judged against their neighbours
+        days = chunk[:, None] + np.arange(-1, 3)
+        with timed("solar"):
+            sunrise, sunset, _ = solar.solar_events(
+                latitude, longitude, days, day_offsets(local_timezone, days), polar_convention
+            )
+        table = PlanetaryHourTable.from_solar_events(
+            chunk, sunrise[:, 1], sunset[:, 1], sunrise[:, 2], local_timezone
+        )
+
+        # Rows without a sunrise or sunset (polar days under "none") drop out
+        matches = (
+            slot_mask[solar.weekdays(table.days)].ravel() & table.valid() & (table.end > start_us) & (table.start < end_us)
+        )
+        for row in np.flatnonzero(matches).tolist():
+            results.append(table.hour(row))
+            if limit is not None and len(results) >= limit:
+                return results
+
+    return results
+
+# Batches larger than this are split across the process pool when one is
+# requested; callers with a smaller request cap pass their own threshold
+BATCH_POOL_THRESHOLD = 5000
+
+# Process pool shared by every batch call in this process, created on first
+# use (so gunicorn workers each start their own after the fork). Workers are
+# started by a fork server, as forking a threaded server process is unsafe.
+_batch_pool = None
+_batch_pool_size = 0
+_batch_pool_lock = threading.Lock()
+
+def _get_batch_pool(processes):
+    global _batch_pool, _batch_pool_size
+    with _batch_pool_lock:
+        if _batch_pool is None or _batch_pool_size != processes:
+            # Imported here: only very large batches with BATCH_PROCESSES set need it
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            if _batch_pool is not None:
+                _batch_pool.shutdown(wait=False)
+            _batch_pool = ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context("forkserver")
+            )
+            _batch_pool_size = processes
+        return _batch_pool
+
+def _current_hour_columns(latitudes, longitudes, now, offsets, convention):
+    """Vectorized current-hour lookup for arrays of coordinates at epoch time now.
+
+    now is one epoch time for every location or one per location; offsets
+    holds each location's UTC offset (seconds) at now, and
+    convention divides polar days (passed explicitly for pool workers).
+    Returns a dict of arrays (one row per location), with start/end in epoch
+    microseconds split by the same exact integer arithmetic as
+    PlanetaryHourTable. Rows where the sun does not rise or set around now
+    (under the "none" convention) are MISSING_US in start/end.
+    """
+    latitudes = np.asarray(latitudes, dtype=np.float64)[:, None]
+    longitudes = np.asarray(longitudes, dtype=np.float64)[:, None]
+    offsets = np.asarray(offsets, dtype=np.float64)[:, None]
+    now = np.broadcast_to(np.asarray(now, dtype=np.float64), offsets.shape[:1])[:, None]
+    
+    # Yesterday, today and tomorrow in each location's local time
+    today = np.floor((now + offsets) / solar.SECONDS_PER_DAY).astype(np.int64)
+    days = (today + np.arange(-1, 2)).astype("datetime64[D]")
+    sunrise, sunset = solar.sunrise_sunset_epochs(latitudes, longitudes, days, offsets)
+    
+    # Rows with a polar day get a day added at each end, so yesterday and
+    # tomorrow are judged against both their neighbours as in the range API
+    rows = np.flatnonzero(solar.polar_days(sunrise, sunset).any(axis=1))
+    if len(rows):
+        wide = (today[rows] + np.arange(-2, 3)).astype("datetime64[D]")
+        edge_sunrise, edge_sunset = solar.sunrise_sunset_epochs(
+            latitudes[rows], longitudes[rows], wide[:, [0, 4]], offsets[rows]
+        )
+        wide_sunrise, wide_sunset, _ = solar.fill_polar_days(
+            latitudes[rows], longitudes[rows], wide, offsets[rows],
+            np.hstack([edge_sunrise[:, :1], sunrise[rows], edge_sunrise[:, 1:]]),
+            np.hstack([edge_sunset[:, :1], sunset[rows], edge_sunset[:, 1:]]),
+            convention
+        )
+        sunrise[rows] = wide_sunrise[:, 1:4]
+        sunset[rows] = wide_sunset[:, 1:4]
+    sunrise = to_microseconds(sunrise)
+    sunset = to_microseconds(sunset)
+    now_us = np.rint(now * MICROSECONDS).astype(np.int64)
+    
+    # Arcs 0-3 are yesterday's day and night and today's day and night.
+    # Before today's sunrise we are still in yesterday's night, or even its
+    # day where the sun sets after local midnight near the polar circles
+    events = np.stack([sunrise[:, 0], sunset[:, 0], sunrise[:, 1], sunset[:, 1], sunrise[:, 2]], axis=1)
+    arc = (events[:, 1:4] <= now_us).sum(axis=1)
+    rows = np.arange(len(arc))
+    period = (arc % 2).astype(np.int8)
+    
+    # The planetary day starts at sunrise, so pre-sunrise hours belong to yesterday
+    rulers = DAY_RULER_INDEX[solar.weekdays(days)]
+    ruler = rulers[rows, arc // 2]
+    
+    # The slot is the number of inner boundaries already passed
+    bounds = split_arcs(events[rows, arc], events[rows, arc + 1])
+    slot = (bounds[:, 1:12] <= now_us).sum(axis=1)
+    
+    return {
+        "day_planet": ruler,
+        "planet": (ruler + 12 * period + slot) % 7,
+        "period": period,
+        "hour_number": slot + 1,
+        "start": bounds[rows, slot],
+        "end": bounds[rows, slot + 1]
+    }
+
+def get_current_planetary_hours_batch(locations, current_time=None, processes=None, pool_threshold=None):
+    """Determine the current planetary hour for many locations at once.
+
+    locations is a sequence of (latitude, longitude) pairs. Solar events for
+    every location are computed in one vectorized pass; when processes is set
+    and the batch exceeds pool_threshold (default BATCH_POOL_THRESHOLD) the
+    work is split across a shared process pool of that size. Returns one
+    dict per location, in input order; locations that are not valid
+    coordinates (see valid_coordinates) get an "error" instead.
+    """
+    if current_time is None:
+        current_time = datetime.now(pytz.UTC)
+    
+    coordinates = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+    
+    # Rows that are not coordinates on Earth get an error of their own
+    with np.errstate(invalid="ignore"):
+        valid = (np.abs(coordinates[:, 0]) <= 90) & (np.abs(coordinates[:, 1]) <= 180)
+    invalid = np.flatnonzero(~valid).tolist()
+    rows = np.flatnonzero(valid)
+    latitudes, longitudes = coordinates[rows, 0], coordinates[rows, 1]
+    
+    # Each location's own timezone, and the time and its offset there
+    # (computed once per zone). Naive times are wall-clock time at each
+    # location, as in the single-location functions
+    zones = [location_timezone(lat, lng) for lat, lng in zip(latitudes.tolist(), longitudes.tolist())]
+    zone_times = {}
+    for zone in zones:
+        if zone not in zone_times:
+            now = localize(current_time, zone).timestamp()
+            zone_times[zone] = (now, float(utc_offsets(zone, now)))
+    now = np.array([zone_times[zone][0] for zone in zones])
+    offsets = np.array([zone_times[zone][1] for zone in zones])
+    
+    if pool_threshold is None:
+        pool_threshold = BATCH_POOL_THRESHOLD
+    if processes and processes > 1 and len(rows) > pool_threshold:
+        chunks = np.array_split(np.arange(len(rows)), processes)
+        pool = _get_batch_pool(processes)
+        futures = [
+            pool.submit(
+                _current_hour_columns, latitudes[chunk], longitudes[chunk], now[chunk], offsets[chunk], polar_convention
+            )
+            for chunk in chunks
+        ]
+        parts = [future.result() for future in futures]
+        columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    else:
+        with timed("solar"):
+            columns = _current_hour_columns(latitudes, longitudes, now, offsets, polar_convention)
+    
+    results = []
+    starts = columns["start"].tolist()
+    ends = columns["end"].tolist()
+    hour_numbers = columns["hour_number"].tolist()
+    periods = columns["period"].tolist()
+    planets = columns["planet"].tolist()
+    day_planets = columns["day_planet"].tolist()
+    for i in range(len(rows)):
+        result = {"latitude": float(latitudes[i]), "longitude": float(longitudes[i]), "timezone": zones[i].zone}
+        
+        # Polar day/night: no sunrise or sunset to divide
+        if starts[i] == MISSING_US or ends[i] == MISSING_US:
+            result["error"] = "Sun does not rise or set at this location today"
+            results.append(result)
+            continue
+        
+        hour = PlanetaryHour(hour_numbers[i], periods[i], planets[i], starts[i], ends[i], zones[i])
+        result.update({
+            "day_planet": PLANETARY_HOUR_SEQUENCE[day_planets[i]],
+            "current_hour": hour,
+            "next_transition": hour.end_time
         })
+        results.append(result)
     
-    return day_hours
+    for i in invalid:
+        latitude, longitude = coordinates[i].tolist()
+        results.insert(i, {
+            # NaN and infinity have no JSON form
+            "latitude": latitude if math.isfinite(latitude) else None,
+            "longitude": longitude if math.isfinite(longitude) else None,
+            "error": "Invalid coordinates"
+        })
+    return results
@@ -0,0 +1,444 @@
+import asyncio
+import atexit
+import logging
+import math
+import os
+import queue
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, update
+
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# What to do with a new row when the queue is full
+DROP_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+# Columns identifying one rollup row, in order
+ROLLUP_KEY = ("date", "day_planet", "hour_planet", "period", "hour_number", "lat_cell", "lng_cell")
+
+def rollup_key(row):
+    """Rollup key for a raw log row: UTC date, planets, hour and 1-degree location cell."""
+    return (
+        row["timestamp"].date(),
+        row["day_planet"],
+        row["hour_planet"],
+        row["period"],
+        row["hour_number"],
+        math.floor(row["latitude"]),
+        math.floor(row["longitude"])
+    )
+
+def _dialect_upsert(dialect, table):
+    """INSERT ... that adds to queries on a key conflict, or None if the dialect has no upsert."""
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=list(ROLLUP_KEY),
+            set_={"queries": table.c.queries + stmt.excluded.queries}
+        )
+    if dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        return stmt.on_duplicate_key_update(queries=table.c.queries + stmt.inserted.queries)
+    return None
+
+def upsert_rollups(session, rollup_model, counts):
+    """Add {rollup key: query count} to the rollup table within the session's transaction."""
+    if not counts:
+        return
+    table = rollup_model.__table__
+    rows = [dict(zip(ROLLUP_KEY, key), queries=queries) for key, queries in counts.items()]
+    stmt = _dialect_upsert(session.get_bind().dialect.name, table)
+    if stmt is not None:
+        session.execute(stmt, rows)
+        return
+    # Portable fallback: update existing rows, insert the rest
+    for row in rows:
+        match = [table.c[column] == row[column] for column in ROLLUP_KEY]
+        result = session.execute(update(table).where(*match).values(queries=table.c.queries + row["queries"]))
+        if result.rowcount == 0:
+            session.execute(insert(table), [row])
+
+def write_query_logs(session, model, rows, rollup_model=None):
+    """Insert raw log rows (and their rollup counts) within the session's transaction."""
+    # A list of parameter dicts makes this a single executemany
+    session.execute(insert(model), rows)
+    if rollup_model is not None:
+        upsert_rollups(session, rollup_model, Counter(rollup_key(row) for row in rows))
+
+def rebuild_rollups(session, model, rollup_model):
+    """Recompute the rollups covered by the raw log rows still stored; returns the rows counted.
+
+    Only days from the oldest raw row on are rebuilt, so rollups whose raw
+    rows were pruned are kept. When older rollups exist, the oldest raw
+    row's day may have been pruned partly and is kept as well.
+    """
+    oldest = session.execute(select(func.min(model.timestamp))).scalar()
+    if oldest is None:
+        return 0
+    first_day = oldest.date()
+    pruned_before = session.execute(
+        select(func.count()).select_from(rollup_model).where(rollup_model.date < first_day)
+    ).scalar()
+    if pruned_before:
+        first_day += timedelta(days=1)
+
+    session.execute(delete(rollup_model).where(rollup_model.date >= first_day))
+    counts = Counter()
+    rows = session.execute(select(
+        model.timestamp, model.day_planet, model.hour_planet, model.period,
+        model.hour_number, model.latitude, model.longitude
+    ).where(
+        model.timestamp >= datetime.combine(first_day, datetime.min.time())
+    ).execution_options(yield_per=10000))
+    for row in rows.mappings():
+        counts[rollup_key(row)] += 1
+    upsert_rollups(session, rollup_model, counts)
+    session.commit()
+    return sum(counts.values())
+
+def prune_query_logs(session, model, older_than_days, batch_size=10000):
+    """Delete raw log rows older than the retention window, in batches; returns the number deleted.
+
+    Their counts already live in the rollup table, which is kept indefinitely.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    deleted = 0
+    while True:
+        ids = session.execute(
+            select(model.id).where(model.timestamp < cutoff).order_by(model.timestamp).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return deleted
+        session.execute(delete(model).where(model.id.in_(ids)))
+        session.commit()
+        deleted += len(ids)
+
+# Breakdowns served by /api/stats: name -> rollup columns grouped by
+STAT_DIMENSIONS = {
+    "day_planet": ("day_planet",),
+    "hour_planet": ("hour_planet",),
+    "period": ("period",),
+    "hour": ("period", "hour_number"),
+    "date": ("date",),
+    "cell": ("lat_cell", "lng_cell")
+}
+
+def rollup_stats(session, rollup_model, since, dimensions=STAT_DIMENSIONS, top_cells=20):
+    """Query counts since a date, broken down by each dimension, from the rollup table only."""
+    stats = {"since": since.isoformat()}
+    recent = rollup_model.date >= since
+    stats["total"] = session.execute(
+        select(func.coalesce(func.sum(rollup_model.queries), 0)).where(recent)
+    ).scalar()
+    for name, columns in dimensions.items():
+        group = [getattr(rollup_model, column) for column in columns]
+        total = func.sum(rollup_model.queries).label("queries")
+        query = select(*group, total).where(recent).group_by(*group)
+        query = query.order_by(total.desc()).limit(top_cells) if name == "cell" else query.order_by(*group)
+        breakdown = []
+        for row in session.execute(query):
+            entry = dict(zip(columns, row[:-1]))
+            if "date" in entry:
+                entry["date"] = entry["date"].isoformat()
+            entry["queries"] = row[-1]
+            breakdown.append(entry)
+        stats[f"by_{name}"] = breakdown
+    return stats
+
+class QueryLogWriter:
+    """Write-behind pipeline for query log rows.
+
+    Request handlers enqueue rows into a bounded in-process queue and return
+    immediately; a background thread bulk-inserts them in batches (one
+    executemany per batch) every flush_interval seconds or as soon as
+    batch_size rows are waiting. Remaining rows are flushed at shutdown.
+    When a rollup_model is given, each batch also adds its counts to the
+    rollup table in the same transaction.
+    """
+
+    def __init__(self, db, model, app=None, rollup_model=None):
+        self.db = db
+        self.model = model
+        self.rollup_model = rollup_model
+        self.app = None
+        self.enabled = True
+        self.batch_size = 500
+        self.flush_interval = 1.0
+        self.drop_policy = "drop_newest"
+        self.block_timeout = 0.1
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+        self._queue = queue.Queue(maxsize=10000)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read the QUERY_LOG_* settings from the app config."""
+        app.config.setdefault("QUERY_LOG_ASYNC", os.environ.get("QUERY_LOG_ASYNC", "1") == "1")
+        app.config.setdefault("QUERY_LOG_QUEUE_SIZE", int(os.environ.get("QUERY_LOG_QUEUE_SIZE", "10000")))
+        app.config.setdefault("QUERY_LOG_BATCH_SIZE", int(os.environ.get("QUERY_LOG_BATCH_SIZE", "500")))
+        app.config.setdefault("QUERY_LOG_FLUSH_INTERVAL", float(os.environ.get("QUERY_LOG_FLUSH_INTERVAL", "1.0")))
+        app.config.setdefault("QUERY_LOG_DROP_POLICY", os.environ.get("QUERY_LOG_DROP_POLICY", "drop_newest"))
+
+        if app.config["QUERY_LOG_DROP_POLICY"] not in DROP_POLICIES:
+            raise ValueError(f"QUERY_LOG_DROP_POLICY must be one of {', '.join(DROP_POLICIES)}")
+
+        self.app = app
+        self.enabled = app.config["QUERY_LOG_ASYNC"]
+        self.batch_size = app.config["QUERY_LOG_BATCH_SIZE"]
+        self.flush_interval = app.config["QUERY_LOG_FLUSH_INTERVAL"]
+        self.drop_policy = app.config["QUERY_LOG_DROP_POLICY"]
+        self._queue = queue.Queue(maxsize=app.config["QUERY_LOG_QUEUE_SIZE"])
+        atexit.register(self.stop)
+
+    def log(self, **row):
+        """Queue a row for insertion. Returns False if it was dropped."""
+        # Stamp the row now, not when the batch is eventually written
+        row.setdefault("timestamp", datetime.utcnow())
+
+        if not self.enabled:
+            self._write([row])
+            return True
+
+        self._ensure_started()
+        try:
+            if self.drop_policy == "block":
+                self._queue.put(row, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            if self.drop_policy != "drop_oldest":
+                self._count("dropped")
+                return False
+            # Make room by discarding the oldest queued row
+            try:
+                self._queue.get_nowait()
+                self._count("dropped")
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                self._count("dropped")
+                return False
+
+        self._count("enqueued")
+        return True
+
+    def flush(self):
+        """Write everything currently queued, in batches."""
+        while True:
+            batch = self._drain(block=False)
+            if not batch:
+                return
+            self._write(batch)
+
+    def stop(self, timeout=5.0):
+        """Stop the flusher thread and write any rows still queued."""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        self.flush()
+
+    def queue_size(self):
+        """Number of rows waiting to be written."""
+        return self._queue.qsize()
+
+    def collect_metrics(self):
+        """Metrics collector for the /metrics endpoint."""
+        with self._lock:
+            stats = dict(self.stats)
+        return [
+            ("planetary_query_log_rows_total", "counter", "Query log rows by outcome.", [
+                ({"outcome": outcome}, stats[outcome]) for outcome in ("enqueued", "written", "dropped")
+            ]),
+            ("planetary_query_log_errors_total", "counter", "Failed query log batch writes.", [({}, stats["errors"])]),
+            ("planetary_query_log_queue_size", "gauge", "Query log rows waiting to be written.", [({}, self.queue_size())])
+        ]
+
+    def _ensure_started(self):
+        # Start lazily, and again after a fork: threads do not survive into
+        # gunicorn workers forked from a preloaded app
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._drain(block=True)
+            if batch:
+                self._write(batch)
+
+    def _drain(self, block):
+        """Collect up to batch_size rows, waiting at most flush_interval for the first."""
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, rows):
+        try:
+            with self.app.app_context(), timed("db_write"):
+                write_query_logs(self.db.session, self.model, rows, self.rollup_model)
+                self.db.session.commit()
+            self._count("written", len(rows))
+            self._count("batches")
+        except Exception:
+            logger.exception("Failed to write %d query log rows", len(rows))
+            self._count("errors")
+            with self.app.app_context():
+                self.db.session.rollback()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+class AsyncQueryLogWriter:
+    """asyncio counterpart of QueryLogWriter for the ASGI app.
+
+    Rows go into a bounded asyncio.Queue and a task writes them in batches
+    through an async SQLAlchemy session factory, so the event loop never
+    waits on a commit and only one pooled connection is busy with logging.
+    Supports the same drop policies ("block" waits up to block_timeout).
+    """
+
+    def __init__(self, session_factory, model, rollup_model=None, queue_size=10000,
+                 batch_size=500, flush_interval=1.0, drop_policy="drop_newest"):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"drop_policy must be one of {', '.join(DROP_POLICIES)}")
+        self.session_factory = session_factory
+        self.model = model
+        self.rollup_model = rollup_model
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.block_timeout = 0.1
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+        self._queue = None
+        self._task = None
+        self._in_flight = None
+
+    @classmethod
+    def from_config(cls, session_factory, model, config, rollup_model=None):
+        """Build a writer from the QUERY_LOG_* settings of a Flask config."""
+        return cls(
+            session_factory, model, rollup_model,
+            queue_size=config["QUERY_LOG_QUEUE_SIZE"],
+            batch_size=config["QUERY_LOG_BATCH_SIZE"],
+            flush_interval=config["QUERY_LOG_FLUSH_INTERVAL"],
+            drop_policy=config["QUERY_LOG_DROP_POLICY"]
+        )
+
+    def start(self):
+        """Start the writer task on the running event loop."""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run(), name="async-query-log-writer")
+
+    async def log(self, **row):
+        """Queue a row for insertion. Returns False if it was dropped."""
+        row.setdefault("timestamp", datetime.utcnow())
+        try:
+            if self.drop_policy == "block":
+                await asyncio.wait_for(self._queue.put(row), self.block_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            if self.drop_policy != "drop_oldest":
+                self.stats["dropped"] += 1
+                return False
+            self._queue.get_nowait()
+            self._queue.put_nowait(row)
+            self.stats["dropped"] += 1
+        self.stats["enqueued"] += 1
+        return True
+
+    async def flush(self):
+        """Write everything currently queued, in batches."""
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            await self._write(batch)
+
+    async def stop(self):
+        """Stop the writer task, let a batch it is writing finish and write any rows still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._in_flight is not None:
+            await self._in_flight
+            self._in_flight = None
+        if self._queue is not None:
+            await self.flush()
+
+    def collect_metrics(self):
+        """Metrics collector for the /metrics endpoint."""
+        stats = dict(self.stats)
+        return [
+            ("planetary_async_query_log_rows_total", "counter", "Async query log rows by outcome.", [
+                ({"outcome": outcome}, stats[outcome]) for outcome in ("enqueued", "written", "dropped")
+            ]),
+            ("planetary_async_query_log_errors_total", "counter", "Failed async query log batch writes.", [({}, stats["errors"])]),
+            ("planetary_async_query_log_queue_size", "gauge", "Async query log rows waiting to be written.", [
+                ({}, self._queue.qsize() if self._queue is not None else 0)
+            ])
+        ]
+
+    async def _run(self):
+        while True:
+            try:
+                first = await asyncio.wait_for(self._queue.get(), self.flush_interval)
+            except asyncio.TimeoutError:
+                continue
+            # Shielded, so cancelling this task in stop() leaves the batch
+            # already taken off the queue to be written
+            self._in_flight = asyncio.ensure_future(self._write([first] + self._drain(self.batch_size - 1)))
+            await asyncio.shield(self._in_flight)
+            self._in_flight = None
+
+    def _drain(self, limit=None):
+        batch = []
+        limit = self.batch_size if limit is None else limit
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _write(self, rows):
+        try:
+            async with self.session_factory() as session:
+                with timed("db_write"):
+                    await session.run_sync(write_query_logs, self.model, rows, self.rollup_model)
+                    await session.commit()
+            self.stats["written"] += len(rows)
+            self.stats["batches"] += 1
+        except Exception:
+            logger.exception("Failed to write %d query log rows", len(rows))
+            self.stats["errors"] += 1
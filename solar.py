@@ -0,0 +1,274 @@
+"""Vectorized sunrise/sunset calculations.
+
+A NumPy port of the NOAA solar equations used by ``astral.sun``, evaluated
+over whole arrays of dates (and locations) at once instead of one
+``astral.sun.sun()`` call per day.
+"""
+import math
+from math import radians, tan
+
+import numpy as np
+
+# Julian day number of 1970-01-01T00:00Z
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+SECONDS_PER_DAY = 86400
+
+# Using 32 arc minutes as sun's apparent diameter (same as astral)
+SUN_APPARENT_RADIUS = 32.0 / (60.0 * 2.0)
+
+def _refraction_at_zenith(zenith):
+    """Degrees of refraction at the given zenith, as computed by astral."""
+    elevation = 90 - zenith
+    if elevation >= 85.0:
+        return 0
+
+    te = tan(radians(elevation))
+    if elevation > 5.0:
+        correction = 58.1 / te - 0.07 / te ** 3 + 0.000086 / te ** 5
+    elif elevation > -0.575:
+        correction = 1735.0 + elevation * (-518.2 + elevation * (103.4 + elevation * (-12.79 + elevation * 0.711)))
+    else:
+        correction = -20.774 / te
+    return correction / 3600.0
+
+# Zenith angle used for sunrise and sunset, including astral's refraction term
+SUNRISE_ZENITH = 90.0 + SUN_APPARENT_RADIUS + _refraction_at_zenith(90.0 + SUN_APPARENT_RADIUS)
+# Zenith angle of the sun's centre at civil dawn and dusk (6 degrees below the horizon)
+CIVIL_TWILIGHT_ZENITH = 96.0
+
+# How days without a sunrise or sunset (polar day and night) are divided:
+# - none: left undefined (NaN)
+# - civil_twilight: civil dawn to civil dusk stands in for sunrise to sunset,
+#   and equal_hours where the sun does not cross 6 degrees below the horizon either
+# - equal_hours: solar noon -/+ 6 hours, i.e. 24 hours of 60 minutes
+POLAR_CONVENTIONS = ("none", "civil_twilight", "equal_hours")
+
+def to_days(dates):
+    """Convert a date, a sequence of dates or a datetime64 array to datetime64[D]."""
+    return np.asarray(dates, dtype="datetime64[D]")
+
+def weekdays(days):
+    """Python-style weekday (0 = Monday) for an array of datetime64[D] values."""
+    # 1970-01-01 was a Thursday
+    return (days.astype(np.int64) + 3) % 7
+
+def _sun_declination_and_eq_of_time(juliancentury):
+    """Solar declination (degrees) and equation of time (minutes)."""
+    jc = juliancentury
+    l0 = (280.46646 + jc * (36000.76983 + 0.0003032 * jc)) % 360.0
+    m = 357.52911 + jc * (35999.05029 - 0.0001537 * jc)
+    e = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+
+    mrad = np.radians(m)
+    c = (
+        np.sin(mrad) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+        + np.sin(2 * mrad) * (0.019993 - 0.000101 * jc)
+        + np.sin(3 * mrad) * 0.000289
+    )
+    omega = np.radians(125.04 - 1934.136 * jc)
+    apparent_long = l0 + c - 0.00569 - 0.00478 * np.sin(omega)
+
+    seconds = 21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))
+    obliquity = 23.0 + (26.0 + seconds / 60.0) / 60.0 + 0.00256 * np.cos(omega)
+
+    declination = np.degrees(np.arcsin(np.sin(np.radians(obliquity)) * np.sin(np.radians(apparent_long))))
+
+    y = np.tan(np.radians(obliquity) / 2.0) ** 2
+    l0rad = np.radians(l0)
+    sinm = np.sin(mrad)
+    eq_time = np.degrees(
+        y * np.sin(2 * l0rad)
+        - 2.0 * e * sinm
+        + 4.0 * e * y * sinm * np.cos(2 * l0rad)
+        - 0.5 * y * y * np.sin(4 * l0rad)
+        - 1.25 * e * e * np.sin(2 * mrad)
+    ) * 4.0
+
+    return declination, eq_time
+
+def _time_of_transit(latitude, longitude, days, zenith, rising):
+    """Minutes after 00:00 UTC of each day at which the sun crosses the zenith.
+
+    Mirrors ``astral.sun.time_of_transit``; days on which the sun never
+    reaches the zenith come back as NaN instead of raising. rising may be
+    an array broadcasting against days to get both events in one call.
+    """
+    latitude = np.clip(latitude, -89.8, 89.8)
+    lat_rad = np.radians(latitude)
+    zenith_cos = np.cos(np.radians(zenith))
+    julian_day = days.astype(np.float64) + UNIX_EPOCH_JULIAN_DAY
+
+    adjustment = 0.0
+    time_utc = None
+    with np.errstate(invalid="ignore"):
+        for _ in range(2):
+            jc = (julian_day + adjustment - 2451545.0) / 36525.0
+            declination, eq_time = _sun_declination_and_eq_of_time(jc)
+            decl_rad = np.radians(declination)
+
+            h = (zenith_cos - np.sin(lat_rad) * np.sin(decl_rad)) / (np.cos(lat_rad) * np.cos(decl_rad))
+            hour_angle = np.degrees(np.arccos(h))
+            hour_angle = np.where(rising, hour_angle, -hour_angle)
+
+            offset = (-longitude - hour_angle) * 4.0 - eq_time
+            offset = np.where(offset < -720.0, offset + 1440.0, offset)
+
+            time_utc = 720.0 + offset
+            adjustment = time_utc / 1440.0
+
+    return time_utc
+
+# Up to this many (location, day) points both events and all candidate days
+# are evaluated in one call; beyond it one at a time, which keeps the
+# temporaries in cache
+COMBINED_EVENTS_MAX = 8192
+
+def _event_epochs(latitude, longitude, days, utc_offset, zenith=SUNRISE_ZENITH):
+    """Epoch seconds of the rising event on each local calendar day and the setting that follows it.
+
+    Returns (rising, setting). Near the polar circles the sun can set after
+    local midnight, so the setting may fall on the next local date. Up to
+    COMBINED_EVENTS_MAX points, both events
+    and all their candidate days go through a single _time_of_transit call,
+    so a few days cost a handful of NumPy calls rather than one set per
+    event and candidate.
+    """
+    utc_offset = np.asarray(utc_offset, dtype=np.float64)
+    day_numbers = days.astype(np.int64)
+
+    # Leading axes: rising/setting, then the UTC day shift (kept in front so
+    # the inner loops run over the long data axes)
+    shape = np.broadcast_shapes(latitude.shape, longitude.shape, days.shape, utc_offset.shape)
+    trailing = (1,) * len(shape)
+    rising = np.array([True, False]).reshape((2, 1) + trailing)
+    shifts = np.arange(-1, 2).reshape((1, 3) + trailing)
+
+    # astral retries the neighbouring UTC day when the event lands on another
+    # local date; evaluate all three candidates and pick
+    if math.prod(shape) <= COMBINED_EVENTS_MAX:
+        minutes = _time_of_transit(latitude, longitude, days + shifts, zenith, rising)
+    else:
+        minutes = np.array([
+            [_time_of_transit(latitude, longitude, days + shift, zenith, rise) for shift in (-1, 0, 1)]
+            for rise in (True, False)
+        ])
+    before, same, after = ((day_numbers + shifts) * SECONDS_PER_DAY + minutes * 60.0).swapaxes(0, 1)
+
+    with np.errstate(invalid="ignore"):
+        local_day = np.floor((same + utc_offset) / SECONDS_PER_DAY)
+        result = np.where(local_day < day_numbers, after, np.where(local_day > day_numbers, before, same))
+        result_day = np.floor((result + utc_offset) / SECONDS_PER_DAY)
+
+    # When the event skips a local date entirely (astral raises here), keep
+    # the event computed for the date itself so the series stays continuous
+    on_date = result_day == day_numbers
+    rises, sets = np.where(on_date, result, same)
+
+    # A setting before the rising is the previous evening's, when the sun
+    # sets after local midnight: take the first setting within a day after
+    # the rising instead. Without one the sun does not set, and the day
+    # stays out of order
+    with np.errstate(invalid="ignore"):
+        candidates = np.stack([before[1], same[1], after[1]])
+        following = (candidates > rises) & (candidates - rises < SECONDS_PER_DAY)
+        paired = np.where(following, candidates, np.inf).min(axis=0)
+        sets = np.where(on_date[0] & ~(sets > rises) & np.isfinite(paired), paired, sets)
+    return rises, sets
+
+def sunrise_sunset_epochs(latitude, longitude, days, utc_offset=0):
+    """Calculate sunrise and sunset as float epoch seconds.
+
+    latitude, longitude and days broadcast against each other, so a single
+    location over a date range, many locations on one date, or a grid of
+    both are all evaluated in one pass. utc_offset (seconds) selects which
+    local calendar day each event belongs to. Days without a sunrise or
+    sunset (polar day/night) are returned as NaN.
+    """
+    latitude = np.asarray(latitude, dtype=np.float64)
+    longitude = np.asarray(longitude, dtype=np.float64)
+    days = to_days(days)
+
+    return _event_epochs(latitude, longitude, days, utc_offset)
+
+def solar_noon_epochs(longitude, days, utc_offset=0):
+    """Epoch seconds of solar noon on each local calendar day (as ``astral.sun.noon``)."""
+    longitude = np.asarray(longitude, dtype=np.float64)
+    days = to_days(days)
+    day_numbers = days.astype(np.int64)
+
+    _, eq_time = _sun_declination_and_eq_of_time((day_numbers + UNIX_EPOCH_JULIAN_DAY - 2451545.0) / 36525.0)
+    noon = day_numbers * SECONDS_PER_DAY + (720.0 - 4.0 * longitude - eq_time) * 60.0
+
+    # Far from the zone's meridian, noon can land on the neighbouring local date
+    local_day = np.floor((noon + utc_offset) / SECONDS_PER_DAY)
+    return noon + (day_numbers - local_day) * SECONDS_PER_DAY
+
+def polar_days(sunrise, sunset):
+    """Mask of days (along the last axis) whose sunrise or sunset is missing or out of order.
+
+    Each sunset is the one following its sunrise (possibly after local
+    midnight), so sunset <= sunrise only remains where the sun did not set.
+    Besides sunrise < sunset, the night after each day must end after it
+    began, so a sunset that falls past the next sunrise marks both days.
+    """
+    with np.errstate(invalid="ignore"):
+        undefined = ~(sunrise < sunset)
+        night_reversed = sunset[..., :-1] >= sunrise[..., 1:]
+    undefined[..., :-1] |= night_reversed
+    undefined[..., 1:] |= night_reversed
+    return undefined
+
+def solar_events(latitude, longitude, days, utc_offset=0, convention="none"):
+    """Sunrise and sunset as float epoch seconds, with polar days divided by convention.
+
+    Broadcasts like sunrise_sunset_epochs. Days without a sunrise or sunset,
+    or whose events are out of order with their neighbours along the last
+    (days) axis, are detected in the same vectorized pass and filled
+    according to convention (one of POLAR_CONVENTIONS); with "none" they are
+    NaN. Returns (sunrise, sunset, polar) where polar marks the filled days.
+    """
+    latitude = np.asarray(latitude, dtype=np.float64)
+    longitude = np.asarray(longitude, dtype=np.float64)
+    days = to_days(days)
+    sunrise, sunset = sunrise_sunset_epochs(latitude, longitude, days, utc_offset)
+    return fill_polar_days(latitude, longitude, days, utc_offset, sunrise, sunset, convention)
+
+def fill_polar_days(latitude, longitude, days, utc_offset, sunrise, sunset, convention):
+    """The polar-day handling of solar_events, for sunrise/sunset already computed."""
+    if convention not in POLAR_CONVENTIONS:
+        raise ValueError(f"Unknown polar convention: {convention}")
+    polar = polar_days(sunrise, sunset)
+    if not polar.any():
+        return sunrise, sunset, polar
+
+    sunrise = np.where(polar, np.nan, sunrise)
+    sunset = np.where(polar, np.nan, sunset)
+    if convention == "none":
+        return sunrise, sunset, polar
+
+    latitude = np.asarray(latitude, dtype=np.float64)
+    longitude = np.asarray(longitude, dtype=np.float64)
+    utc_offset = np.asarray(utc_offset, dtype=np.float64)
+    days = to_days(days)
+    if convention == "civil_twilight":
+        # Twilight only for the polar days themselves
+        dawn, dusk = _event_epochs(
+            *(np.broadcast_to(values, polar.shape)[polar] for values in (latitude, longitude, days, utc_offset)),
+            zenith=CIVIL_TWILIGHT_ZENITH
+        )
+        sunrise[polar] = dawn
+        sunset[polar] = dusk
+
+    # Equal hours wherever the events are still undefined; a day switched to
+    # equal hours can put its neighbour's night out of order, so repeat
+    # until nothing changes (at most once per day)
+    noon = np.broadcast_to(solar_noon_epochs(longitude, days, utc_offset), polar.shape)
+    equal = polar.copy() if convention == "equal_hours" else np.zeros_like(polar)
+    while True:
+        sunrise = np.where(equal, noon - 6 * 3600, sunrise)
+        sunset = np.where(equal, noon + 6 * 3600, sunset)
+        undefined = polar_days(sunrise, sunset) & ~equal
+        if not undefined.any():
+            return sunrise, sunset, polar
+        equal |= undefined
+        polar |= undefined
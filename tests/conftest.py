@@ -0,0 +1,21 @@
+import logging
+import os
+
+# Must be set before app is imported: a private in-memory database, and
+# query logs written synchronously
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("QUERY_LOG_ASYNC", "0")
+
+import pytest
+
+@pytest.fixture(scope="session")
+def flask_app():
+    from app import app, init_db
+    # app.py enables DEBUG logging
+    logging.getLogger().setLevel(logging.WARNING)
+    init_db()
+    return app
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
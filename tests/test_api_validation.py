@@ -0,0 +1,40 @@
+"""Bad query parameters get a 400 with a readable message."""
+
+def test_find_rejects_a_non_integer_limit(client):
+    response = client.get("/api/planetary_hours/find?planet=Jupiter&limit=abc")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "limit must be an integer"}
+
+def test_find_rejects_end_before_start(client):
+    response = client.get("/api/planetary_hours/find?planet=Jupiter&start=2027-02-01&end=2027-01-01")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "end must be after start"}
+
+def test_elections_rejects_end_before_start_the_same_way(client):
+    response = client.get("/api/elections?planet=Jupiter&start=2027-02-01&end=2027-01-01")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "end must be after start"}
+
+def test_elections_rejects_bad_numbers(client):
+    assert client.get("/api/elections?planet=Jupiter&limit=x").get_json() == {"error": "limit must be an integer"}
+    assert client.get("/api/elections?planet=Jupiter&weight_moon=x").get_json() == {"error": "weight_moon must be a number"}
+
+def test_find_still_answers(client):
+    response = client.get("/api/planetary_hours/find?planet=Jupiter&start=2027-01-01&end=2027-01-08&limit=3")
+    assert response.status_code == 200
+    assert response.get_json()["count"] == 3
+
+def test_current_hours_reject_coordinates_off_the_globe(client):
+    for query in ("lat=95&lng=0", "lat=nan&lng=0", "lat=0&lng=inf", "lat=10&lng=-181"):
+        response = client.get(f"/api/planetary_hours?{query}")
+        assert response.status_code == 400, query
+        assert response.get_json() == {"error": "Invalid coordinates"}
+
+def test_batch_reports_bad_rows_only(client):
+    response = client.post("/api/planetary_hours/batch", json={
+        "locations": [{"lat": 40.7128, "lng": -74.0060}, {"lat": 95, "lng": 0}, {"lat": 51.5, "lng": -0.12}]
+    })
+    assert response.status_code == 200
+    locations = response.get_json()["locations"]
+    assert [location.get("error") for location in locations] == [None, "Invalid coordinates", None]
+    assert locations[2]["timezone"] == "Europe/London"
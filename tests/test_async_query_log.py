@@ -0,0 +1,26 @@
+"""Stopping the ASGI query log writer must not lose a batch it is writing."""
+import asyncio
+
+from query_log import AsyncQueryLogWriter
+
+def test_stop_waits_for_the_batch_being_written():
+    written = []
+
+    async def slow_write(rows):
+        await asyncio.sleep(0.1)
+        written.extend(rows)
+
+    async def run():
+        writer = AsyncQueryLogWriter(None, None, flush_interval=0.01)
+        writer._write = slow_write
+        writer.start()
+        for i in range(3):
+            await writer.log(hour_number=i)
+        # Let the task take the rows off the queue and start writing them
+        await asyncio.sleep(0.02)
+        assert writer._queue.empty()
+        await writer.log(hour_number=3)
+        await writer.stop()
+
+    asyncio.run(run())
+    assert sorted(row["hour_number"] for row in written) == [0, 1, 2, 3]
@@ -0,0 +1,50 @@
+"""A rebuild requested while another worker holds the lock must still happen."""
+import fcntl
+import os
+import time
+
+from ephemeris_store import EphemerisMaintainer, EphemerisStore
+
+def test_invalidate_during_a_concurrent_rebuild_is_retried(tmp_path):
+    path = str(tmp_path / "ephemeris.bin")
+    store = EphemerisStore(path)
+    locations = [(40.7128, -74.0060)]
+    maintainer = EphemerisMaintainer(
+        store, lambda: locations, horizon_days=5, min_remaining=0, lock_timeout=0, retry_interval=0.05
+    )
+    assert maintainer.rebuild()
+
+    # Another worker is rebuilding: the request has to wait for it
+    with open(f"{path}.lock", "w") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        assert not maintainer.rebuild()
+        locations.append((51.5074, -0.1278))
+        maintainer.invalidate()
+        time.sleep(0.2)
+        assert store.lookup(51.5074, -0.1278, store.first_day) is None
+        fcntl.flock(held, fcntl.LOCK_UN)
+
+    deadline = time.monotonic() + 10
+    while store.lookup(51.5074, -0.1278, store.first_day) is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert store.lookup(51.5074, -0.1278, store.first_day) is not None
+
+def test_rebuild_after_waiting_keeps_a_fresh_store(tmp_path):
+    path = str(tmp_path / "ephemeris.bin")
+    locations = [(40.7128, -74.0060)]
+    first = EphemerisMaintainer(EphemerisStore(path), lambda: locations, horizon_days=40, min_remaining=30)
+    second = EphemerisMaintainer(EphemerisStore(path), lambda: locations, horizon_days=40, min_remaining=30)
+    assert first.rebuild()
+    written = os.stat(path).st_mtime_ns
+
+    # The worker that waited for the lock finds the store already current
+    assert second.rebuild()
+    assert os.stat(path).st_mtime_ns == written
+
+    # ...but not once the locations have changed, or when forced
+    locations.append((51.5074, -0.1278))
+    assert second.rebuild()
+    assert second.store.lookup(51.5074, -0.1278, second.store.first_day) is not None
+    written = os.stat(path).st_mtime_ns
+    assert first.rebuild(force=True)
+    assert os.stat(path).st_mtime_ns != written
@@ -0,0 +1,36 @@
+"""In grid mode, stored responses and fragments must not be shared across a cell."""
+from datetime import datetime
+
+import pytest
+import pytz
+
+from fragment_cache import page_fragments
+from http_cache import get_hour_slot
+from planetary_hours import configure_solar_grid, get_current_planetary_hour, solar_cache
+
+# Two points of New York in one 0.05 degree cell
+FIRST = (40.71, -74.01)
+SECOND = (40.72, -73.99)
+NOW = datetime(2026, 7, 1, 12, tzinfo=pytz.utc)
+
+@pytest.fixture(params=[False, True], ids=["nearest", "interpolate"])
+def grid(request):
+    configure_solar_grid(0.05, interpolate=request.param)
+    yield request.param
+    configure_solar_grid(None)
+
+def test_points_share_a_cell(grid):
+    assert solar_cache.quantize(*FIRST) == solar_cache.quantize(*SECOND)
+
+def test_hour_slots_are_per_coordinate(grid):
+    assert get_hour_slot("index", *FIRST, NOW).key != get_hour_slot("index", *SECOND, NOW).key
+
+def test_fragments_are_per_coordinate(grid):
+    first, second = page_fragments(*FIRST, NOW), page_fragments(*SECOND, NOW)
+    for name in first:
+        assert first[name].key != second[name].key
+
+def test_interpolated_hours_are_per_coordinate(grid):
+    first = get_current_planetary_hour(*FIRST, NOW)
+    second = get_current_planetary_hour(*SECOND, NOW)
+    assert (first.start != second.start) == grid
@@ -0,0 +1,35 @@
+"""/metrics must be valid Prometheus text format: one HELP and TYPE per family, samples together."""
+import re
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (\S+)$')
+
+def _families(text):
+    """(family name, type, [sample names]) in order of appearance."""
+    families = []
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, metric_type = line.split(" ", 3)
+            families.append((name, metric_type, []))
+        elif line and not line.startswith("#"):
+            match = SAMPLE.match(line)
+            assert match, line
+            float(match.group(3))
+            families[-1][2].append(match.group(1))
+    return families
+
+def test_each_family_declared_once(client):
+    client.get("/api/planetary_hours?lat=40.7128&lng=-74.0060")
+    families = _families(client.get("/metrics").get_data(as_text=True))
+    names = [name for name, _, _ in families]
+    assert len(names) == len(set(names))
+
+def test_samples_follow_their_family(client):
+    families = _families(client.get("/metrics").get_data(as_text=True))
+    for name, metric_type, samples in families:
+        suffixes = ("_bucket", "_count", "_sum") if metric_type == "histogram" else ("",)
+        assert all(sample in [name + suffix for suffix in suffixes] for sample in samples), name
+
+def test_cache_families_hold_every_cache(client):
+    families = {name: samples for name, _, samples in _families(client.get("/metrics").get_data(as_text=True))}
+    for name in ("planetary_cache_hits_total", "planetary_cache_misses_total", "planetary_cache_entries"):
+        assert len(families[name]) == 5
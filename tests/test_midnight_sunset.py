@@ -0,0 +1,68 @@
+"""Near the polar circles the sun can set after local midnight without the day being polar."""
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+import pytest
+import pytz
+
+import solar
+from planetary_hours import (
+    calculate_sunrise_sunset,
+    day_offsets,
+    get_current_planetary_hours_batch,
+    get_planetary_hours,
+    location_timezone,
+    solar_cache
+)
+
+SOLSTICE = date(2026, 6, 21)
+CITIES = {
+    "Reykjavik": (64.15, -21.94),
+    "Fairbanks": (64.84, -147.72),
+    "Nuuk": (64.18, -51.72)
+}
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    solar_cache.clear()
+    yield
+    solar_cache.clear()
+
+@pytest.mark.parametrize("city", CITIES)
+def test_sunset_after_midnight_pairs_with_sunrise(city):
+    sunrise, sunset = calculate_sunrise_sunset(*CITIES[city], SOLSTICE)
+    assert sunrise.date() == SOLSTICE and time(2) < sunrise.time() < time(4)
+    assert sunset.date() == SOLSTICE + timedelta(days=1) and sunset.time() < time(1, 30)
+
+@pytest.mark.parametrize("city", CITIES)
+def test_solstice_hours_run_from_sunrise_to_sunset(city):
+    sunrise, sunset = calculate_sunrise_sunset(*CITIES[city], SOLSTICE)
+    hours = get_planetary_hours(*CITIES[city], SOLSTICE)
+    assert hours[0].start_time == sunrise
+    assert hours[11].end_time == sunset
+    # Day hours of about 105 minutes, not the 60 of the equal-hours convention
+    assert hours[0].end_time - hours[0].start_time > timedelta(minutes=100)
+
+@pytest.mark.parametrize("city", CITIES)
+def test_batch_agrees_with_single(city):
+    latitude, longitude = CITIES[city]
+    tz = location_timezone(latitude, longitude)
+    now = tz.localize(datetime.combine(SOLSTICE, time(12)))
+    [result] = get_current_planetary_hours_batch([(latitude, longitude)], now)
+    hours = get_planetary_hours(latitude, longitude, SOLSTICE)
+    assert result["current_hour"] in hours[:12]
+
+def test_no_polar_days_in_fairbanks_summer():
+    latitude, longitude = CITIES["Fairbanks"]
+    days = np.arange(np.datetime64("2026-05-01"), np.datetime64("2026-08-01"))
+    offsets = day_offsets(location_timezone(latitude, longitude), days)
+    sunrise, sunset, polar = solar.solar_events(latitude, longitude, days, offsets, "civil_twilight")
+    assert not polar.any()
+    assert ((sunset - sunrise) > 18 * 3600).any()
+
+def test_midnight_sun_is_still_polar():
+    # Tromso, where the sun does not set from late May to mid July
+    days = np.arange(np.datetime64("2026-06-01"), np.datetime64("2026-07-01"))
+    offsets = day_offsets(pytz.timezone("Europe/Oslo"), days)
+    _, _, polar = solar.solar_events(69.65, 18.96, days, offsets, "civil_twilight")
+    assert polar.all()
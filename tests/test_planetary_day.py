@@ -0,0 +1,31 @@
+"""The planetary day runs from sunrise to sunrise, not midnight to midnight."""
+from datetime import datetime
+
+import pytz
+
+from planetary_hours import get_current_planetary_hour, get_current_planetary_hours_batch, get_planetary_day_info
+
+NEW_YORK = (40.7128, -74.0060)
+EASTERN = pytz.timezone("America/New_York")
+
+def test_before_sunrise_is_still_the_previous_planetary_day():
+    # Saturday 03:00, before sunrise: still Friday's (Venus's) night
+    before_sunrise = EASTERN.localize(datetime(2026, 10, 17, 3, 0))
+    day = get_planetary_day_info(*NEW_YORK, before_sunrise)
+    assert day["planet"] == "Venus"
+    assert day["planet"] == get_current_planetary_hours_batch([NEW_YORK], before_sunrise)[0]["day_planet"]
+
+def test_after_sunrise_is_the_calendar_day():
+    assert get_planetary_day_info(*NEW_YORK, EASTERN.localize(datetime(2026, 10, 17, 12, 0)))["planet"] == "Saturn"
+
+def test_batch_reads_naive_times_like_the_single_lookup():
+    # 02:30 wall-clock time is before sunrise in both places, on different UTC instants
+    naive = datetime(2026, 7, 4, 2, 30)
+    locations = [(40.7128, -74.0060), (35.6762, 139.6503)]
+    for (latitude, longitude), result in zip(locations, get_current_planetary_hours_batch(locations, naive)):
+        hour = result["current_hour"]
+        single = get_current_planetary_hour(latitude, longitude, naive)
+        # The vectorized and astral paths agree to within rounding
+        assert (hour.period, hour.hour_number, hour.planet) == (single.period, single.hour_number, single.planet)
+        assert abs(hour.start - single.start) < 1000
+        assert result["day_planet"] == get_planetary_day_info(latitude, longitude, naive)["planet"]
@@ -0,0 +1,40 @@
+"""Rebuilding rollups must not lose the counts of pruned raw rows."""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, func, select
+
+def _log(db, model, timestamp):
+    db.session.add(model(
+        latitude=40.7, longitude=-74.0, day_planet="Sun", hour_planet="Moon",
+        period="Day", hour_number=1, timestamp=timestamp
+    ))
+
+def _totals(db, rollup_model):
+    rows = db.session.execute(
+        select(rollup_model.date, func.sum(rollup_model.queries)).group_by(rollup_model.date)
+    ).all()
+    return {day: total for day, total in rows}
+
+def test_rebuild_keeps_rollups_of_pruned_days(flask_app):
+    from app import db
+    from models import PlanetaryHourLog, PlanetaryHourRollup
+    from query_log import rebuild_rollups
+
+    with flask_app.app_context():
+        db.session.execute(delete(PlanetaryHourLog))
+        db.session.execute(delete(PlanetaryHourRollup))
+        first = datetime(2026, 1, 1, 12)
+        for day in range(4):
+            _log(db, PlanetaryHourLog, first + timedelta(days=day))
+            _log(db, PlanetaryHourLog, first + timedelta(days=day, hours=6))
+        db.session.commit()
+
+        # Seeding from full history counts every day
+        assert rebuild_rollups(db.session, PlanetaryHourLog, PlanetaryHourRollup) == 8
+        assert _totals(db, PlanetaryHourRollup) == {date(2026, 1, day): 2 for day in range(1, 5)}
+
+        # Prune up to Jan 3 13:00, leaving Jan 3 partly pruned
+        db.session.execute(delete(PlanetaryHourLog).where(PlanetaryHourLog.timestamp < datetime(2026, 1, 3, 13)))
+        db.session.commit()
+        assert rebuild_rollups(db.session, PlanetaryHourLog, PlanetaryHourRollup) == 2
+        assert _totals(db, PlanetaryHourRollup) == {date(2026, 1, day): 2 for day in range(1, 5)}
@@ -0,0 +1,61 @@
+"""A location whose hours cannot be computed must not break the transition scheduler."""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import transitions
+from planetary_hours import configure_solar_grid
+from transitions import REFRESH_RETRY_SECONDS, TransitionScheduler
+
+NEW_YORK = (40.7128, -74.0060)
+
+def _fail(*args, **kwargs):
+    raise ValueError("Sun does not rise or set")
+
+def test_failed_subscribe_leaves_nothing_behind(monkeypatch):
+    scheduler = TransitionScheduler()
+    monkeypatch.setattr(transitions, "build_transition_event", _fail)
+    with pytest.raises(ValueError):
+        scheduler.subscribe(*NEW_YORK)
+    assert scheduler.stats() == {"locations": 0, "subscribers": 0}
+    assert scheduler._schedule == []
+
+    monkeypatch.undo()
+    channel = scheduler.subscribe(*NEW_YORK)
+    assert channel.snapshot()[0] == 1
+    assert scheduler.stats() == {"locations": 1, "subscribers": 1}
+
+def test_failing_refresh_is_retried_without_stopping_the_thread(monkeypatch):
+    scheduler = TransitionScheduler()
+    channel = scheduler.subscribe(*NEW_YORK)
+    monkeypatch.setattr(transitions, "build_transition_event", _fail)
+    with scheduler._lock:
+        scheduler._schedule.clear()
+        scheduler._push(channel, time.time())
+
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        with scheduler._lock:
+            if scheduler._schedule and scheduler._schedule[0][0] > time.time() + 1:
+                break
+        time.sleep(0.01)
+    assert scheduler._thread.is_alive()
+    assert scheduler._schedule[0][0] > time.time() + REFRESH_RETRY_SECONDS - 5
+
+def test_channels_are_per_zone_within_a_cell():
+    # Either side of the Portugal-Spain border, in one 0.05 degree cell
+    configure_solar_grid(0.05)
+    try:
+        scheduler = TransitionScheduler()
+        lisbon = scheduler.subscribe(38.88, -7.06)
+        madrid = scheduler.subscribe(38.88, -7.03)
+        assert lisbon is not madrid
+        offsets = [
+            datetime.fromisoformat(channel.snapshot()[1]["start_time"]).utcoffset()
+            for channel in (lisbon, madrid)
+        ]
+        assert offsets[1] - offsets[0] == timedelta(hours=1)
+        assert scheduler.subscribe(38.881, -7.061) is lisbon
+    finally:
+        configure_solar_grid(None)
@@ -0,0 +1,35 @@
+"""Locations in one solar grid cell but different time zones must not share cached hours."""
+from datetime import datetime
+
+import pytest
+import pytz
+
+from http_cache import get_hour_slot
+from planetary_hours import configure_solar_grid, get_current_planetary_hour, solar_cache
+from timezones import timezone_resolver
+
+# Either side of the Portugal-Spain border, 0.03 degrees apart
+LISBON_SIDE = (38.88, -7.06)
+MADRID_SIDE = (38.88, -7.03)
+NOW = datetime(2026, 7, 1, 12, tzinfo=pytz.utc)
+
+@pytest.fixture
+def grid():
+    configure_solar_grid(0.05)
+    yield
+    configure_solar_grid(None)
+
+def test_points_share_a_cell_but_not_a_zone(grid):
+    assert solar_cache.quantize(*LISBON_SIDE) == solar_cache.quantize(*MADRID_SIDE)
+    assert timezone_resolver.zone_name(*LISBON_SIDE) == "Europe/Lisbon"
+    assert timezone_resolver.zone_name(*MADRID_SIDE) == "Europe/Madrid"
+
+def test_boundary_index_is_per_zone(grid):
+    lisbon = get_current_planetary_hour(*LISBON_SIDE, NOW)
+    madrid = get_current_planetary_hour(*MADRID_SIDE, NOW)
+    assert lisbon.start_time.utcoffset().total_seconds() == 3600
+    assert madrid.start_time.utcoffset().total_seconds() == 7200
+    assert lisbon.start == madrid.start
+
+def test_hour_slot_is_per_zone(grid):
+    assert get_hour_slot("index", *LISBON_SIDE, NOW).key != get_hour_slot("index", *MADRID_SIDE, NOW).key
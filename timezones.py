@@ -0,0 +1,244 @@
+"""Offline coordinate to IANA time zone resolution.
+
+Zones come from timezonefinder's bundled zone polygons, a required
+dependency. If it is missing anyway, a warning is logged and zones are
+only approximated: the nearest city in astral's bundled geocoder database
+within NEAREST_CITY_MAX_KM, and beyond that the nautical zone for the
+longitude (Etc/GMT+5 etc., no daylight saving). That approximation gets
+the UTC offset wrong for a large share of places, shifting every hour
+boundary, so it is a last resort rather than an alternative. Nothing
+touches the network. Results are cached per quantized coordinate, so
+repeated lookups are a dict hit.
+"""
+import bisect
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytz
+
+logger = logging.getLogger(__name__)
+
+# Farthest a bundled city may be to lend its zone when timezonefinder is missing
+NEAREST_CITY_MAX_KM = 300
+
+EARTH_RADIUS_KM = 6371.0
+
+def nautical_zone(longitude):
+    """Fixed-offset zone for a longitude (15 degrees per hour); Etc/GMT signs are inverted."""
+    hours = max(-12, min(12, round(longitude / 15)))
+    return f"Etc/GMT{-hours:+d}" if hours else "Etc/GMT"
+
+_EPOCH = datetime(1970, 1, 1)
+_transition_tables = {}
+_fixed_zones = {}
+
+def _fixed_zone(offset, name):
+    key = (offset, name)
+    zone = _fixed_zones.get(key)
+    if zone is None:
+        zone = _fixed_zones[key] = timezone(timedelta(seconds=offset), name)
+    return zone
+
+def _transition_table(tz):
+    """(transition epochs, offsets in seconds, as lists, fixed-offset tzinfos) for a pytz zone with DST history."""
+    table = _transition_tables.get(tz.zone)
+    if table is None:
+        transitions = np.array([
+            (moment - _EPOCH).total_seconds() if moment.year > 1 else -np.inf
+            for moment in tz._utc_transition_times
+        ])
+        offsets = np.array([info[0].total_seconds() for info in tz._transition_info])
+        zones = [_fixed_zone(info[0].total_seconds(), info[2]) for info in tz._transition_info]
+        table = _transition_tables[tz.zone] = (
+            transitions, offsets, transitions.tolist(), offsets.tolist(), zones
+        )
+    return table
+
+def zone_at(tz, epoch):
+    """Fixed-offset tzinfo (keeping the abbreviation, e.g. EDT) in effect in tz at epoch.
+
+    datetimes built on it skip pytz's pure-Python fromutc() and compare,
+    subtract and format exactly like tz-aware ones.
+    """
+    if hasattr(tz, "_utc_transition_times"):
+        _, _, transitions, _, zones = _transition_table(tz)
+        return zones[max(0, bisect.bisect_right(transitions, epoch) - 1)]
+    if isinstance(tz, pytz.tzinfo.StaticTzInfo) or tz is pytz.utc:
+        return _fixed_zone(tz.utcoffset(None).total_seconds(), tz.tzname(None))
+    return tz
+
+def local_datetime(epoch, tz):
+    """Aware datetime for epoch seconds, in tz's local time."""
+    return datetime.fromtimestamp(epoch, zone_at(tz, epoch))
+
+def localize(dt, tz):
+    """Attach tz to a naive datetime (as wall-clock time) or convert an aware one to tz."""
+    if dt.tzinfo is not None:
+        return local_datetime(dt.timestamp(), tz)
+    if hasattr(tz, "_utc_transition_times"):
+        # pytz's own localize() tries every candidate offset; a bisect over the
+        # zone's transitions is several times faster. Repeated wall times
+        # resolve to the first occurrence.
+        _, _, transitions, offsets, zones = _transition_table(tz)
+        wall = (dt - _EPOCH).total_seconds()
+        first = offsets[max(0, bisect.bisect_right(transitions, wall) - 1)]
+        index = max(0, bisect.bisect_right(transitions, wall - first) - 1)
+        if offsets[max(0, bisect.bisect_right(transitions, wall - offsets[index]) - 1)] != offsets[index]:
+            # Skipped wall time (clocks went forward): move forward like pytz
+            return local_datetime(wall - first, tz)
+        return dt.replace(tzinfo=zones[index])
+    zone = zone_at(tz, (dt - _EPOCH).total_seconds())
+    if zone is not tz:
+        return dt.replace(tzinfo=zone)
+    if hasattr(tz, "localize"):
+        return tz.localize(dt)
+    return dt.replace(tzinfo=tz)
+
+def utc_offsets(tz, epochs):
+    """UTC offset (seconds) of tz at each epoch second, vectorized."""
+    epochs = np.asarray(epochs, dtype=np.float64)
+    if hasattr(tz, "_utc_transition_times"):
+        transitions, offsets, _, _, _ = _transition_table(tz)
+        index = np.clip(np.searchsorted(transitions, epochs, side="right") - 1, 0, len(offsets) - 1)
+        return offsets[index]
+    fixed = tz.utcoffset(None)
+    if fixed is not None:
+        return np.full(epochs.shape, fixed.total_seconds())
+    return np.array([
+        datetime.fromtimestamp(epoch, tz).utcoffset().total_seconds() for epoch in epochs.ravel().tolist()
+    ]).reshape(epochs.shape)
+
+def day_offsets(tz, days):
+    """UTC offset (seconds) of tz at local noon of each datetime64[D] day."""
+    noon = np.asarray(days, dtype="datetime64[D]").astype(np.int64) * 86400 + 43200
+    # Noon UTC first, then corrected to local noon
+    return utc_offsets(tz, noon - utc_offsets(tz, noon))
+
+class TimezoneResolver:
+    """Thread-safe coordinate -> pytz time zone lookup with a bounded LRU cache.
+
+    Coordinates are rounded to precision decimals (2 is ~1 km) for the
+    cache key. remember() seeds the cache with a known zone, e.g. one stored
+    on a saved location.
+    """
+
+    def __init__(self, maxsize=65536, precision=2):
+        self.maxsize = maxsize
+        self.precision = precision
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._finder = None
+        self._cities = None
+
+    def quantize(self, latitude, longitude):
+        """Round coordinates to the cache precision."""
+        return round(float(latitude), self.precision), round(float(longitude), self.precision)
+
+    def resolve(self, latitude, longitude):
+        """Return the pytz time zone for a coordinate."""
+        key = self.quantize(latitude, longitude)
+        with self._lock:
+            tz = self._entries.get(key)
+            if tz is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return tz
+            self.misses += 1
+
+        tz = pytz.timezone(self.lookup_name(*key))
+        self._store(key, tz)
+        return tz
+
+    def zone_name(self, latitude, longitude):
+        """IANA name of the zone for a coordinate."""
+        return self.resolve(latitude, longitude).zone
+
+    def remember(self, latitude, longitude, name):
+        """Cache a known zone name for a coordinate (unknown names are ignored)."""
+        try:
+            tz = pytz.timezone(name)
+        except pytz.UnknownTimeZoneError:
+            return
+        self._store(self.quantize(latitude, longitude), tz)
+
+    def lookup_name(self, latitude, longitude):
+        """Uncached zone name lookup."""
+        finder = self._get_finder()
+        if finder is not None:
+            name = finder.timezone_at(lng=longitude, lat=latitude)
+            if name:
+                return name
+        else:
+            name = self._nearest_city_zone(latitude, longitude)
+            if name:
+                return name
+        return nautical_zone(longitude)
+
+    def warm(self):
+        """Load the zone data up front (e.g. in a preforking master) instead of on the first lookup."""
+        if self._get_finder() is None:
+            self._nearest_city_zone(0.0, 0.0)
+
+    def clear(self):
+        """Drop all cached zones and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return a snapshot of the cache counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _store(self, key, tz):
+        with self._lock:
+            self._entries[key] = tz
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _get_finder(self):
+        if self._finder is None:
+            try:
+                from timezonefinder import TimezoneFinder
+            except ImportError:
+                logger.warning(
+                    "timezonefinder is not installed; time zones are approximated from the nearest "
+                    "city or the longitude and may be hours off (pip install timezonefinder)"
+                )
+                self._finder = False
+            else:
+                self._finder = TimezoneFinder(in_memory=True)
+        return self._finder or None
+
+    def _nearest_city_zone(self, latitude, longitude):
+        if self._cities is None:
+            from astral.geocoder import all_locations, database
+            cities = list(all_locations(database()))
+            self._cities = (
+                np.radians([city.latitude for city in cities]),
+                np.radians([city.longitude for city in cities]),
+                [city.timezone for city in cities]
+            )
+        lats, lngs, zones = self._cities
+        lat, lng = np.radians(latitude), np.radians(longitude)
+        # Haversine distance to every city
+        a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        nearest = int(np.argmin(distances))
+        if distances[nearest] > NEAREST_CITY_MAX_KM:
+            return None
+        return zones[nearest]
+
+# Shared resolver used by planetary_hours and the web app
+timezone_resolver = TimezoneResolver()
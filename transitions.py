@@ -0,0 +1,229 @@
+import asyncio
+import heapq
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+from planetary_hours import (
+    ensure_timezone_aware,
+    get_current_planetary_hour,
+    get_hour_boundary_index,
+    get_planetary_day_info,
+    hour_index_key
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds before a channel whose hours could not be computed is tried again
+REFRESH_RETRY_SECONDS = 60.0
+
+def build_transition_event(latitude, longitude, current_time):
+    """Describe the planetary hour in effect at current_time as an event payload."""
+    hour = get_current_planetary_hour(latitude, longitude, current_time)
+    day_info = get_planetary_day_info(latitude, longitude, current_time)
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "day_planet": day_info["planet"],
+        "hour_number": hour.hour_number,
+        "period": hour.period,
+        "planet": hour.planet,
+        "archangel": hour.archangel,
+        "angel": hour.angel,
+        "start_time": hour.start_time.isoformat(),
+        "end_time": hour.end_time.isoformat(),
+        "next_transition": hour.end_time.isoformat()
+    }
+
+class TransitionChannel:
+    """Latest hour event for one location, shared by all of its subscribers.
+
+    latitude and longitude are the first subscriber's, a point inside the
+    channel's cell and time zone that its hours are computed for.
+    """
+
+    def __init__(self, key, latitude, longitude):
+        self.key = key
+        self.latitude = latitude
+        self.longitude = longitude
+        self.version = 0
+        self.payload = None
+        self.next_transition = None
+        self.subscribers = 0
+        self.condition = threading.Condition()
+
+    def publish(self, payload, next_transition):
+        with self.condition:
+            self.payload = payload
+            self.next_transition = next_transition
+            self.version += 1
+            self.condition.notify_all()
+
+    def snapshot(self):
+        """Return (version, payload, next_transition) without waiting."""
+        with self.condition:
+            return self.version, self.payload, self.next_transition
+
+    def wait(self, last_version, timeout):
+        """Block until a payload newer than last_version exists; returns (version, payload) or None on timeout."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.version > last_version, timeout):
+                return None
+            return self.version, self.payload
+
+class TransitionScheduler:
+    """Single background thread that publishes hour transitions per location.
+
+    Transition times are computed once per distinct location (solar cache
+    cell and time zone, see hour_index_key), no matter how many clients
+    subscribe to it, and the thread sleeps until the earliest pending
+    boundary. Subscribers just wait on their channel.
+    """
+
+    def __init__(self):
+        self._channels = {}
+        self._schedule = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+
+    def subscribe(self, latitude, longitude):
+        """Register interest in a location and return its channel.
+
+        A new location's current hour is computed before it is registered,
+        so if that raises (e.g. a polar day under the "none" convention)
+        nothing is left behind.
+        """
+        key = hour_index_key(latitude, longitude)
+        with self._lock:
+            channel = self._channels.get(key)
+            if channel is not None:
+                channel.subscribers += 1
+        if channel is None:
+            channel = TransitionChannel(key, latitude, longitude)
+            next_transition = self._publish(channel)
+            with self._lock:
+                existing = self._channels.get(key)
+                if existing is not None:
+                    # Another subscriber registered the location meanwhile
+                    channel = existing
+                else:
+                    self._channels[key] = channel
+                    self._push(channel, next_transition)
+                channel.subscribers += 1
+        self._ensure_started()
+        return channel
+
+    def unsubscribe(self, channel):
+        """Drop a subscriber; channels without subscribers are forgotten."""
+        with self._lock:
+            channel.subscribers -= 1
+            if channel.subscribers <= 0:
+                self._channels.pop(channel.key, None)
+
+    def stats(self):
+        """Return the number of tracked locations and subscribers."""
+        with self._lock:
+            return {
+                "locations": len(self._channels),
+                "subscribers": sum(channel.subscribers for channel in self._channels.values())
+            }
+
+    def _publish(self, channel):
+        """Publish the hour in effect now on channel; returns the time of the next boundary."""
+        latitude, longitude = channel.latitude, channel.longitude
+        now = ensure_timezone_aware(datetime.now())
+        index = get_hour_boundary_index(latitude, longitude, now)
+        _, next_transition = index.bounds(index.lookup(now.timestamp()))
+        channel.publish(build_transition_event(latitude, longitude, now), next_transition)
+        return next_transition
+
+    def _push(self, channel, when):
+        # Caller holds self._lock
+        heapq.heappush(self._schedule, (when, id(channel), channel))
+        self._wakeup.notify()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="hour-transitions", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                # Sleep until the earliest boundary (or until a new one is scheduled)
+                while not self._schedule or self._schedule[0][0] > time.time():
+                    timeout = self._schedule[0][0] - time.time() if self._schedule else None
+                    self._wakeup.wait(timeout)
+                _, _, channel = heapq.heappop(self._schedule)
+                if self._channels.get(channel.key) is not channel:
+                    # Nobody is listening any more
+                    continue
+            # One failing location must not stop transitions for the others
+            try:
+                next_transition = self._publish(channel)
+            except Exception:
+                logger.exception("Could not compute the next transition for %s; retrying in %.0fs",
+                                 channel.key, REFRESH_RETRY_SECONDS)
+                next_transition = time.time() + REFRESH_RETRY_SECONDS
+            with self._lock:
+                self._push(channel, next_transition)
+
+# Shared scheduler for all streaming connections in this process
+transition_scheduler = TransitionScheduler()
+
+def _format_event(version, payload):
+    return f"event: hour\nid: {version}\ndata: {json.dumps(payload)}\n\n"
+
+# Comment line keeps proxies from closing an idle connection
+KEEP_ALIVE = ": keep-alive\n\n"
+
+def stream_transitions(latitude, longitude, heartbeat=15.0):
+    """Yield Server-Sent Events for a location: the current hour, then one event per transition."""
+    channel = transition_scheduler.subscribe(latitude, longitude)
+    try:
+        version = 0
+        while True:
+            update = channel.wait(version, heartbeat)
+            if update is None:
+                yield KEEP_ALIVE
+                continue
+            version, payload = update
+            yield _format_event(version, payload)
+    finally:
+        transition_scheduler.unsubscribe(channel)
+
+async def astream_transitions(latitude, longitude, heartbeat=15.0, executor=None):
+    """asyncio version of stream_transitions for the ASGI app.
+
+    Instead of blocking a thread per client on the channel, each stream
+    sleeps until the channel's next transition (or heartbeat) and then
+    checks for a newer payload. Subscribing, which may compute the
+    location's hours, runs in executor.
+    """
+    loop = asyncio.get_running_loop()
+    channel = await loop.run_in_executor(executor, transition_scheduler.subscribe, latitude, longitude)
+    try:
+        version = 0
+        last_sent = loop.time()
+        while True:
+            current, payload, next_transition = channel.snapshot()
+            if current > version:
+                version = current
+                yield _format_event(version, payload)
+                last_sent = loop.time()
+                continue
+            idle = heartbeat - (loop.time() - last_sent)
+            if idle <= 0:
+                yield KEEP_ALIVE
+                last_sent = loop.time()
+                continue
+            # The scheduler thread publishes just after the boundary; poll briefly until it has
+            until_transition = next_transition - time.time() if next_transition is not None else idle
+            await asyncio.sleep(min(idle, max(until_transition, 0.05)))
+    finally:
+        transition_scheduler.unsubscribe(channel)